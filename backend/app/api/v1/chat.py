@@ -1,71 +1,24 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
-from app.core.security import get_current_user
+from app.core.config import WS_ACTION_DRAIN_SECONDS
+from app.core.security import get_current_user, verify_token
 from app.core.supabase import supabase
 from app.schemas.chat import MessageCreate, Message, ConversationListOut, ConversationDetail, MessageUpdateRequest
 from app.services.chatservices import ChatService
 from app.services.chatgroupservices import ChatGroupService
-from typing import List, Dict, Set
-import json
+from app.services.action_dispatcher import ActionDispatcher
+from app.services.connection_manager import manager
+from app.services.presence import MAX_PRESENCE_QUERY
+from app.services.resume_service import (
+    ResumeService,
+    MAX_RESUME_STREAMS,
+    new_message_event,
+    new_group_message_event,
+)
+from fastapi import HTTPException
+from typing import List, Optional
 
 router = APIRouter()
 
-# Store active WebSocket connections don't edit 
-class ConnectionManager:
-    def __init__(self):
-        # Map of user_id -> WebSocket connection
-        self.active_connections: Dict[str, WebSocket] = {}
-        # Map of group_id -> set of user_ids subscribed to that group
-        self.group_subscriptions: Dict[str, Set[str]] = {}
-
-    async def connect(self, user_id: str, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections[user_id] = websocket
-        print(f"User {user_id} connected. Total connections: {len(self.active_connections)}")
-
-    def disconnect(self, user_id: str):
-        if user_id in self.active_connections:
-            del self.active_connections[user_id]
-            # Remove from all group subscriptions
-            for group_id in list(self.group_subscriptions.keys()):
-                if user_id in self.group_subscriptions[group_id]:
-                    self.group_subscriptions[group_id].remove(user_id)
-                    if not self.group_subscriptions[group_id]:
-                        del self.group_subscriptions[group_id]
-            print(f"User {user_id} disconnected. Total connections: {len(self.active_connections)}")
-
-    async def send_personal_message(self, message: dict, user_id: str):
-        if user_id in self.active_connections:
-            try:
-                await self.active_connections[user_id].send_json(message)
-            except Exception as e:
-                print(f"Error sending message to {user_id}: {e}")
-    
-    # Group chat methods
-    def subscribe_to_group(self, user_id: str, group_id: str):
-        """Subscribe a user to a group for real-time updates"""
-        if group_id not in self.group_subscriptions:
-            self.group_subscriptions[group_id] = set()
-        self.group_subscriptions[group_id].add(user_id)
-        print(f"User {user_id} subscribed to group {group_id}. Total subscribers: {len(self.group_subscriptions[group_id])}")
-    
-    def unsubscribe_from_group(self, user_id: str, group_id: str):
-        """Unsubscribe a user from a group"""
-        if group_id in self.group_subscriptions:
-            self.group_subscriptions[group_id].discard(user_id)
-            if not self.group_subscriptions[group_id]:
-                del self.group_subscriptions[group_id]
-            print(f"User {user_id} unsubscribed from group {group_id}")
-    
-    async def send_group_message(self, message: dict, group_id: str):
-        """Send message to all users subscribed to a group"""
-        if group_id in self.group_subscriptions:
-            subscribers = self.group_subscriptions[group_id].copy()
-            print(f"Broadcasting to {len(subscribers)} subscribers in group {group_id}")
-            for user_id in subscribers:
-                await self.send_personal_message(message, user_id)
-
-manager = ConnectionManager()
-
 @router.websocket("/ws/chat/{token}")
 async def websocket_endpoint(websocket: WebSocket, token: str):
     """WebSocket endpoint for real-time chat"""
@@ -73,166 +26,197 @@ async def websocket_endpoint(websocket: WebSocket, token: str):
     
     # Verify token and get user
     try:
-        user_response = supabase.auth.get_user(token)
-        if not user_response.user:
+        user = await verify_token(token)
+        if not user:
             await websocket.close(code=1008)
             return
-        user_id = user_response.user.id
+        user_id = user.id
     except Exception as e:
         print(f"WebSocket auth error: {e}")
         await websocket.close(code=1008)
         return
     
-    await manager.connect(user_id, websocket)
+    # JSON by default; MessagePack when the client offers that subprotocol
+    connection = await manager.connect(user_id, websocket)
+    
+    async def report_error(action: str, error: Exception):
+        connection.send({
+            "type": "error",
+            "action": action,
+            "message": f"Failed to {action.replace('_', ' ')}: {error}"
+        })
+    
+    # Slow writes in one conversation/group no longer hold up the others
+    dispatcher = ActionDispatcher(report_error)
     
     try:
         while True:
             # Receive message from client
-            data = await websocket.receive_json()
+            data = await connection.receive()
             
             action = data.get("action")
             
-            if action == "send_message":
-                conversation_id = data.get("conversation_id")
-                content = data.get("content")
-                
-                # Save message to database
-                message = await ChatService.send_message(conversation_id, user_id, content)
-                
-                # Get the other participant
-                conversation = await ChatService.get_conversation_details(conversation_id, user_id)
-                other_user_id = (
-                    conversation["participant2_id"] 
-                    if conversation["participant1_id"] == user_id 
-                    else conversation["participant1_id"]
-                )
-                
-                # Send to both users
-                message_data = {
-                    "type": "new_message",
-                    "message": {
-                        "id": str(message.id),
-                        "conversation_id": str(message.conversation_id),
-                        "sender_id": str(message.sender_id),
-                        "content": message.content,
-                        "created_at": message.created_at.isoformat(),
-                        "read_at": message.read_at.isoformat() if message.read_at else None
-                    }
-                }
-                
-                
-                await manager.send_personal_message(message_data, user_id)
-                
-                
-                await manager.send_personal_message(message_data, str(other_user_id))
-            
-            elif action == "mark_read":
-                conversation_id = data.get("conversation_id")
-                await ChatService.mark_messages_as_read(conversation_id, user_id)
+            # Any frame proves the socket is alive; a heartbeat may report an inactive tab
+            if action == "heartbeat":
+                manager.presence.touch(user_id, active=bool(data.get("active", True)), heartbeat=True)
+                continue
+            manager.presence.touch(user_id)
             
-            # Group chat actions
-            elif action == "join_group":
-                # Subscribe to group messages
+            # Typing is handled inline, ahead of any pending writes; every other
+            # action goes through the dispatcher
+            if action == "typing_in_group":
+                # Throttled and merged into periodic users_typing frames
                 group_id = data.get("group_id")
-                manager.subscribe_to_group(user_id, group_id)
-                await manager.send_personal_message({
-                    "type": "group_joined",
-                    "group_id": group_id
-                }, user_id)
+                if group_id:
+                    await manager.send_typing(group_id, user_id)
             
-            elif action == "leave_group":
-                # Unsubscribe from group messages
-                group_id = data.get("group_id")
-                manager.unsubscribe_from_group(user_id, group_id)
-                await manager.send_personal_message({
-                    "type": "group_left",
-                    "group_id": group_id
-                }, user_id)
+            elif action == "presence_query":
+                # {"action": "presence_query", "user_ids": [...]} -> this socket only.
+                # Checking who the user may see can hit the database, so it runs on its
+                # own "presence" channel rather than inline: it never waits behind a
+                # slow conversation or group write, and never blocks the receive loop.
+                user_ids = [str(u) for u in (data.get("user_ids") or [])][:MAX_PRESENCE_QUERY]
+                await dispatcher.submit(
+                    "presence", action,
+                    lambda user_ids=user_ids: query_presence(user_id, connection, user_ids)
+                )
             
-            elif action == "send_group_message":
-                group_id = data.get("group_id")
-                content = data.get("content")
-                attachment_id = data.get("attachment_id")  # Get attachment_id if present
-                
-                try:
-                    # Save message to database
-                    message = await ChatGroupService.send_group_message(group_id, user_id, content)
-                    
-                    # If attachment_id is provided, link it to this message
-                    if attachment_id:
-                        try:
-                            supabase.table("group_attachments").update({
-                                "message_id": str(message["id"])
-                            }).eq("id", attachment_id).execute()
-                            
-                            # Fetch attachment data to include in broadcast
-                            attachment_response = supabase.table("group_attachments").select(
-                                "id, file_name, file_type, file_size, uploader_id, created_at, file_path"
-                            ).eq("id", attachment_id).execute()
-                            
-                            if attachment_response.data and len(attachment_response.data) > 0:
-                                attachment = attachment_response.data[0]
-                                
-                                # Generate file URL
-                                bucket_name = "message"
-                                file_path = attachment.get("file_path")
-                                if file_path:
-                                    public_url = supabase.storage.from_(bucket_name).get_public_url(file_path)
-                                    attachment["file_url"] = public_url
-                                    print("Generated file URL (WebSocket):", public_url)
-                                
-                                # Get uploader username
-                                uploader_response = supabase.table("profiles").select(
-                                    "username"
-                                ).eq("id", attachment["uploader_id"]).execute()
-                                
-                                if uploader_response.data and len(uploader_response.data) > 0:
-                                    attachment["uploader_username"] = uploader_response.data[0].get("username")
-                                
-                                # Add attachment to message
-                                message["attachment"] = attachment
-                        except Exception as e:
-                            print(f"Error linking attachment: {e}")
-                    
-                    # Broadcast to all group members
-                    message_data = {
-                        "type": "new_group_message",
-                        "message": {
-                            "id": str(message["id"]),
-                            "group_id": str(message["group_id"]),
-                            "sender_id": str(message["sender_id"]),
-                            "content": message["content"],
-                            "created_at": message["created_at"],
-                            "attachment": message.get("attachment")  # Include attachment if present
-                        }
-                    }
-                    
-                    # Send to all subscribed members
-                    await manager.send_group_message(message_data, group_id)
-                except Exception as e:
-                    print(f"Error sending group message: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    await manager.send_personal_message({
-                        "type": "error",
-                        "message": f"Failed to send message: {str(e)}"
-                    }, user_id)
+            elif action == "resume":
+                # {"action": "resume", "streams": {"group:<id>": last_seq, "conversation:<id>": last_seq}}
+                # Sent after reconnecting (and re-joining groups) to get only the missed events.
+                # Each stream is ordered behind that channel's pending actions (e.g. join_group).
+                streams = list((data.get("streams") or {}).items())[:MAX_RESUME_STREAMS]
+                for stream, last_seq in streams:
+                    await dispatcher.submit(
+                        str(stream), action,
+                        lambda stream=stream, last_seq=last_seq: resume_stream(user_id, connection, stream, last_seq)
+                    )
             
-            elif action == "typing_in_group":
-                # Broadcast typing indicator to group
-                group_id = data.get("group_id")
-                typing_data = {
-                    "type": "user_typing",
-                    "group_id": group_id,
-                    "user_id": user_id
-                }
-                await manager.send_group_message(typing_data, group_id)
+            elif action:
+                await dispatcher.submit(action_channel(data), action, lambda data=data: handle_action(user_id, connection, data))
                 
     except WebSocketDisconnect:
-        manager.disconnect(user_id)
+        await manager.disconnect(user_id, websocket)
     except Exception as e:
         print(f"WebSocket error: {e}")
-        manager.disconnect(user_id)
+        await manager.disconnect(user_id, websocket)
+    finally:
+        await dispatcher.drain(WS_ACTION_DRAIN_SECONDS)
+
+
+def action_channel(data: dict) -> Optional[str]:
+    """Ordering key of an action: its conversation or group stream"""
+    if data.get("conversation_id"):
+        return f"conversation:{data['conversation_id']}"
+    if data.get("group_id"):
+        return f"group:{data['group_id']}"
+    return None
+
+
+async def resume_stream(user_id: str, connection, stream: str, last_seq):
+    try:
+        result = await ResumeService.resume_stream(user_id, stream, int(last_seq))
+    except HTTPException as e:
+        result = {"type": "resume_result", "stream": stream, "error": e.detail, "events": [], "has_more": True}
+    except Exception as e:
+        print(f"Error resuming {stream}: {e}")
+        result = {"type": "resume_result", "stream": stream, "error": "resume failed", "events": [], "has_more": True}
+    # Only this socket reconnected - the user's other devices are current
+    connection.send(result)
+
+
+async def query_presence(user_id: str, connection, user_ids: List[str]):
+    connection.send({
+        "type": "presence_result",
+        "users": await manager.presence.visible_presence(user_id, user_ids)
+    })
+
+
+async def handle_action(user_id: str, connection, data: dict):
+    """One database-backed socket action, run by the connection's dispatcher"""
+    action = data.get("action")
+    
+    if action == "send_message":
+        conversation_id = data.get("conversation_id")
+        content = data.get("content")
+        
+        # Save message to database
+        message = await ChatService.send_message(conversation_id, user_id, content)
+        
+        # Get the other participant
+        conversation = await ChatService.get_conversation_details(conversation_id, user_id)
+        other_user_id = (
+            conversation["participant2_id"] 
+            if conversation["participant1_id"] == user_id 
+            else conversation["participant1_id"]
+        )
+        
+        # Send to both users (sequenced, so a reconnect can resume it)
+        message_data = new_message_event(message)
+        stream = f"conversation:{conversation_id}"
+        
+        await manager.send_personal_message(message_data, user_id, stream=stream)
+        
+        await manager.send_personal_message(message_data, str(other_user_id), stream=stream)
+    
+    elif action == "mark_read":
+        # ChatService pushes the new unread count to the user's sockets
+        conversation_id = data.get("conversation_id")
+        await ChatService.mark_messages_as_read(conversation_id, user_id)
+    
+    # Group chat actions
+    elif action == "join_group":
+        # Subscribe to group messages
+        group_id = data.get("group_id")
+        await manager.subscribe_to_group(user_id, group_id, connection)
+        connection.send({
+            "type": "group_joined",
+            "group_id": group_id
+        })
+    
+    elif action == "leave_group":
+        # Unsubscribe from group messages
+        group_id = data.get("group_id")
+        await manager.unsubscribe_from_group(user_id, group_id, connection)
+        connection.send({
+            "type": "group_left",
+            "group_id": group_id
+        })
+    
+    elif action == "send_group_message":
+        group_id = data.get("group_id")
+        content = data.get("content")
+        attachment_id = data.get("attachment_id")  # Get attachment_id if present
+        
+        try:
+            # Save message to database
+            message = await ChatGroupService.send_group_message(group_id, user_id, content)
+            
+            # If attachment_id is provided, link it to this message
+            if attachment_id:
+                try:
+                    attachment = await ChatGroupService.link_attachment(
+                        attachment_id, message["id"], group_id, user_id
+                    )
+                    if attachment:
+                        message["attachment"] = attachment
+                except Exception as e:
+                    print(f"Error linking attachment: {e}")
+            
+            # Broadcast to all group members (attachment included if present)
+            message_data = new_group_message_event(message)
+            
+            # Send to all subscribed members
+            await manager.send_group_message(message_data, group_id)
+        except Exception as e:
+            print(f"Error sending group message: {e}")
+            import traceback
+            traceback.print_exc()
+            await manager.send_personal_message({
+                "type": "error",
+                "message": f"Failed to send message: {str(e)}"
+            }, user_id)
+
 
 @router.get("/chat/conversations", response_model=ConversationListOut)
 async def get_conversations(current_user=Depends(get_current_user)):
@@ -249,10 +233,19 @@ async def get_messages(
     conversation_id: str, 
     limit: int = 20,
     offset: int = 0,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
     current_user=Depends(get_current_user)
 ):
-    """Get messages in a conversation with pagination"""
-    return await ChatService.get_conversation_messages(conversation_id, current_user.id, limit, offset)
+    """
+    Get messages in a conversation with pagination
+
+    Pass `before` (older) or `after` (newer) with a cursor from a previous
+    page for keyset pagination; otherwise limit/offset is used.
+    """
+    return await ChatService.get_conversation_messages(
+        conversation_id, current_user.id, limit, offset, before=before, after=after
+    )
 
 @router.get("/chat/conversations/{conversation_id}/title")
 async def get_conversation_title(conversation_id: str, current_user=Depends(get_current_user)):
@@ -270,7 +263,7 @@ async def get_conversation_title(conversation_id: str, current_user=Depends(get_
         # Get other user's profile
         from app.core.supabase import supabase
         profile = (
-            supabase.table("profiles")
+            await supabase.table("profiles")
             .select("username")
             .eq("id", other_user_id)
             .execute()
@@ -7,7 +7,7 @@ from app.schemas.chatgroups import (
     GroupAttachmentOut, GroupAttachmentListOut, AvailableUsersListOut
 )
 from app.services.chatgroupservices import ChatGroupService
-from typing import List
+from typing import List, Optional
 
 router = APIRouter()
 
@@ -158,16 +158,23 @@ async def get_group_messages(
     group_id: str,
     current_user=Depends(get_current_user),
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    before: Optional[str] = None,
+    after: Optional[str] = None
 ):
     """
     Get messages from a chat group
+
+    Pass `before` (older) or `after` (newer) with a cursor from a previous
+    page for keyset pagination; otherwise limit/offset is used.
     """
     return await ChatGroupService.get_group_messages(
         group_id, 
         current_user.id, 
         limit, 
-        offset
+        offset,
+        before=before,
+        after=after
     )
 
 @router.post("/chatgroups/{group_id}/messages", response_model=GroupMessegeOut)
@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.core.ai_memory import memory_ready, memory_status
+
+router = APIRouter()
+
+@router.get("/health/ready")
+async def readiness():
+    """
+    503 while the startup warmup is still loading the AI memory model, 200
+    otherwise (warmup off, finished or failed, or memory disabled) - for
+    load balancers that should hold AI traffic off a freshly started worker
+    """
+    ready = memory_ready()
+    return JSONResponse(
+        {"status": "ready" if ready else "warming_up", "memory": memory_status()},
+        status_code=200 if ready else 503,
+    )
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends
+from app.core.ai_memory import memory_stats
+from app.core.security import get_current_user, token_cache
+from app.core.membership import membership_stats
+from app.core.metrics import loop_lag, process_rss_bytes
+from app.core.profile_loader import profile_cache
+from app.services.connection_manager import manager
+
+router = APIRouter()
+
+@router.get("/metrics/cache")
+async def get_cache_metrics(current_user=Depends(get_current_user)):
+    """
+    Hit rate and size of the in-process caches in this worker
+    """
+    return {
+        "auth_tokens": token_cache.stats(),
+        "group_membership": membership_stats(),
+        "profiles": profile_cache.stats(),
+    }
+
+@router.get("/metrics/realtime")
+async def get_realtime_metrics(current_user=Depends(get_current_user)):
+    """
+    WebSocket connections, outbound queue health, per-group fan-out
+    latency (publish -> written to socket), event-loop lag and memory for
+    this worker
+    """
+    return {
+        **manager.stats(),
+        "event_loop_lag": loop_lag.summary(),
+        "process_rss_bytes": process_rss_bytes(),
+    }
+
+@router.get("/metrics/memory")
+async def get_memory_metrics(current_user=Depends(get_current_user)):
+    """
+    AI memory writer queue and batch counters for this worker, and the
+    memory table's rows, fragments, versions and indexes
+    """
+    return memory_stats()
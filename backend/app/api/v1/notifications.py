@@ -4,7 +4,6 @@ from app.schemas.notification import NotificationResponse, NotificationUpdate
 from app.core.security import get_current_user
 from app.core.supabase import supabase
 from datetime import datetime
-import asyncio
 
 router = APIRouter()
 
@@ -25,9 +24,8 @@ async def get_user_notifications(
         if unread_only:
             query = query.eq("is_read", False)
         
-        response = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: query.order("created_at", desc=True).limit(limit).execute()
+        response = await (
+            query.order("created_at", desc=True).limit(limit).execute()
         )
         
         return response.data
@@ -48,9 +46,8 @@ async def mark_notification_read(
         user_id = current_user["sub"]
         
         # Update notification
-        response = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: supabase.table("notifications")
+        response = await (
+            supabase.table("notifications")
             .update({
                 "is_read": True,
                 "read_at": datetime.utcnow().isoformat()
@@ -85,9 +82,8 @@ async def delete_notification(
     try:
         user_id = current_user["sub"]
         
-        response = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: supabase.table("notifications")
+        response = await (
+            supabase.table("notifications")
             .delete()
             .eq("id", notification_id)
             .eq("user_id", user_id)
@@ -110,9 +106,8 @@ async def mark_all_notifications_read(
     try:
         user_id = current_user["sub"]
         
-        response = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: supabase.table("notifications")
+        response = await (
+            supabase.table("notifications")
             .update({
                 "is_read": True,
                 "read_at": datetime.utcnow().isoformat()
@@ -143,9 +138,8 @@ async def get_unread_count(
     try:
         user_id = current_user["sub"]
         
-        response = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: supabase.table("notifications")
+        response = await (
+            supabase.table("notifications")
             .select("id", count="exact")
             .eq("user_id", user_id)
             .eq("is_read", False)
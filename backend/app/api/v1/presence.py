@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Depends
+from app.core.security import get_current_user
+from app.schemas.presence import PresenceQuery, PresenceResponse
+from app.services.connection_manager import manager
+
+router = APIRouter()
+
+@router.post("/presence/query", response_model=PresenceResponse)
+async def query_presence(query: PresenceQuery, current_user=Depends(get_current_user)):
+    """
+    Presence of up to 500 users at once, served from this worker's shared
+    presence view. Only friends and people sharing a group with the caller
+    are reported; anyone else reads as offline.
+    """
+    return {"users": await manager.presence.visible_presence(current_user.id, query.user_ids)}
@@ -1,89 +1,636 @@
 """
 AI Memory Service using Vector Embeddings with LanceDB
+
+The embedding model and the LanceDB table are loaded on first use (or by
+the optional warmup at startup), not at import, so importing this module
+- and every service that does - stays cheap.
 """
 from typing import Dict, Optional, List
-import lancedb
-from sentence_transformers import SentenceTransformer
+import asyncio
 import json
-from datetime import datetime
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
 import uuid
 
-# Initialize LanceDB connection and model
-try:
-    db = lancedb.connect("./memory_db")
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    
-    # Get or create memory table
-    if "memory" not in db.table_names():
-        # Create schema and table if it doesn't exist
-        import pyarrow as pa
-        schema = pa.schema([
+from app.core.config import (
+    MEMORY_DB_PATH,
+    MEMORY_EMBEDDING_BACKEND,
+    MEMORY_EMBEDDING_RETRY_SECONDS,
+    MEMORY_EMBEDDING_SERVER,
+    MEMORY_INDEX_MIN_ROWS,
+    MEMORY_INDEX_REBUILD_GROWTH,
+    MEMORY_MAINTENANCE_INTERVAL_SECONDS,
+    MEMORY_SEARCH_NPROBES,
+    MEMORY_SEARCH_REFINE_FACTOR,
+    MEMORY_MODEL_NAME,
+    MEMORY_ONNX_FILE,
+    MEMORY_VERSION_RETENTION_HOURS,
+    MEMORY_WARMUP,
+    MEMORY_WRITE_BATCH_SIZE,
+    MEMORY_WRITE_MAX_WAIT_MS,
+    MEMORY_WRITE_QUEUE_SIZE,
+)
+
+# Metadata keys stored as their own columns so searches can prefilter on them
+FILTER_COLUMNS = ("group_id", "type", "assignment_id", "question_id")
+
+
+def _memory_schema():
+    import pyarrow as pa
+    return pa.schema(
+        [
             ("id", pa.string()),
             ("text", pa.string()),
             ("vector", pa.list_(pa.float32(), 384)),
             ("timestamp", pa.string()),
-            ("metadata", pa.string())
-        ])
-        db.create_table("memory", schema=schema)
-    
-    memory_table = db.open_table("memory")
-    MEMORY_ENABLED = True
-except Exception as e:
-    print(f"⚠️ Memory DB initialization failed: {str(e)}")
-    print("Memory storage will be disabled")
+            ("metadata", pa.string()),
+        ]
+        + [(column, pa.string()) for column in FILTER_COLUMNS]
+    )
+
+
+def _filter_values(metadata: Optional[Dict]) -> Dict:
+    metadata = metadata or {}
+    return {
+        column: str(metadata[column]) if metadata.get(column) is not None else None
+        for column in FILTER_COLUMNS
+    }
+
+
+def _migrate_memory_table(db):
+    """
+    Rewrite a memory table created before the filter columns existed,
+    filling them from each row's metadata JSON
+    """
+    import pyarrow as pa
+    table = db.open_table("memory")
+    data = table.to_arrow()
+    print(f"🧠 Migrating memory table ({data.num_rows} rows) to filter columns...")
+    values = {column: [] for column in FILTER_COLUMNS}
+    for raw in data.column("metadata").to_pylist():
+        try:
+            metadata = json.loads(raw or "{}")
+        except ValueError:
+            metadata = {}
+        for column, value in _filter_values(metadata).items():
+            values[column].append(value)
+    for column in FILTER_COLUMNS:
+        if column not in data.column_names:
+            data = data.append_column(column, pa.array(values[column], pa.string()))
+    db.create_table("memory", data=data.select(_memory_schema().names), schema=_memory_schema(), mode="overwrite")
+
+
+# Appends and compaction take turns on the table. Index builds run without
+# it: they commit as a new version alongside concurrent appends, and holding
+# the lock for a whole training run would back the writer up until it drops.
+table_lock = threading.Lock()
+
+# Loaded lazily by get_memory_table() / get_model()
+db = None
+memory_table = None
+model = None
+# Turned off for good if loading fails; callers then skip memory entirely
+MEMORY_ENABLED = True
+_table_load_lock = threading.Lock()
+_model_load_lock = threading.Lock()
+_model_state = "not_loaded"
+_model_backend: Optional[str] = None
+_model_load_seconds: Optional[float] = None
+
+
+def _disable(error: Exception):
+    global MEMORY_ENABLED
     MEMORY_ENABLED = False
-    memory_table = None
+    print(f"⚠️ Memory DB initialization failed: {str(error)}")
+    print("Memory storage will be disabled")
+
+
+def get_memory_table():
+    """Open (creating or migrating if needed) the memory table on first use"""
+    global db, memory_table
+    if memory_table is not None:
+        return memory_table
+    with _table_load_lock:
+        if memory_table is None:
+            try:
+                import lancedb
+                connection = lancedb.connect(MEMORY_DB_PATH)
+                # Get or create memory table
+                if "memory" not in connection.table_names():
+                    connection.create_table("memory", schema=_memory_schema())
+                elif not set(FILTER_COLUMNS) <= set(connection.open_table("memory").schema.names):
+                    _migrate_memory_table(connection)
+                db = connection
+                table = connection.open_table("memory")
+                # Searches use an index built by an earlier run from the start
+                memory_maintainer.adopt(table)
+                memory_table = table
+            except Exception as e:
+                _disable(e)
+                raise
+    return memory_table
+
+
+def load_embedding_model(backend: str = MEMORY_EMBEDDING_BACKEND):
+    """
+    A SentenceTransformer for MEMORY_MODEL_NAME on the chosen inference backend
+
+    - "torch": full-precision PyTorch
+    - "onnx-int8": the same 384-dim model through ONNX Runtime with dynamic
+      int8 quantization (MEMORY_ONNX_FILE), several times cheaper per
+      sentence on CPU. Needs sentence-transformers[onnx]; falls back to
+      torch with a warning if the ONNX model cannot be loaded.
+    """
+    global _model_backend
+    from sentence_transformers import SentenceTransformer
+    if backend == "onnx-int8":
+        try:
+            loaded = SentenceTransformer(
+                MEMORY_MODEL_NAME, backend="onnx", model_kwargs={"file_name": MEMORY_ONNX_FILE}
+            )
+            _model_backend = backend
+            return loaded
+        except Exception as e:
+            print(f"⚠️ ONNX int8 embedding backend unavailable ({e}), using torch")
+    elif backend != "torch":
+        print(f"⚠️ Unknown embedding backend {backend!r}, using torch")
+    _model_backend = "torch"
+    return SentenceTransformer(MEMORY_MODEL_NAME)
+
+
+def get_model():
+    """Load the sentence-transformers model on first use, once per process"""
+    global model, _model_state, _model_load_seconds
+    if model is not None:
+        return model
+    with _model_load_lock:
+        if model is None:
+            _model_state = "loading"
+            started = time.perf_counter()
+            try:
+                model = load_embedding_model()
+            except Exception as e:
+                _model_state = "failed"
+                _disable(e)
+                raise
+            _model_load_seconds = time.perf_counter() - started
+            _model_state = "ready"
+            print(f"🧠 Loaded {MEMORY_MODEL_NAME} ({_model_backend}) in {_model_load_seconds:.1f}s")
+    return model
+
+
+# Shared embedding server, when configured; in-process encoding is the fallback
+_embedding_client = None
+_remote_down_until = 0.0
+
+
+def _remote_client():
+    global _embedding_client
+    if not MEMORY_EMBEDDING_SERVER or time.monotonic() < _remote_down_until:
+        return None
+    if _embedding_client is None:
+        from app.core.embedding_server import EmbeddingClient
+        _embedding_client = EmbeddingClient(MEMORY_EMBEDDING_SERVER)
+    return _embedding_client
+
+
+def encode_texts(texts: List[str]) -> List[List[float]]:
+    """
+    Embed texts (blocking) - on the shared embedding server if one is
+    configured and reachable, otherwise with the in-process model, which is
+    only loaded the first time it is needed
+    """
+    global _remote_down_until, _model_state
+    client = _remote_client()
+    if client is not None:
+        try:
+            vectors = client.encode(texts)
+            if _model_state != "ready":
+                _model_state = "remote"
+            return vectors
+        except Exception as e:
+            # Don't retry on every call while the server is down
+            _remote_down_until = time.monotonic() + MEMORY_EMBEDDING_RETRY_SECONDS
+            if _model_state == "remote":
+                _model_state = "not_loaded"
+            print(f"⚠️ Embedding server unavailable ({e}), encoding in-process")
+    return get_model().encode(texts, batch_size=max(1, len(texts))).tolist()
+
+
+def warm_up():
+    """Open the table and make sure encoding works - remotely or in-process (blocking)"""
+    try:
+        get_memory_table()
+        encode_texts(["warmup"])
+    except Exception:
+        pass
+
+
+def memory_ready() -> bool:
+    """
+    True unless the startup warmup is still running. Without warmup the
+    model loads on first use, so there is nothing to wait for; a warmup
+    that failed also reports ready rather than holding the worker out of
+    rotation for good.
+    """
+    if not MEMORY_ENABLED or _model_state in ("ready", "remote"):
+        return True
+    return _warmup_task is None or _warmup_task.done()
+
+
+def _warmup_state() -> str:
+    if _warmup_task is None:
+        return "off"
+    return "done" if _warmup_task.done() else "running"
+
+
+def memory_status() -> Dict:
+    return {
+        "enabled": MEMORY_ENABLED,
+        "model": MEMORY_MODEL_NAME,
+        "model_state": _model_state,
+        "warmup": _warmup_state(),
+        "backend": _model_backend,
+        "model_load_seconds": round(_model_load_seconds, 3) if _model_load_seconds is not None else None,
+        "embedding_server": MEMORY_EMBEDDING_SERVER or None,
+        "table_open": memory_table is not None,
+    }
+
+
+class EmbeddingWriter:
+    """
+    Single background writer for the memory table
+
+    store_embedding() only queues the text. One thread collects queued texts
+    until it has MEMORY_WRITE_BATCH_SIZE of them or MEMORY_WRITE_MAX_WAIT_MS
+    has passed since the first, encodes them with one model.encode(list)
+    call and appends them with one memory_table.add(), so a burst of messages
+    becomes a few large Lance fragments instead of one per text.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        batch_size: int = MEMORY_WRITE_BATCH_SIZE,
+        max_wait: float = MEMORY_WRITE_MAX_WAIT_MS / 1000,
+        max_queue: int = MEMORY_WRITE_QUEUE_SIZE,
+    ):
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+
+    def submit(self, text: str, metadata: Optional[Dict] = None) -> bool:
+        """Queue one text; False if the queue is full and it was dropped"""
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((text, metadata, datetime.now().isoformat()))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.queued += 1
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued so far has been written"""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """Write what is queued, then stop the writer thread"""
+        if self._thread is None:
+            return
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="memory-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch, waiters, stop = [], [], False
+            deadline = time.monotonic() + self.max_wait
+            while True:
+                if item is self._STOP:
+                    stop = True
+                    break
+                if isinstance(item, threading.Event):
+                    # A flush ends the batch right away
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write(batch)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                return
+
+    def _write(self, batch: List[tuple]):
+        try:
+            texts = [text for text, _, _ in batch]
+            # One forward pass for the whole batch
+            vectors = encode_texts(texts)
+            records = [
+                {
+                    "id": str(uuid.uuid4()),
+                    "text": text,
+                    "vector": vector,
+                    "timestamp": timestamp,
+                    "metadata": json.dumps(metadata) if metadata else "{}",
+                    **_filter_values(metadata),
+                }
+                for (text, metadata, timestamp), vector in zip(batch, vectors)
+            ]
+            table = get_memory_table()
+            with table_lock:
+                table.add(records)
+            self.written += len(records)
+            self.batches += 1
+            print(f"🧠 Stored {len(records)} memories in one batch")
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"⚠️ Memory store error: {str(e)}")
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self.queued,
+            "pending": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+memory_writer = EmbeddingWriter()
+
 
 async def store_embedding(text: str, metadata: Optional[Dict] = None):
     """
     Store text embeddings for semantic search and AI memory (non-blocking)
     
+    The text is queued for the background writer, which encodes and stores
+    it with others arriving around the same time.
+    
     Args:
         text: Text to create embedding from
         metadata: Additional metadata to store with the embedding
     """
-    if not MEMORY_ENABLED:
+    if not MEMORY_ENABLED or not text:
         return
-        
-    try:
-        # Import here to avoid circular dependencies
-        import asyncio
-        from concurrent.futures import ThreadPoolExecutor
-        
-        # Run embedding generation in thread pool to not block
-        def _generate_and_store():
+    
+    if not memory_writer.submit(text, metadata):
+        # Memory storage shouldn't break (or back up) the main flow
+        print("⚠️ Memory write queue full, dropping embedding")
+
+
+class MemoryMaintainer:
+    """
+    Vector index and fragment upkeep for the memory table
+
+    Every MEMORY_MAINTENANCE_INTERVAL_SECONDS, off the event loop:
+    - once the table reaches MEMORY_INDEX_MIN_ROWS, build an IVF-PQ index
+      on the vector plus scalar indexes on the filter columns
+    - otherwise optimize(): compact small fragments, fold rows added since
+      the last build into the existing index, and drop versions older
+      than MEMORY_VERSION_RETENTION_HOURS
+    - retrain the index from scratch when the table has grown by
+      MEMORY_INDEX_REBUILD_GROWTH since it was built, since the partitions
+      were learnt from a much smaller sample (after a restart, growth is
+      measured from the rows the existing index already covers)
+    """
+
+    def __init__(
+        self,
+        min_rows: int = MEMORY_INDEX_MIN_ROWS,
+        rebuild_growth: float = MEMORY_INDEX_REBUILD_GROWTH,
+        interval: float = MEMORY_MAINTENANCE_INTERVAL_SECONDS,
+        retention: timedelta = timedelta(hours=MEMORY_VERSION_RETENTION_HOURS),
+    ):
+        self.min_rows = min_rows
+        self.rebuild_growth = rebuild_growth
+        self.interval = interval
+        self.retention = retention
+        self.indexed_rows = 0
+        self.has_index = False
+        self.last_run: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.last_duration = 0.0
+        self.builds = 0
+        self.optimizations = 0
+        self._checked_index = False
+        self._task = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
             try:
-                # Generate embedding (CPU-intensive, runs in thread)
-                embedding = model.encode(text).tolist()
-                
-                # Create record
-                record = {
-                    "id": str(uuid.uuid4()),
-                    "text": text,
-                    "vector": embedding,
-                    "timestamp": datetime.now().isoformat(),
-                    "metadata": json.dumps(metadata) if metadata else "{}"
-                }
-                
-                # Store in LanceDB
-                memory_table.add([record])
-                
-                print(f"🧠 Stored: {text[:30]}... | {metadata}")
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.maintain)
             except Exception as e:
-                print(f"⚠️ Memory store error: {str(e)}")
-        
-        # Execute in thread pool without blocking
-        loop = asyncio.get_event_loop()
-        loop.run_in_executor(None, _generate_and_store)
-        
-    except Exception as e:
-        # Silently fail - memory storage shouldn't break main flow
-        pass
+                self.last_error = str(e)
+                print(f"⚠️ Memory maintenance failed: {e}")
+
+    def maintain(self):
+        """One maintenance pass (blocking)"""
+        started = time.perf_counter()
+        table = get_memory_table()
+        if not self._checked_index:
+            self.adopt(table)
+        rows = table.count_rows()
+        if rows >= self.min_rows and (
+            not self.has_index or rows >= self.indexed_rows * self.rebuild_growth
+        ):
+            self.build_index(table, rows)
+        else:
+            with table_lock:
+                table.optimize(cleanup_older_than=self.retention)
+            self.optimizations += 1
+        self.last_run = datetime.now().isoformat()
+        self.last_duration = time.perf_counter() - started
+        self.last_error = None
+
+    def build_index(self, table, rows: int):
+        # ~sqrt(n) partitions, 8 dimensions per PQ sub-vector
+        partitions = max(1, int(rows ** 0.5))
+        print(f"🧠 Building memory vector index over {rows} rows ({partitions} partitions)...")
+        with table_lock:
+            table.optimize(cleanup_older_than=self.retention)
+        # Rows appended while the index trains are picked up by the next optimize()
+        table.create_index(
+            metric="L2",
+            vector_column_name="vector",
+            num_partitions=partitions,
+            num_sub_vectors=384 // 8,
+            replace=True,
+        )
+        for column in FILTER_COLUMNS:
+            try:
+                table.create_scalar_index(column, replace=True)
+            except Exception as e:
+                print(f"⚠️ Scalar index on {column} failed: {e}")
+        self.has_index = True
+        self.indexed_rows = rows
+        self.builds += 1
+
+    def adopt(self, table):
+        """
+        Pick up a vector index built by an earlier run of the app, counting
+        the rows it already covers, so a restart does not retrain it
+        """
+        self._checked_index = True
+        try:
+            for index in table.list_indices():
+                if "vector" not in index.columns:
+                    continue
+                index_stats = table.index_stats(index.name)
+                indexed = getattr(index_stats, "num_indexed_rows", None)
+                if indexed is None and isinstance(index_stats, dict):
+                    indexed = index_stats.get("num_indexed_rows")
+                self.has_index = True
+                self.indexed_rows = indexed if indexed is not None else table.count_rows()
+                return
+        except Exception as e:
+            print(f"⚠️ Could not read memory index stats: {e}")
+
+    def stats(self) -> Dict:
+        stats = {
+            "has_vector_index": self.has_index,
+            "indexed_rows_at_build": self.indexed_rows,
+            "index_builds": self.builds,
+            "optimizations": self.optimizations,
+            "last_run": self.last_run,
+            "last_duration_s": round(self.last_duration, 3),
+            "last_error": self.last_error,
+        }
+        table = memory_table
+        if table is None:
+            # Not opened yet - stats should not force a load
+            return stats
+        try:
+            stats["rows"] = table.count_rows()
+            stats["versions"] = len(table.list_versions())
+            stats["fragments"] = len(table.to_lance().get_fragments())
+            indices = {}
+            for index in table.list_indices():
+                index_stats = table.index_stats(index.name)
+                indices[index.name] = vars(index_stats) if hasattr(index_stats, "__dict__") else index_stats
+            stats["indices"] = indices
+        except Exception as e:
+            stats["stats_error"] = str(e)
+        return stats
+
+
+memory_maintainer = MemoryMaintainer()
+_warmup_task: Optional[asyncio.Task] = None
+
+
+def memory_stats() -> Dict:
+    return {
+        **memory_status(),
+        "writer": memory_writer.stats(),
+        "table": memory_maintainer.stats() if MEMORY_ENABLED else None,
+    }
+
+
+async def start_memory(warmup: bool = MEMORY_WARMUP):
+    """
+    Start table maintenance and, if enabled, load the model in the
+    background so the first search or write does not pay for it. Serving
+    does not wait for either.
+    """
+    global _warmup_task
+    if not MEMORY_ENABLED:
+        return
+    await memory_maintainer.start()
+    if warmup and _warmup_task is None:
+        _warmup_task = asyncio.create_task(asyncio.to_thread(warm_up))
+
+
+async def close_memory():
+    """Stop maintenance and write any queued embeddings before shutdown"""
+    if MEMORY_ENABLED:
+        await memory_maintainer.close()
+        await asyncio.to_thread(memory_writer.close, 30)
+
+
+def _sql_literal(value) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+# Prefilter for an empty list of allowed values (SQL has no empty IN ())
+MATCH_NOTHING = "1 = 0"
+
+
+def build_where(filter_metadata: Optional[Dict]) -> Optional[str]:
+    """
+    SQL prefilter for the filter-column keys of filter_metadata; a list or
+    tuple value matches any of its items, so an empty one matches nothing
+    """
+    clauses = []
+    for key, value in (filter_metadata or {}).items():
+        if key not in FILTER_COLUMNS:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            if not value:
+                return MATCH_NOTHING
+            clauses.append(f"{key} IN ({', '.join(_sql_literal(v) for v in value)})")
+        else:
+            clauses.append(f"{key} = {_sql_literal(value)}")
+    return " AND ".join(clauses) or None
+
 
 async def search_similar(query: str, limit: int = 5, filter_metadata: Optional[Dict] = None) -> List[Dict]:
     """
     Search for similar content using embeddings
     
+    Filters on group_id, type, assignment_id and question_id run inside the
+    vector search, so the results are the nearest rows that match rather
+    than the global nearest rows that happen to match. Any other metadata
+    keys are checked afterwards.
+    
     Args:
         query: Search query
         limit: Maximum number of results
@@ -97,33 +644,42 @@ async def search_similar(query: str, limit: int = 5, filter_metadata: Optional[D
         return []
         
     try:
-        # Generate query embedding
-        query_embedding = model.encode(query).tolist()
+        where = build_where(filter_metadata)
+        if where == MATCH_NOTHING:
+            return []
+        
+        def _search():
+            # Generate query embedding
+            query_embedding = encode_texts([query])[0]
+            
+            # Search in LanceDB, prefiltered on the filter columns
+            search = get_memory_table().search(query_embedding)
+            if where:
+                search = search.where(where, prefilter=True)
+            if memory_maintainer.has_index:
+                # Probe more partitions and re-rank with full vectors for recall
+                search = search.nprobes(MEMORY_SEARCH_NPROBES).refine_factor(MEMORY_SEARCH_REFINE_FACTOR)
+            return search.limit(limit).to_list()
+        
+        # Encoding (and a cold model load) must not stall the event loop
+        results = await asyncio.to_thread(_search)
         
-        # Search in LanceDB
-        results = memory_table.search(query_embedding).limit(limit).to_list()
+        remaining = {k: v for k, v in (filter_metadata or {}).items() if k not in FILTER_COLUMNS}
         
         # Parse and format results
         formatted_results = []
         for result in results:
-            metadata = json.loads(result.get("metadata", "{}"))
+            metadata = json.loads(result.get("metadata") or "{}")
             
-            # Apply metadata filter if provided
-            if filter_metadata:
-                if all(metadata.get(k) == v for k, v in filter_metadata.items()):
-                    formatted_results.append({
-                        "text": result["text"],
-                        "metadata": metadata,
-                        "timestamp": result["timestamp"],
-                        "score": result.get("_distance", 0)
-                    })
-            else:
-                formatted_results.append({
-                    "text": result["text"],
-                    "metadata": metadata,
-                    "timestamp": result["timestamp"],
-                    "score": result.get("_distance", 0)
-                })
+            # Apply metadata filters that are not columns
+            if remaining and not all(metadata.get(k) == v for k, v in remaining.items()):
+                continue
+            formatted_results.append({
+                "text": result["text"],
+                "metadata": metadata,
+                "timestamp": result["timestamp"],
+                "score": result.get("_distance", 0)
+            })
         
         print(f"🔍 Found {len(formatted_results)} results for: {query}")
         return formatted_results
@@ -0,0 +1,135 @@
+# app/core/config.py
+
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+
+# Shared HTTP connection pool used by every Supabase call (REST, storage, auth).
+# Size it for the Supabase requests a worker has in flight at once (requests/s
+# x round-trip latency): every request beyond it queues for a free connection.
+# 100 covers ~2000 queries/s at 50 ms; keep-alive follows it so warm
+# connections are not closed and reopened under load.
+SUPABASE_HTTP_MAX_CONNECTIONS = int(os.getenv("SUPABASE_HTTP_MAX_CONNECTIONS", "100"))
+SUPABASE_HTTP_MAX_KEEPALIVE = int(os.getenv("SUPABASE_HTTP_MAX_KEEPALIVE", str(SUPABASE_HTTP_MAX_CONNECTIONS)))
+SUPABASE_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_HTTP_KEEPALIVE_EXPIRY", "30"))
+SUPABASE_HTTP_TIMEOUT = float(os.getenv("SUPABASE_HTTP_TIMEOUT", "30"))
+
+# Local JWT verification - HS256 secret from the Supabase dashboard, or JWKS
+# for projects using asymmetric signing keys. Remote get_user() is the fallback.
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+SUPABASE_JWKS_TTL = float(os.getenv("SUPABASE_JWKS_TTL", "600"))
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+AUTH_TOKEN_CACHE_TTL = float(os.getenv("AUTH_TOKEN_CACHE_TTL", "300"))
+
+# Group membership/role cache used for authorization checks
+MEMBERSHIP_CACHE_SIZE = int(os.getenv("MEMBERSHIP_CACHE_SIZE", "50000"))
+MEMBERSHIP_CACHE_TTL = float(os.getenv("MEMBERSHIP_CACHE_TTL", "60"))
+MEMBERSHIP_NEGATIVE_TTL = float(os.getenv("MEMBERSHIP_NEGATIVE_TTL", "10"))
+
+# Shared profile cache behind the batched profile loader
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "20000"))
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "30"))
+
+# Memoized storage public URLs (keyed by bucket + file_path)
+PUBLIC_URL_CACHE_SIZE = int(os.getenv("PUBLIC_URL_CACHE_SIZE", "10000"))
+
+# Real-time fan-out across workers: "memory" (single process) or "redis"
+# (Redis, or `python -m app.services.broker_hub` as a local stand-in).
+# REALTIME_BROKER_URL accepts redis://host:port or unix:///path/to.sock
+REALTIME_BROKER = os.getenv("REALTIME_BROKER", "memory")
+REALTIME_BROKER_URL = os.getenv("REALTIME_BROKER_URL", "redis://127.0.0.1:6379")
+
+# Per-connection outbound queue and what to do when a client cannot keep up:
+# drop_oldest | coalesce | disconnect
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop_oldest")
+
+# Typing indicators: each user/group publishes at most once per throttle
+# window, and every worker sends subscribers one merged users_typing frame
+# per flush interval. Typers drop out after the TTL without a new event.
+TYPING_THROTTLE_MS = int(os.getenv("TYPING_THROTTLE_MS", "1000"))
+TYPING_FLUSH_INTERVAL_MS = int(os.getenv("TYPING_FLUSH_INTERVAL_MS", "300"))
+TYPING_TTL_MS = int(os.getenv("TYPING_TTL_MS", "3000"))
+
+# Let uvicorn negotiate permessage-deflate with clients that offer it.
+# It saves bandwidth on text-heavy frames but costs CPU for every socket.
+WS_PER_MESSAGE_DEFLATE = os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() in ("1", "true", "yes")
+
+# Outbound micro-batching: while a socket is busy, frames arriving within
+# the window go out together as one {"type": "batch"} frame. An idle socket
+# still gets its first frame immediately. 0 disables batching.
+WS_BATCH_WINDOW_MS = float(os.getenv("WS_BATCH_WINDOW_MS", "10"))
+WS_BATCH_MAX_EVENTS = int(os.getenv("WS_BATCH_MAX_EVENTS", "64"))
+
+# Resumable delivery: recent sequenced events kept per group/conversation so
+# a reconnecting client can be sent just the gap. Larger gaps are read from
+# the database, up to RESUME_MAX_EVENTS, before asking the client to reload.
+REPLAY_BUFFER_EVENTS = int(os.getenv("REPLAY_BUFFER_EVENTS", "256"))
+REPLAY_BUFFER_STREAMS = int(os.getenv("REPLAY_BUFFER_STREAMS", "10000"))
+RESUME_MAX_EVENTS = int(os.getenv("RESUME_MAX_EVENTS", "200"))
+
+# Presence: a user goes idle, then away, after this long without activity,
+# and offline when a heartbeating client stops heartbeating for the timeout.
+# Changes are published once per flush interval, at most once per user per
+# PRESENCE_USER_MIN_INTERVAL_MS, and each worker re-syncs its users every
+# PRESENCE_SYNC_SECONDS so a crashed worker's users eventually drop out.
+PRESENCE_IDLE_SECONDS = float(os.getenv("PRESENCE_IDLE_SECONDS", "120"))
+PRESENCE_AWAY_SECONDS = float(os.getenv("PRESENCE_AWAY_SECONDS", "600"))
+PRESENCE_HEARTBEAT_TIMEOUT_SECONDS = float(os.getenv("PRESENCE_HEARTBEAT_TIMEOUT_SECONDS", "75"))
+PRESENCE_FLUSH_INTERVAL_MS = int(os.getenv("PRESENCE_FLUSH_INTERVAL_MS", "1000"))
+PRESENCE_USER_MIN_INTERVAL_MS = int(os.getenv("PRESENCE_USER_MIN_INTERVAL_MS", "5000"))
+PRESENCE_SYNC_SECONDS = float(os.getenv("PRESENCE_SYNC_SECONDS", "30"))
+# Who hears about a user's presence (their groups and friends), cached per user
+PRESENCE_AUDIENCE_CACHE_SIZE = int(os.getenv("PRESENCE_AUDIENCE_CACHE_SIZE", "50000"))
+PRESENCE_AUDIENCE_TTL = float(os.getenv("PRESENCE_AUDIENCE_TTL", "300"))
+PRESENCE_LAST_SEEN_CACHE_SIZE = int(os.getenv("PRESENCE_LAST_SEEN_CACHE_SIZE", "100000"))
+
+# Actions from one socket run concurrently, in order per conversation/group.
+# Past this many unfinished actions the socket is not read until one completes;
+# on disconnect, unfinished actions get WS_ACTION_DRAIN_SECONDS to complete.
+WS_MAX_INFLIGHT_ACTIONS = int(os.getenv("WS_MAX_INFLIGHT_ACTIONS", "16"))
+WS_ACTION_DRAIN_SECONDS = float(os.getenv("WS_ACTION_DRAIN_SECONDS", "10"))
+
+# AI memory writes: queued texts are embedded and appended to LanceDB in
+# batches of up to MEMORY_WRITE_BATCH_SIZE, or whatever arrived within
+# MEMORY_WRITE_MAX_WAIT_MS of the first one. Texts past the queue size are dropped.
+MEMORY_WRITE_BATCH_SIZE = int(os.getenv("MEMORY_WRITE_BATCH_SIZE", "64"))
+MEMORY_WRITE_MAX_WAIT_MS = float(os.getenv("MEMORY_WRITE_MAX_WAIT_MS", "500"))
+MEMORY_WRITE_QUEUE_SIZE = int(os.getenv("MEMORY_WRITE_QUEUE_SIZE", "10000"))
+
+# AI memory maintenance: an IVF-PQ index is built once the table has
+# MEMORY_INDEX_MIN_ROWS rows and retrained after it grows by the growth factor.
+# In between, each pass compacts fragments, adds new rows to the index and
+# drops table versions older than the retention.
+MEMORY_INDEX_MIN_ROWS = int(os.getenv("MEMORY_INDEX_MIN_ROWS", "20000"))
+MEMORY_INDEX_REBUILD_GROWTH = float(os.getenv("MEMORY_INDEX_REBUILD_GROWTH", "2.0"))
+MEMORY_MAINTENANCE_INTERVAL_SECONDS = float(os.getenv("MEMORY_MAINTENANCE_INTERVAL_SECONDS", "600"))
+MEMORY_VERSION_RETENTION_HOURS = float(os.getenv("MEMORY_VERSION_RETENTION_HOURS", "24"))
+MEMORY_SEARCH_NPROBES = int(os.getenv("MEMORY_SEARCH_NPROBES", "20"))
+MEMORY_SEARCH_REFINE_FACTOR = int(os.getenv("MEMORY_SEARCH_REFINE_FACTOR", "5"))
+
+# AI memory storage and model, loaded on first use. With warmup on, startup
+# loads the model in the background; /api/health/ready reports when it is in.
+MEMORY_DB_PATH = os.getenv("MEMORY_DB_PATH", "./memory_db")
+MEMORY_MODEL_NAME = os.getenv("MEMORY_MODEL_NAME", "all-MiniLM-L6-v2")
+MEMORY_WARMUP = os.getenv("MEMORY_WARMUP", "true").lower() in ("1", "true", "yes")
+
+# Embedding inference: "torch" (full precision) or "onnx-int8" (ONNX Runtime,
+# dynamically quantized). The ONNX file is one of the model repo's exports;
+# pick the avx512_vnni / arm64 variant when the CPUs support it.
+MEMORY_EMBEDDING_BACKEND = os.getenv("MEMORY_EMBEDDING_BACKEND", "torch").lower()
+MEMORY_ONNX_FILE = os.getenv("MEMORY_ONNX_FILE", "onnx/model_quint8_avx2.onnx")
+
+# Shared embedding server (python -m app.core.embedding_server --unix PATH).
+# When MEMORY_EMBEDDING_SERVER is set, workers encode through it and only load
+# the model themselves if it is unreachable, retrying it after the retry delay.
+MEMORY_EMBEDDING_SERVER = os.getenv("MEMORY_EMBEDDING_SERVER", "")
+MEMORY_EMBEDDING_TIMEOUT = float(os.getenv("MEMORY_EMBEDDING_TIMEOUT", "10"))
+MEMORY_EMBEDDING_RETRY_SECONDS = float(os.getenv("MEMORY_EMBEDDING_RETRY_SECONDS", "30"))
+EMBEDDING_SERVER_MAX_BATCH = int(os.getenv("EMBEDDING_SERVER_MAX_BATCH", "128"))
+EMBEDDING_SERVER_MAX_WAIT_MS = float(os.getenv("EMBEDDING_SERVER_MAX_WAIT_MS", "5"))
@@ -0,0 +1,208 @@
+"""
+Local embedding service shared by every uvicorn worker
+
+One process loads the embedding model (on MEMORY_EMBEDDING_BACKEND) and
+encodes for all workers over a Unix socket. Requests that arrive within
+EMBEDDING_SERVER_MAX_WAIT_MS of each other - from any worker - are encoded
+in one batch, so workers neither hold their own copy of the model nor spend
+their GIL on encoding:
+
+    python -m app.core.embedding_server --unix /tmp/unified_hub_embed.sock
+    MEMORY_EMBEDDING_SERVER=/tmp/unified_hub_embed.sock uvicorn app.main:app --workers 4
+
+Wire format (same host, so floats travel in native byte order):
+    request:  >II  request id, body length; body = JSON list of texts
+    response: >IIII request id, count, dim, error length; error (UTF-8);
+              count * dim float32
+"""
+
+import argparse
+import array
+import asyncio
+import itertools
+import json
+import os
+import queue
+import socket
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from app.core.config import (
+    EMBEDDING_SERVER_MAX_BATCH,
+    EMBEDDING_SERVER_MAX_WAIT_MS,
+    MEMORY_EMBEDDING_TIMEOUT,
+)
+
+_REQUEST = struct.Struct(">II")
+_RESPONSE = struct.Struct(">IIII")
+
+
+class EmbeddingServer:
+    """Collects requests from every connection and encodes them in shared batches"""
+
+    def __init__(self, model, max_batch: int = EMBEDDING_SERVER_MAX_BATCH, max_wait: float = EMBEDDING_SERVER_MAX_WAIT_MS / 1000):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending: "asyncio.Queue[Tuple[List[str], asyncio.Future]]" = asyncio.Queue()
+        # One encode at a time; the model uses all cores for each batch
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed")
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Requests on one connection are answered as their batches finish
+        tasks = set()
+        try:
+            while True:
+                request_id, length = _REQUEST.unpack(await reader.readexactly(_REQUEST.size))
+                texts = json.loads(await reader.readexactly(length))
+                task = asyncio.create_task(self._answer(writer, request_id, texts))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _answer(self, writer: asyncio.StreamWriter, request_id: int, texts: List[str]):
+        self.requests += 1
+        future = asyncio.get_running_loop().create_future()
+        await self._pending.put((texts, future))
+        try:
+            vectors = await future
+            count, dim = len(vectors), (len(vectors[0]) if len(vectors) else 0)
+            writer.write(_RESPONSE.pack(request_id, count, dim, 0) + vectors.astype("float32").tobytes())
+        except Exception as e:
+            error = str(e).encode()
+            writer.write(_RESPONSE.pack(request_id, 0, 0, len(error)) + error)
+        await writer.drain()
+
+    async def run_batches(self):
+        while True:
+            batch = [await self._pending.get()]
+            size = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._pending.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            try:
+                vectors = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, lambda: self.model.encode(texts, batch_size=max(1, len(texts)))
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.texts += len(texts)
+            start = 0
+            for item_texts, future in batch:
+                if not future.done():
+                    future.set_result(vectors[start:start + len(item_texts)])
+                start += len(item_texts)
+
+
+class EmbeddingClient:
+    """
+    Blocking client for EmbeddingServer, safe to share between threads
+    (the memory writer thread and search threads each borrow a connection)
+    """
+
+    def __init__(self, path: str, timeout: float = MEMORY_EMBEDDING_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[socket.socket]" = queue.LifoQueue()
+        self._ids = itertools.count(1)
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        connection = self._borrow()
+        try:
+            request_id = next(self._ids) % 2**32
+            body = json.dumps(texts).encode()
+            connection.sendall(_REQUEST.pack(request_id, len(body)) + body)
+            reply_id, count, dim, error_length = _RESPONSE.unpack(self._read(connection, _RESPONSE.size))
+            if error_length:
+                raise RuntimeError(self._read(connection, error_length).decode())
+            values = array.array("f")
+            values.frombytes(self._read(connection, count * dim * 4))
+            if reply_id != request_id:
+                raise RuntimeError("embedding server reply out of order")
+        except BaseException:
+            connection.close()
+            raise
+        self._idle.put(connection)
+        flat = values.tolist()
+        return [flat[i * dim:(i + 1) * dim] for i in range(count)]
+
+    def _borrow(self) -> socket.socket:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.settimeout(self.timeout)
+            connection.connect(self.path)
+            return connection
+
+    @staticmethod
+    def _read(connection: socket.socket, size: int) -> bytes:
+        chunks, remaining = [], size
+        while remaining:
+            chunk = connection.recv(min(remaining, 1 << 20))
+            if not chunk:
+                raise ConnectionError("embedding server closed the connection")
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(chunks)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+async def serve(unix_path: str, backend: Optional[str] = None):
+    from app.core.ai_memory import load_embedding_model
+    from app.core.config import MEMORY_EMBEDDING_BACKEND
+
+    started = time.perf_counter()
+    model = load_embedding_model(backend or MEMORY_EMBEDDING_BACKEND)
+    model.encode(["warmup"])
+    print(f"🧠 Embedding model ready in {time.perf_counter() - started:.1f}s")
+
+    server = EmbeddingServer(model)
+    if os.path.exists(unix_path):
+        os.unlink(unix_path)
+    listener = await asyncio.start_unix_server(server.handle_client, path=unix_path)
+    print(f"🧠 Embedding server listening on unix://{unix_path}")
+    batcher = asyncio.create_task(server.run_batches())
+    async with listener:
+        try:
+            await listener.serve_forever()
+        finally:
+            batcher.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--unix", required=True, help="Unix socket path to listen on")
+    parser.add_argument("--backend", help="torch or onnx-int8 (default: MEMORY_EMBEDDING_BACKEND)")
+    args = parser.parse_args()
+    asyncio.run(serve(args.unix, args.backend))
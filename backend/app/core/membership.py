@@ -0,0 +1,81 @@
+# app/core/membership.py
+
+from typing import Optional
+
+from app.core.cache import TTLCache
+from app.core.config import (
+    MEMBERSHIP_CACHE_SIZE,
+    MEMBERSHIP_CACHE_TTL,
+    MEMBERSHIP_NEGATIVE_TTL,
+)
+from app.core.supabase import supabase
+
+# Cached value for "this user is not in the group" - kept for a shorter TTL
+NOT_A_MEMBER = ""
+
+# (group_id, user_id) -> role
+membership_cache = TTLCache(maxsize=MEMBERSHIP_CACHE_SIZE, ttl=MEMBERSHIP_CACHE_TTL)
+
+_MISSING = object()
+
+
+def _key(group_id, user_id):
+    return (str(group_id), str(user_id))
+
+
+async def get_member_role(group_id, user_id) -> Optional[str]:
+    """
+    Return the user's role in the group, or None if they are not a member
+
+    Served from the membership cache when possible; every write to
+    group_members in ChatGroupService invalidates the affected entries.
+    """
+    key = _key(group_id, user_id)
+    cached = membership_cache.get(key, _MISSING)
+    if cached is not _MISSING:
+        return cached or None
+
+    response = await (
+        supabase
+            .table("group_members")
+            .select("role")
+            .eq("group_id", group_id)
+            .eq("user_id", user_id)
+            .execute()
+    )
+
+    if not response.data:
+        membership_cache.set(key, NOT_A_MEMBER, ttl=MEMBERSHIP_NEGATIVE_TTL)
+        return None
+
+    role = response.data[0].get("role") or "member"
+    membership_cache.set(key, role)
+    return role
+
+
+async def is_group_member(group_id, user_id) -> bool:
+    return await get_member_role(group_id, user_id) is not None
+
+
+async def is_group_admin(group_id, user_id) -> bool:
+    return await get_member_role(group_id, user_id) == "admin"
+
+
+def remember_member_role(group_id, user_id, role: str):
+    """Write-through after this process changed a membership row"""
+    membership_cache.set(_key(group_id, user_id), role)
+
+
+def invalidate_member(group_id, user_id):
+    membership_cache.pop(_key(group_id, user_id))
+
+
+def invalidate_group(group_id):
+    """Drop every cached membership for a group (used when it is deleted)"""
+    group_id = str(group_id)
+    for key in [k for k in membership_cache.keys() if k[0] == group_id]:
+        membership_cache.pop(key)
+
+
+def membership_stats() -> dict:
+    return membership_cache.stats()
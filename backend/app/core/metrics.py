@@ -0,0 +1,122 @@
+# app/core/metrics.py
+
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Hashable, List, Optional
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class LatencyRecorder:
+    """
+    Rolling latency samples per key (e.g. per group), bounded in both the
+    number of keys (LRU) and the samples kept per key
+    """
+
+    def __init__(self, max_keys: int = 1000, samples_per_key: int = 1024):
+        self.max_keys = max_keys
+        self.samples_per_key = samples_per_key
+        self._samples: "OrderedDict[Hashable, Deque[float]]" = OrderedDict()
+        self._counts: Dict[Hashable, int] = {}
+
+    def record(self, key: Hashable, seconds: float):
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = deque(maxlen=self.samples_per_key)
+            self._samples[key] = samples
+            while len(self._samples) > self.max_keys:
+                evicted, _ = self._samples.popitem(last=False)
+                self._counts.pop(evicted, None)
+        else:
+            self._samples.move_to_end(key)
+        samples.append(seconds)
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+    def summary(self, key: Hashable) -> Dict:
+        samples = list(self._samples.get(key, ()))
+        return {
+            "count": self._counts.get(key, 0),
+            "p50_ms": round(percentile(samples, 50) * 1000, 3),
+            "p95_ms": round(percentile(samples, 95) * 1000, 3),
+            "p99_ms": round(percentile(samples, 99) * 1000, 3),
+            "max_ms": round(max(samples) * 1000, 3) if samples else 0.0,
+        }
+
+    def snapshot(self, limit: int = 50) -> Dict[str, Dict]:
+        """Summaries for the most recently active keys"""
+        keys = list(self._samples.keys())[-limit:]
+        return {str(key): self.summary(key) for key in reversed(keys)}
+
+    def clear(self):
+        self._samples.clear()
+        self._counts.clear()
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag: how late a periodic wake-up actually runs.
+    Sustained lag means callbacks (including WebSocket sends) are queuing
+    behind CPU-bound work on the loop.
+    """
+
+    def __init__(self, interval: float = 0.1, samples: int = 600):
+        self.interval = interval
+        self._samples: Deque[float] = deque(maxlen=samples)
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self._samples.append(max(0.0, time.perf_counter() - expected))
+
+    def summary(self) -> Dict:
+        samples = list(self._samples)
+        return {
+            "samples": len(samples),
+            "p50_ms": round(percentile(samples, 50) * 1000, 3),
+            "p99_ms": round(percentile(samples, 99) * 1000, 3),
+            "max_ms": round(max(samples) * 1000, 3) if samples else 0.0,
+        }
+
+
+def process_rss_bytes() -> Optional[int]:
+    """
+    Current resident set size. Falls back to the peak RSS where /proc is
+    missing (macOS), and None where neither is available (Windows).
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is already in bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+loop_lag = LoopLagMonitor()
@@ -0,0 +1,75 @@
+# app/core/pagination.py
+
+import base64
+import uuid
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+
+def encode_cursor(row: Dict) -> str:
+    """Opaque cursor for a row, built from its (created_at, id) sort key"""
+    raw = f"{row['created_at']}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    (created_at, id) of a cursor, re-serialized from a parsed timestamp and
+    UUID so nothing from the client reaches the PostgREST filter verbatim
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        created_at = datetime.fromisoformat(created_at.replace("Z", "+00:00")).isoformat()
+        row_id = str(uuid.UUID(row_id))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return created_at, row_id
+
+
+def _keyset_condition(op: str, cursor: str) -> str:
+    """PostgREST filter for rows strictly before (lt) or after (gt) the cursor"""
+    created_at, row_id = decode_cursor(cursor)
+    return f'created_at.{op}."{created_at}",and(created_at.eq."{created_at}",id.{op}.{row_id})'
+
+
+async def fetch_keyset_page(
+    query,
+    limit: int,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+) -> Dict:
+    """
+    Run one keyset page of a filtered select on (created_at, id)
+
+    `before` walks back into history, `after` fetches newer rows, neither
+    returns the latest page. One extra row is fetched to decide has_more, so
+    the cost does not depend on how deep the cursor is. Rows come back
+    oldest first, matching how the chat UI renders them.
+    """
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+
+    if after:
+        query = query.or_(_keyset_condition("gt", after)).order("created_at").order("id")
+    else:
+        if before:
+            query = query.or_(_keyset_condition("lt", before))
+        query = query.order("created_at", desc=True).order("id", desc=True)
+
+    response = await query.limit(limit + 1).execute()
+    rows = response.data or []
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not after:
+        rows.reverse()
+
+    return {
+        "rows": rows,
+        "has_more": has_more,
+        "before_cursor": encode_cursor(rows[0]) if rows else None,
+        "after_cursor": encode_cursor(rows[-1]) if rows else None,
+    }
@@ -0,0 +1,91 @@
+# app/core/profile_loader.py
+
+import asyncio
+from typing import Dict, Iterable, List, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL
+from app.core.supabase import supabase
+
+# user_id -> profile row, shared by every request in this worker
+profile_cache = TTLCache(maxsize=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL)
+
+
+class ProfileLoader:
+    """
+    Request-scoped profile batcher (DataLoader style)
+
+    Every load() issued before the event loop next gets control is collected
+    and resolved together: cached profiles come from profile_cache and the
+    rest are fetched with a single `id in (...)` query. Results are memoized
+    for the lifetime of the loader, so create one per request.
+    """
+
+    def __init__(self):
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._queue: List[str] = []
+
+    async def load(self, user_id) -> Optional[Dict]:
+        if not user_id:
+            return None
+
+        user_id = str(user_id)
+        future = self._futures.get(user_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._futures[user_id] = future
+            if not self._queue:
+                asyncio.get_running_loop().call_soon(
+                    lambda: asyncio.ensure_future(self._dispatch())
+                )
+            self._queue.append(user_id)
+
+        return await future
+
+    async def load_many(self, user_ids: Iterable) -> Dict[str, Optional[Dict]]:
+        unique_ids = list(dict.fromkeys(str(u) for u in user_ids if u))
+        profiles = await asyncio.gather(*[self.load(u) for u in unique_ids])
+        return dict(zip(unique_ids, profiles))
+
+    async def _dispatch(self):
+        batch, self._queue = self._queue, []
+
+        missing = []
+        for user_id in batch:
+            profile = profile_cache.get(user_id)
+            if profile is not None:
+                self._futures[user_id].set_result(profile)
+            else:
+                missing.append(user_id)
+
+        if not missing:
+            return
+
+        try:
+            response = await (
+                supabase
+                    .table("profiles")
+                    .select("*")
+                    .in_("id", missing)
+                    .execute()
+            )
+            found = {str(row["id"]): row for row in (response.data or [])}
+        except Exception as e:
+            print(f"⚠️ Profile batch load failed: {e}")
+            found = {}
+
+        for user_id in missing:
+            profile = found.get(user_id)
+            if profile is not None:
+                profile_cache.set(user_id, profile)
+            self._futures[user_id].set_result(profile)
+
+
+def remember_profile(profile: Dict):
+    """Write-through after a profile row was created or updated"""
+    if profile and profile.get("id"):
+        profile_cache.set(str(profile["id"]), profile)
+
+
+def invalidate_profile(user_id):
+    profile_cache.pop(str(user_id))
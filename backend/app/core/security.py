@@ -1,24 +1,168 @@
 # app/core/security.py
 
+import asyncio
+import hashlib
+import time
+from typing import Any, Dict, Optional
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from supabase import create_client, Client
-import os
-from dotenv import load_dotenv
-
+from jose import jwt, JWTError
+from app.core.cache import TTLCache
+from app.core.config import (
+    SUPABASE_URL,
+    SUPABASE_SERVICE_ROLE_KEY,
+    SUPABASE_JWT_SECRET,
+    SUPABASE_JWT_AUDIENCE,
+    SUPABASE_JWKS_TTL,
+    AUTH_TOKEN_CACHE_SIZE,
+    AUTH_TOKEN_CACHE_TTL,
+)
+from app.core.supabase import supabase, http_client
 
-load_dotenv()
 
 security = HTTPBearer()
 
-# Initialize Supabase client
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+JWKS_MIN_REFRESH_INTERVAL = 30.0
+
+# Decoded claims keyed by sha256(token). Entries never outlive the token's exp,
+# and the TTL bounds how long a revoked session can keep working.
+token_cache = TTLCache(maxsize=AUTH_TOKEN_CACHE_SIZE, ttl=AUTH_TOKEN_CACHE_TTL)
+
+_jwks: Dict[str, Dict[str, Any]] = {}
+_jwks_fetched_at = 0.0
+_jwks_lock = asyncio.Lock()
+
+
+class AuthenticatedUser(dict):
+    """
+    Verified token claims
+
+    Supports both `user.id` and `user["id"]` / `user["sub"]` so existing
+    routes keep working whichever style they use.
+    """
+
+    def __init__(self, claims: Dict[str, Any]):
+        super().__init__(claims)
+        self["id"] = claims["sub"]
+
+    @property
+    def id(self) -> str:
+        return self["sub"]
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
 
-if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
-    raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set in environment variables")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def _refresh_jwks():
+    """Fetch the project's public signing keys, at most once per interval"""
+    global _jwks, _jwks_fetched_at
+
+    async with _jwks_lock:
+        if time.monotonic() - _jwks_fetched_at < JWKS_MIN_REFRESH_INTERVAL:
+            return
+
+        _jwks_fetched_at = time.monotonic()
+        try:
+            response = await http_client.get(
+                f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json",
+                headers={"apikey": SUPABASE_SERVICE_ROLE_KEY},
+            )
+            response.raise_for_status()
+            _jwks = {key["kid"]: key for key in response.json().get("keys", []) if "kid" in key}
+        except Exception as e:
+            print(f"⚠️ JWKS fetch failed: {e}")
+
+
+async def _get_signing_key(kid: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not kid:
+        return None
+
+    if kid not in _jwks or time.monotonic() - _jwks_fetched_at > SUPABASE_JWKS_TTL:
+        await _refresh_jwks()
+
+    return _jwks.get(kid)
+
+
+async def _verify_locally(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Verify the token signature without calling the auth server
+
+    Returns None when no local key is available for this token so the caller
+    can fall back to the remote check. Raises JWTError for bad tokens.
+    """
+    header = jwt.get_unverified_header(token)
+    algorithm = header.get("alg")
+
+    if algorithm == "HS256":
+        if not SUPABASE_JWT_SECRET:
+            return None
+        key = SUPABASE_JWT_SECRET
+    elif algorithm in ASYMMETRIC_ALGORITHMS:
+        key = await _get_signing_key(header.get("kid"))
+        if key is None:
+            return None
+    else:
+        raise JWTError(f"Unsupported token algorithm: {algorithm}")
+
+    return jwt.decode(token, key, algorithms=[algorithm], audience=SUPABASE_JWT_AUDIENCE)
+
+
+async def _verify_remotely(token: str) -> Optional[Dict[str, Any]]:
+    user_response = await supabase.auth.get_user(token)
+    if not user_response or not user_response.user:
+        return None
+
+    user = user_response.user
+    return {
+        "sub": user.id,
+        "email": user.email,
+        "role": user.role,
+        "aud": user.aud,
+        "app_metadata": user.app_metadata,
+        "user_metadata": user.user_metadata,
+    }
+
+
+async def verify_token(token: str) -> Optional[AuthenticatedUser]:
+    """
+    Resolve a Supabase access token to its user, or None if it is invalid
+
+    Checks the claims cache first, then verifies the signature locally, and
+    only asks the auth server when no local key can verify the token.
+    """
+    cache_key = _token_key(token)
+    cached = token_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        claims = await _verify_locally(token)
+    except JWTError as e:
+        print(f"❌ Token rejected: {e}")
+        return None
+
+    if claims is None:
+        claims = await _verify_remotely(token)
+        if claims is None:
+            return None
+
+    user = AuthenticatedUser(claims)
+
+    ttl = AUTH_TOKEN_CACHE_TTL
+    if claims.get("exp"):
+        ttl = min(ttl, claims["exp"] - time.time())
+    token_cache.set(cache_key, user, ttl=ttl)
+
+    return user
 
 
 async def get_current_user(
@@ -30,18 +174,20 @@ async def get_current_user(
     token = credentials.credentials
 
     try:
-        
-        user_response = supabase.auth.get_user(token)
-        
-        if not user_response.user:
+
+        user = await verify_token(token)
+
+        if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid or expired token",
             )
 
-        
-        return user_response.user
 
+        return user
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
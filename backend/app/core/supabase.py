@@ -1,16 +1,72 @@
 # app/core/supabase.py
 
-from supabase import create_client, Client
-import os
-from dotenv import load_dotenv
+from functools import lru_cache
 
-load_dotenv()
-
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+import httpx
+from yarl import URL
+from supabase import AsyncClient
+from supabase.lib.client_options import AsyncClientOptions
+from app.core.config import (
+    SUPABASE_URL,
+    SUPABASE_SERVICE_ROLE_KEY,
+    SUPABASE_HTTP_MAX_CONNECTIONS,
+    SUPABASE_HTTP_MAX_KEEPALIVE,
+    SUPABASE_HTTP_KEEPALIVE_EXPIRY,
+    SUPABASE_HTTP_TIMEOUT,
+    PUBLIC_URL_CACHE_SIZE,
+)
 
 if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
     raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
 
-# Create Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Build the pooled keep-alive HTTP client shared by every Supabase sub-client
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=SUPABASE_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=SUPABASE_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=SUPABASE_HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(SUPABASE_HTTP_TIMEOUT),
+        follow_redirects=True,
+    )
+
+
+# One connection pool for the whole process
+http_client: httpx.AsyncClient = create_http_client()
+
+# Async Supabase client - PostgREST, storage and auth all reuse http_client
+supabase: AsyncClient = AsyncClient(
+    SUPABASE_URL,
+    SUPABASE_SERVICE_ROLE_KEY,
+    AsyncClientOptions(
+        httpx_client=http_client,
+        auto_refresh_token=False,
+        persist_session=False,
+    ),
+)
+
+
+_storage_base_url = URL(f"{SUPABASE_URL.rstrip('/')}/storage/v1/")
+
+
+@lru_cache(maxsize=PUBLIC_URL_CACHE_SIZE)
+def get_public_url(bucket: str, file_path: str) -> str:
+    """
+    Public URL for a storage object, built locally and memoized per path
+
+    Same result as `await supabase.storage.from_(bucket).get_public_url(path)`
+    without building a bucket client for every attachment.
+    """
+    parts = URL(file_path).parts
+    if parts and parts[0] == "/":
+        parts = parts[1:]
+    return str(_storage_base_url.joinpath("object", "public", bucket, *parts))
+
+
+async def close_supabase():
+    """Release pooled connections on application shutdown"""
+    await http_client.aclose()
@@ -1,17 +1,43 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.supabase import close_supabase
+from app.core.ai_memory import close_memory, start_memory
+from app.core.metrics import loop_lag
 from app.api.v1.profile import router as profile_router
 from app.api.v1.chatgroups import router as chatgroup_router
 from app.api.v1.friends import router as friend_router
 from app.api.v1.users import router as users_router
 from app.api.v1.chat import router as chat_router
+from app.services.connection_manager import manager as connection_manager
 from app.api.v1.chatgroups import router as chatgroup_router
 from app.api.v1.ai_chat import router as ai_chat_router
 
 from app.api.v1.question_sheets import router as question_sheets_router
 from app.api.v1.notifications import router as notifications_router
 from app.api.v1.assignments import router as assignments_router
-app = FastAPI(title="Unified Hub Backend 🚀")
+from app.api.v1.metrics import router as metrics_router
+from app.api.v1.presence import router as presence_router
+from app.api.v1.health import router as health_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Connect the real-time broker before accepting WebSockets
+    await connection_manager.start()
+    await loop_lag.start()
+    # AI memory table upkeep, and the embedding model warming up in the background
+    await start_memory()
+    yield
+    await loop_lag.close()
+    await connection_manager.close()
+    # Write embeddings still queued for the AI memory
+    await close_memory()
+    # Close the shared Supabase connection pool
+    await close_supabase()
+
+
+app = FastAPI(title="Unified Hub Backend 🚀", lifespan=lifespan)
 
 
 app.add_middleware(
@@ -31,6 +57,9 @@ app.include_router(ai_chat_router, prefix="/api/ai", tags=["ai-chat"])
 app.include_router(question_sheets_router, prefix="/api", tags=["question-sheets"])
 app.include_router(notifications_router, prefix="/api", tags=["notifications"])
 app.include_router(assignments_router, prefix="/api/v1", tags=["assignments"])
+app.include_router(metrics_router, prefix="/api", tags=["metrics"])
+app.include_router(presence_router, prefix="/api", tags=["presence"])
+app.include_router(health_router, prefix="/api", tags=["health"])
 @app.get("/")
 def root():
     return {
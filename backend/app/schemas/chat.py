@@ -13,6 +13,7 @@ class Message(BaseModel):
     content: str
     created_at: datetime
     read_at: Optional[datetime] = None
+    seq: Optional[int] = None  # Per-conversation sequence, sent back in a WebSocket resume
 
 class ConversationParticipant(BaseModel):
     id: UUID
@@ -25,6 +25,7 @@ class GroupMessegeOut(BaseModel):
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
     attachment: Optional[dict] = None  # Added to support attachment data
+    seq: Optional[int] = None  # Per-group sequence, sent back in a WebSocket resume
 class MemberOut(BaseModel):
     id: UUID
     group_id: UUID
@@ -56,6 +57,12 @@ class ChatGroupUpdate(BaseModel):
 class GroupMesegeListOut(BaseModel):
     count: int
     messages: List[GroupMessegeOut]
+    total_count: Optional[int] = None  # Only for offset pagination
+    limit: Optional[int] = None
+    offset: Optional[int] = None
+    has_more: bool = False
+    before_cursor: Optional[str] = None  # Pass as ?before= to load older messages
+    after_cursor: Optional[str] = None  # Pass as ?after= to load newer messages
 
 # Document/Attachment Schemas
 class GroupAttachmentOut(BaseModel):
@@ -0,0 +1,14 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+
+from app.services.presence import MAX_PRESENCE_QUERY
+
+class PresenceQuery(BaseModel):
+    user_ids: List[str] = Field(..., max_length=MAX_PRESENCE_QUERY)
+
+class UserPresence(BaseModel):
+    status: str  # online | idle | away | offline
+    last_active_at: Optional[str] = None  # Last activity, or last seen when offline
+
+class PresenceResponse(BaseModel):
+    users: Dict[str, UserPresence]
@@ -0,0 +1,77 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from app.core.config import WS_MAX_INFLIGHT_ACTIONS
+
+ErrorHandler = Callable[[str, Exception], Awaitable[None]]
+
+
+class ActionDispatcher:
+    """
+    Runs one connection's actions concurrently, in order per channel
+
+    - submit() starts the action as a task, so a slow database write does
+      not hold up the socket's other actions
+    - actions with the same channel key (a conversation or group) run one
+      after another in arrival order; different channels run side by side
+    - at most max_in_flight actions are pending at once: submit() waits for
+      a slot, which stops the receive loop reading until one finishes
+    """
+
+    def __init__(self, on_error: Optional[ErrorHandler] = None, max_in_flight: int = WS_MAX_INFLIGHT_ACTIONS):
+        self.on_error = on_error
+        self._slots = asyncio.Semaphore(max_in_flight)
+        # channel key -> last task submitted for it
+        self._tails: Dict[str, asyncio.Task] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.dispatched = 0
+        self.failed = 0
+
+    async def submit(self, channel: Optional[str], action: str, handler: Callable[[], Awaitable[None]]):
+        """Schedule handler() behind earlier actions on the same channel (None: unordered)"""
+        await self._slots.acquire()
+        previous = self._tails.get(channel) if channel else None
+        task = asyncio.create_task(self._run(channel, action, handler, previous))
+        if channel:
+            self._tails[channel] = task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self.dispatched += 1
+
+    async def _run(self, channel, action, handler, previous: Optional[asyncio.Task]):
+        try:
+            if previous is not None:
+                # Its outcome does not matter here, only that it finished first
+                await asyncio.wait([previous])
+            await handler()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            print(f"Error handling {action}: {e}")
+            if self.on_error:
+                try:
+                    await self.on_error(action, e)
+                except Exception:
+                    pass
+        finally:
+            self._slots.release()
+            if channel and self._tails.get(channel) is asyncio.current_task():
+                del self._tails[channel]
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    async def drain(self, timeout: Optional[float] = None):
+        """
+        Let submitted actions finish (a message sent just before the socket
+        closed is still saved and delivered), cancelling any past the timeout
+        """
+        if not self._tasks:
+            return
+        done, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
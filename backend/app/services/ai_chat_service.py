@@ -3,6 +3,7 @@ import os
 from typing import List, Dict
 from datetime import datetime
 from app.core.supabase import supabase
+from app.core.membership import is_group_admin
 
 
 OPENROUTER_API_KEY = os.getenv("OPEN_ROUTER_API_KEY")
@@ -287,7 +288,7 @@ class AIChatService:
                 # If no group_id, get only global chats (where group_id is null)
                 query = query.is_("group_id", "null")
             
-            response = query.order("created_at", desc=True) \
+            response = await query.order("created_at", desc=True) \
                 .limit(limit) \
                 .execute()
             
@@ -316,7 +317,7 @@ class AIChatService:
     async def _get_group_context(self, group_id: str) -> Dict:
         """Get group information for context"""
         try:
-            response = supabase.table("chat_groups") \
+            response = await supabase.table("chat_groups") \
                 .select("name, description") \
                 .eq("id", group_id) \
                 .execute()
@@ -332,7 +333,7 @@ class AIChatService:
     async def _get_recent_group_messages(self, group_id: str, limit: int = 15) -> List[Dict]:
         """Get recent group chat messages for AI context"""
         try:
-            response = supabase.table("group_messeges") \
+            response = await supabase.table("group_messeges") \
                 .select("content, sender_id, created_at, profiles:sender_id(full_name)") \
                 .eq("group_id", group_id) \
                 .order("created_at", desc=False) \
@@ -360,7 +361,7 @@ class AIChatService:
     async def _get_group_attachments(self, group_id: str, limit: int = 10) -> List[Dict]:
         """Get recent group attachments (PDFs, documents) for AI context"""
         try:
-            response = supabase.table("group_attachments") \
+            response = await supabase.table("group_attachments") \
                 .select("file_name, file_type, file_path, uploader_id, created_at, profiles!uploader_id(full_name)") \
                 .eq("group_id", group_id) \
                 .order("created_at", desc=True) \
@@ -546,7 +547,7 @@ class AIChatService:
             }
             
             print(f"💾 Inserting into ai_chat_history: user_id={user_id[:8]}, group_id={group_id}")
-            result = supabase.table("ai_chat_history").insert(data).execute()
+            result = await supabase.table("ai_chat_history").insert(data).execute()
             print(f"✅ Stored successfully: {len(result.data)} record(s)")
             
         except Exception as e:
@@ -558,15 +559,7 @@ class AIChatService:
     async def _check_if_admin(self, user_id: str, group_id: str) -> bool:
         """Check if user is an admin of the specified group"""
         try:
-            response = supabase.table("group_members") \
-                .select("role") \
-                .eq("group_id", group_id) \
-                .eq("user_id", user_id) \
-                .execute()
-            
-            if response.data and len(response.data) > 0:
-                return response.data[0].get("role") == "admin"
-            return False
+            return await is_group_admin(group_id, user_id)
         except Exception as e:
             print(f"Error checking admin status: {str(e)}")
             return False
@@ -16,15 +16,13 @@ async def detect_answer_and_link(message_text, message_id, group_id, student_id)
     try:
         print(f"🔗 Checking answer using AI similarity")
 
-        # Search similar content (both questions and assignments)
-        results = await search_similar(message_text, limit=5)
+        # Search this group's questions and assignments only
+        results = await search_similar(
+            message_text, limit=10, filter_metadata={"type": ["question", "assignment_chunk"], "group_id": group_id}
+        )
 
         # First, try to match to specific questions
-        question_matches = [
-            r for r in results
-            if r.get("metadata", {}).get("type") == "question"
-            and r.get("metadata", {}).get("group_id") == group_id
-        ]
+        question_matches = [r for r in results if r.get("metadata", {}).get("type") == "question"]
         
         if question_matches:
             best_question = question_matches[0]
@@ -37,7 +35,7 @@ async def detect_answer_and_link(message_text, message_id, group_id, student_id)
                 print(f"✅ Linked to Q{best_question.get('metadata', {}).get('question_order')} with confidence {confidence:.2f}")
                 
                 # Store answer linked to specific question
-                supabase.table("user_question_sheet_answers").insert({
+                await supabase.table("user_question_sheet_answers").insert({
                     "question_sheet_id": assignment_id,
                     "question_id": question_id,
                     "student_id": student_id,
@@ -51,11 +49,7 @@ async def detect_answer_and_link(message_text, message_id, group_id, student_id)
                 return
 
         # Fallback: Try assignment-level matching
-        assignment_matches = [
-            r for r in results
-            if r.get("metadata", {}).get("type") == "assignment"
-            and r.get("metadata", {}).get("group_id") == group_id
-        ]
+        assignment_matches = [r for r in results if r.get("metadata", {}).get("type") == "assignment_chunk"]
 
         if not assignment_matches:
             return
@@ -82,12 +76,12 @@ async def detect_answer_and_link(message_text, message_id, group_id, student_id)
                     "question_order": 1,
                     "points": 0
                 }
-                q_result = supabase.table("question_sheet_questions").insert(question_data).execute()
+                q_result = await supabase.table("question_sheet_questions").insert(question_data).execute()
                 question_id = q_result.data[0]["id"] if q_result.data else None
             
             if question_id:
                 # Store link in user_question_sheet_answers table
-                supabase.table("user_question_sheet_answers").insert({
+                await supabase.table("user_question_sheet_answers").insert({
                     "question_sheet_id": assignment_id,
                     "question_id": question_id,
                     "student_id": student_id,
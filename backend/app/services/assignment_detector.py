@@ -465,7 +465,7 @@ async def detect_and_store_assignment(
             "created_at": datetime.now().isoformat()
         }
         
-        result = supabase.table("question_sheets").insert(assignment_data).execute()
+        result = await supabase.table("question_sheets").insert(assignment_data).execute()
         
         if result.data:
             assignment = result.data[0]
@@ -502,7 +502,7 @@ async def _process_assignment_background(
     try:
         # Run sequentially to avoid rate limits (or use gather with delays)
         await _store_assignment_embeddings(assignment_id, assignment_text, group_id, user_id)
-        await _ai_extract_questions(assignment_id, assignment_text)
+        await _ai_extract_questions(assignment_id, assignment_text, group_id)
         
     except Exception as e:
         print(f"⚠️  Background processing error: {e}")
@@ -569,7 +569,7 @@ def _smart_chunk_text(text: str, chunk_size: int = 1000) -> List[tuple]:
     return chunks[:10]  # Limit to 10 chunks
 
 
-async def _ai_extract_questions(assignment_id: str, assignment_text: str):
+async def _ai_extract_questions(assignment_id: str, assignment_text: str, group_id: str):
     """
     Use AI to extract individual questions from assignment
     """
@@ -642,7 +642,7 @@ Only JSON array.
         questions = _extract_and_parse_json(result_text)
 
         if isinstance(questions, list) and len(questions) > 0:
-            await _store_questions(assignment_id, questions)
+            await _store_questions(assignment_id, questions, group_id)
             print(f"📚 AI extracted {len(questions)} questions")
         else:
             print("⚠️ AI returned invalid or empty question list")
@@ -653,8 +653,8 @@ Only JSON array.
         traceback.print_exc()
 
 
-async def _store_questions(assignment_id: str, questions: List[Dict]):
-    """Store extracted questions in database"""
+async def _store_questions(assignment_id: str, questions: List[Dict], group_id: str):
+    """Store extracted questions in database, with embeddings for answer matching"""
     try:
         question_records = []
         
@@ -670,8 +670,20 @@ async def _store_questions(assignment_id: str, questions: List[Dict]):
             })
         
         if question_records:
-            supabase.table("question_sheet_questions").insert(question_records).execute()
+            await supabase.table("question_sheet_questions").insert(question_records).execute()
             print(f"✅ Stored {len(question_records)} questions in database")
+
+            # Tagged with the group so answers posted there can match them
+            await asyncio.gather(*[
+                store_embedding(record["question_text"], {
+                    "type": "question",
+                    "question_id": record["id"],
+                    "assignment_id": assignment_id,
+                    "group_id": group_id,
+                    "question_order": record["question_order"]
+                })
+                for record in question_records if record["question_text"]
+            ], return_exceptions=True)
             
     except Exception as e:
         print(f"⚠️  Question storage error: {e}")
\ No newline at end of file
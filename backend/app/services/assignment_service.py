@@ -6,10 +6,11 @@ Comprehensive service for managing assignments, PDF uploads, and student replies
 from typing import List, Optional, Dict
 from fastapi import HTTPException, status, UploadFile
 from app.core.supabase import supabase
+from app.core.membership import is_group_member, is_group_admin
+from app.core.profile_loader import ProfileLoader
 from app.services.assignment_detector import detect_and_store_assignment
 from app.services.pdf_parser import parse_pdf_to_text, validate_pdf_file
 from datetime import datetime
-import asyncio
 import uuid
 
 class AssignmentService:
@@ -23,16 +24,7 @@ class AssignmentService:
         """Upload PDF and create assignment with AI-extracted fields"""
         try:
             # Validate admin permission
-            admin_check = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("group_members")
-                .select("role")
-                .eq("group_id", group_id)
-                .eq("user_id", admin_id)
-                .execute()
-            )
-            
-            if not admin_check.data or admin_check.data[0].get("role") != "admin":
+            if not await is_group_admin(group_id, admin_id):
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="Only admins can create assignments"
@@ -83,16 +75,7 @@ class AssignmentService:
         """Create assignment from message text with AI field extraction"""
         try:
             # Validate admin permission
-            admin_check = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("group_members")
-                .select("role")
-                .eq("group_id", group_id)
-                .eq("user_id", admin_id)
-                .execute()
-            )
-            
-            if not admin_check.data or admin_check.data[0].get("role") != "admin":
+            if not await is_group_admin(group_id, admin_id):
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="Only admins can create assignments"
@@ -130,9 +113,8 @@ class AssignmentService:
             # For now, allowing all authenticated users to view assignments
             
             # Get assignments directly from question_sheets table (not using view)
-            result = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("question_sheets")
+            result = await (
+                supabase.table("question_sheets")
                 .select("*")
                 .eq("group_id", group_id)
                 .order("created_at", desc=True)
@@ -155,9 +137,8 @@ class AssignmentService:
         """Get assignment details with questions and organized answers"""
         try:
             # Get assignment details directly from question_sheets table
-            assignment_result = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("question_sheets")
+            assignment_result = await (
+                supabase.table("question_sheets")
                 .select("*")
                 .eq("id", assignment_id)
                 .execute()
@@ -172,9 +153,8 @@ class AssignmentService:
             assignment = assignment_result.data[0]
             
             # Get all questions for this assignment from question_sheet_questions table
-            questions_result = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("question_sheet_questions")
+            questions_result = await (
+                supabase.table("question_sheet_questions")
                 .select("*")
                 .eq("question_sheet_id", assignment_id)
                 .order("question_order")
@@ -182,15 +162,19 @@ class AssignmentService:
             )
             
             # Get all answers for this assignment
-            answers_result = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("user_question_sheet_answers")
+            answers_result = await (
+                supabase.table("user_question_sheet_answers")
                 .select("*")
                 .eq("question_sheet_id", assignment_id)
                 .order("submitted_at", desc=True)
                 .execute()
             )
             
+            # Fetch every student profile in one query
+            students = await ProfileLoader().load_many(
+                answer.get("student_id") for answer in (answers_result.data or [])
+            )
+            
             # Group answers by question_id
             answers_by_question = {}
             for answer in (answers_result.data or []):
@@ -198,23 +182,8 @@ class AssignmentService:
                 if question_id not in answers_by_question:
                     answers_by_question[question_id] = []
                 
-                # Fetch student profile
                 student_id = answer.get("student_id")
-                student_info = {}
-                
-                if student_id:
-                    try:
-                        profile_result = await asyncio.get_event_loop().run_in_executor(
-                            None,
-                            lambda sid=student_id: supabase.table("profiles")
-                            .select("username, full_name, avatar_url")
-                            .eq("id", sid)
-                            .execute()
-                        )
-                        if profile_result.data:
-                            student_info = profile_result.data[0]
-                    except Exception as profile_error:
-                        print(f"Error fetching profile for {student_id}: {profile_error}")
+                student_info = students.get(str(student_id)) or {}
                 
                 answers_by_question[question_id].append({
                     "id": answer.get("id"),
@@ -267,9 +236,8 @@ class AssignmentService:
         """Allow students to manually submit replies to assignments"""
         try:
             # Verify assignment exists and get group_id
-            assignment_check = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("question_sheets")
+            assignment_check = await (
+                supabase.table("question_sheets")
                 .select("id, group_id")
                 .eq("id", assignment_id)
                 .execute()
@@ -284,16 +252,7 @@ class AssignmentService:
             group_id = assignment_check.data[0]["group_id"]
             
             # Verify student is member of group
-            member_check = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("group_members")
-                .select("id")
-                .eq("group_id", group_id)
-                .eq("user_id", student_id)
-                .execute()
-            )
-            
-            if not member_check.data:
+            if not await is_group_member(group_id, student_id):
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="You are not a member of this group"
@@ -311,9 +270,8 @@ class AssignmentService:
             }
             
             # Check if general question already exists
-            existing_q = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("question_sheet_questions")
+            existing_q = await (
+                supabase.table("question_sheet_questions")
                 .select("id")
                 .eq("question_sheet_id", assignment_id)
                 .eq("question_text", "General Assignment Response")
@@ -323,9 +281,8 @@ class AssignmentService:
             if existing_q.data:
                 question_id = existing_q.data[0]["id"]
             else:
-                await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    lambda: supabase.table("question_sheet_questions")
+                await (
+                    supabase.table("question_sheet_questions")
                     .insert(question_data)
                     .execute()
                 )
@@ -341,9 +298,8 @@ class AssignmentService:
                 "submitted_at": datetime.utcnow().isoformat()
             }
             
-            result = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("user_question_sheet_answers")
+            result = await (
+                supabase.table("user_question_sheet_answers")
                 .upsert(reply_data, on_conflict="question_id,student_id")
                 .execute()
             )
@@ -372,9 +328,8 @@ class AssignmentService:
         """Delete assignment (admin/creator only)"""
         try:
             # Verify user is the creator
-            assignment_check = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("question_sheets")
+            assignment_check = await (
+                supabase.table("question_sheets")
                 .select("creator_id")
                 .eq("id", assignment_id)
                 .execute()
@@ -393,9 +348,8 @@ class AssignmentService:
                 )
             
             # Delete assignment (cascade will delete questions and answers)
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("question_sheets")
+            await (
+                supabase.table("question_sheets")
                 .delete()
                 .eq("id", assignment_id)
                 .execute()
@@ -425,9 +379,8 @@ class AssignmentService:
         """
         try:
             # Verify assignment exists and get group_id
-            assignment_check = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("question_sheets")
+            assignment_check = await (
+                supabase.table("question_sheets")
                 .select("id, group_id")
                 .eq("id", assignment_id)
                 .execute()
@@ -442,16 +395,7 @@ class AssignmentService:
             group_id = assignment_check.data[0]["group_id"]
             
             # Verify student is member of group
-            member_check = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("group_members")
-                .select("id")
-                .eq("group_id", group_id)
-                .eq("user_id", student_id)
-                .execute()
-            )
-            
-            if not member_check.data:
+            if not await is_group_member(group_id, student_id):
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="You are not a member of this group"
@@ -472,9 +416,8 @@ class AssignmentService:
             
             # If still no question_id, create/use general question
             if question_id is None:
-                existing_q = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    lambda: supabase.table("question_sheet_questions")
+                existing_q = await (
+                    supabase.table("question_sheet_questions")
                     .select("id")
                     .eq("question_sheet_id", assignment_id)
                     .eq("question_text", "General Assignment Response")
@@ -491,9 +434,8 @@ class AssignmentService:
                         "question_order": 1,
                         "points": 0
                     }
-                    q_result = await asyncio.get_event_loop().run_in_executor(
-                        None,
-                        lambda: supabase.table("question_sheet_questions")
+                    q_result = await (
+                        supabase.table("question_sheet_questions")
                         .insert(question_data)
                         .execute()
                     )
@@ -511,9 +453,8 @@ class AssignmentService:
                 "submitted_at": datetime.utcnow().isoformat()
             }
             
-            result = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("user_question_sheet_answers")
+            result = await (
+                supabase.table("user_question_sheet_answers")
                 .upsert(reply_data, on_conflict="question_id,student_id")
                 .execute()
             )
@@ -544,9 +485,8 @@ class AssignmentService:
             from app.services.question_linker import get_questions_for_assignment
             
             # Verify user has access to assignment
-            assignment_check = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("question_sheets")
+            assignment_check = await (
+                supabase.table("question_sheets")
                 .select("group_id")
                 .eq("id", assignment_id)
                 .execute()
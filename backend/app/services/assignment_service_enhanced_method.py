@@ -10,9 +10,8 @@ async def get_assignment_detail(assignment_id: str, user_id: str) -> Dict:
     """Get assignment details with questions and organized answers"""
     try:
         # Get assignment details directly from question_sheets table
-        assignment_result = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: supabase.table("question_sheets")
+        assignment_result = await (
+            supabase.table("question_sheets")
             .select("*")
             .eq("id", assignment_id)
             .execute()
@@ -31,9 +30,8 @@ async def get_assignment_detail(assignment_id: str, user_id: str) -> Dict:
         questions = await get_questions_for_assignment(assignment_id)
         
         # Get all answers for this assignment
-        answers_result = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: supabase.table("user_question_sheet_answers")
+        answers_result = await (
+            supabase.table("user_question_sheet_answers")
             .select("*")
             .eq("question_sheet_id", assignment_id)
             .order("submitted_at", desc=True)
@@ -53,11 +51,10 @@ async def get_assignment_detail(assignment_id: str, user_id: str) -> Dict:
             
             if student_id:
                 try:
-                    profile_result = await asyncio.get_event_loop().run_in_executor(
-                        None,
-                        lambda sid=student_id: supabase.table("profiles")
+                    profile_result = await (
+                        supabase.table("profiles")
                         .select("username, full_name, avatar_url")
-                        .eq("id", sid)
+                        .eq("id", student_id)
                         .execute()
                     )
                     if profile_result.data:
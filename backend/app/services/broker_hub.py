@@ -0,0 +1,96 @@
+"""
+Minimal local pub/sub hub for running several uvicorn workers without Redis
+
+Implements the subset of the Redis protocol RedisBroker uses (SUBSCRIBE,
+UNSUBSCRIBE, PUBLISH, PING) over TCP or a Unix socket:
+
+    python -m app.services.broker_hub --unix /tmp/unified_hub.sock
+    REALTIME_BROKER=redis REALTIME_BROKER_URL=unix:///tmp/unified_hub.sock \\
+        uvicorn app.main:app --workers 4
+"""
+
+import argparse
+import asyncio
+import os
+from typing import Dict, Set
+
+from app.services.realtime_broker import encode_command, read_reply
+
+
+class BrokerHub:
+    def __init__(self):
+        self.channels: Dict[str, Set[asyncio.StreamWriter]] = {}
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        subscribed: Set[str] = set()
+        try:
+            while True:
+                command = await read_reply(reader)
+                if not isinstance(command, list) or not command:
+                    continue
+                name = command[0].decode().upper()
+                args = [a.decode() for a in command[1:]]
+
+                if name == "SUBSCRIBE":
+                    for channel in args:
+                        self.channels.setdefault(channel, set()).add(writer)
+                        subscribed.add(channel)
+                        writer.write(self._count_reply("subscribe", channel, len(subscribed)))
+                elif name == "UNSUBSCRIBE":
+                    for channel in args:
+                        self._drop(channel, writer)
+                        subscribed.discard(channel)
+                        writer.write(self._count_reply("unsubscribe", channel, len(subscribed)))
+                elif name == "PUBLISH":
+                    channel, payload = args[0], command[2]
+                    receivers = self.channels.get(channel, ())
+                    frame = encode_command("message", channel, payload)
+                    for receiver in receivers:
+                        receiver.write(frame)
+                    writer.write(f":{len(receivers)}\r\n".encode())
+                elif name == "PING":
+                    writer.write(b"+PONG\r\n")
+                else:
+                    writer.write(f"-ERR unknown command '{name}'\r\n".encode())
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for channel in subscribed:
+                self._drop(channel, writer)
+            writer.close()
+
+    @staticmethod
+    def _count_reply(kind: str, channel: str, count: int) -> bytes:
+        head = encode_command(kind, channel)
+        # Replace the array length (2 -> 3) and append the integer reply
+        return b"*3" + head[2:] + f":{count}\r\n".encode()
+
+    def _drop(self, channel: str, writer: asyncio.StreamWriter):
+        writers = self.channels.get(channel)
+        if writers:
+            writers.discard(writer)
+            if not writers:
+                del self.channels[channel]
+
+
+async def serve(host: str = "127.0.0.1", port: int = 6379, unix_path: str = None):
+    hub = BrokerHub()
+    if unix_path:
+        if os.path.exists(unix_path):
+            os.unlink(unix_path)
+        server = await asyncio.start_unix_server(hub.handle_client, path=unix_path)
+        print(f"📡 Broker hub listening on unix://{unix_path}")
+    else:
+        server = await asyncio.start_server(hub.handle_client, host, port)
+        print(f"📡 Broker hub listening on redis://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--unix", help="Listen on a Unix socket instead of TCP")
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.unix))
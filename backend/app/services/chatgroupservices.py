@@ -1,8 +1,17 @@
 from fastapi import HTTPException
-from app.core.supabase import supabase
+from app.core.supabase import supabase, get_public_url
+from app.core.membership import (
+    is_group_member,
+    is_group_admin,
+    remember_member_role,
+    invalidate_member,
+    invalidate_group,
+)
+from app.core.profile_loader import ProfileLoader
+from app.services.connection_manager import manager
+from app.core.pagination import fetch_keyset_page, encode_cursor
 from app.schemas.chatgroups import ChatGroupOut,ChatGroupListOut
-from typing import List
-from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional
 import uuid
 from datetime import datetime, timezone
 from app.services.assignment_detector import detect_and_store_assignment
@@ -13,6 +22,14 @@ class ChatGroupService:
     """
     Service layer for chat group-related business logic
     """
+
+    @staticmethod
+    async def _announce_membership(group_id: str, user_ids: Optional[List[str]] = None):
+        """Other workers drop their cached memberships; the write itself already succeeded"""
+        try:
+            await manager.publish_membership_change(group_id, user_ids)
+        except Exception as e:
+            print(f"⚠️ Failed to announce membership change: {e}")
     
     @staticmethod
     async def create_chat_group(chat_group_data, creator_id: str) -> ChatGroupOut:
@@ -45,7 +62,7 @@ class ChatGroupService:
             }
             
             # Insert the group
-            insert_response = supabase.table("chat_groups").insert(group_data).execute()
+            insert_response = await supabase.table("chat_groups").insert(group_data).execute()
             
             if not insert_response.data or len(insert_response.data) == 0:
                 raise HTTPException(
@@ -54,7 +71,7 @@ class ChatGroupService:
                 )
             
             # Fetch the complete group record with auto-generated timestamps
-            fetch_response = supabase.table("chat_groups").select("*").eq("id", group_id).execute()
+            fetch_response = await supabase.table("chat_groups").select("*").eq("id", group_id).execute()
             
             if not fetch_response.data or len(fetch_response.data) == 0:
                 raise HTTPException(
@@ -74,7 +91,7 @@ class ChatGroupService:
             }
             
             print(f"Attempting to add creator as member: {member_data}")
-            member_response = supabase.table("group_members").insert(member_data).execute()
+            member_response = await supabase.table("group_members").insert(member_data).execute()
             print(f"Member insert response: {member_response}")
             
             if not member_response.data or len(member_response.data) == 0:
@@ -84,6 +101,9 @@ class ChatGroupService:
                     status_code=500,
                     detail="Failed to add creator as group member"
                 )
+            remember_member_role(group_id, creator_id, "admin")
+            manager.presence.forget_audience(creator_id)
+            await ChatGroupService._announce_membership(group_id, [creator_id])
             
             return ChatGroupOut(**created_group)
             
@@ -103,8 +123,8 @@ class ChatGroupService:
         print("Service Layer: Fetching groups for user_id:", user_id)
 
         try:
-            response = await run_in_threadpool(
-                lambda: supabase
+            response = await (
+                supabase
                     .table("group_members")
                     .select(
                         "chat_groups!group_members_group_id_fkey(id, name, description, created_at)"
@@ -132,8 +152,8 @@ class ChatGroupService:
     @staticmethod
     async def get_group_details(group_id,user_id):
         try:
-            response = await run_in_threadpool(
-                lambda: supabase
+            response = await (
+                supabase
                     .table("chat_groups")
                     .select(
                         "id, name, description, avatar_url, created_at, updated_at"
@@ -161,8 +181,8 @@ class ChatGroupService:
     @staticmethod
     async def update_group(group_id,user_id,group_data):
         try:
-            response = await run_in_threadpool(
-                lambda: supabase
+            response = await (
+                supabase
                     .table("chatgroups")
                     .update(group_data)
                     .eq("id", group_id)
@@ -183,8 +203,8 @@ class ChatGroupService:
     @staticmethod
     async def delete_group(group_id,user_id):
         try:
-            response = await run_in_threadpool(
-                lambda: supabase
+            response = await (
+                supabase
                     .table("chat_groups")
                     .delete()
                     .eq("id", group_id)
@@ -192,6 +212,8 @@ class ChatGroupService:
             )
 
             print("Database response:", response)
+            invalidate_group(group_id)
+            await ChatGroupService._announce_membership(group_id)
 
             group = response.data[0]
 
@@ -208,16 +230,7 @@ class ChatGroupService:
         """Add multiple members to a group (admin only)"""
         try:
             # Check if current user is admin
-            admin_check = await run_in_threadpool(
-                lambda: supabase
-                    .table("group_members")
-                    .select("role")
-                    .eq("group_id", group_id)
-                    .eq("user_id", current_user_id)
-                    .execute()
-            )
-            
-            if not admin_check.data or admin_check.data[0].get("role") != "admin":
+            if not await is_group_admin(group_id, current_user_id):
                 raise HTTPException(
                     status_code=403,
                     detail="Only admins can add members"
@@ -235,14 +248,19 @@ class ChatGroupService:
                 })
             
             # Bulk insert
-            response = await run_in_threadpool(
-                lambda: supabase
+            response = await (
+                supabase
                     .table("group_members")
                     .insert(members_to_add)
                     .execute()
             )
 
             print("Add members response:", response)
+            for member in response.data or []:
+                remember_member_role(group_id, member["user_id"], member.get("role") or "member")
+                manager.presence.forget_audience(member["user_id"])
+            if response.data:
+                await ChatGroupService._announce_membership(group_id, [m["user_id"] for m in response.data])
 
             if not response.data:
                 raise HTTPException(
@@ -265,35 +283,17 @@ class ChatGroupService:
         """Remove a member from the group (admin only, cannot remove last admin)"""
         try:
             # Check if current user is admin
-            admin_check = await run_in_threadpool(
-                lambda: supabase
-                    .table("group_members")
-                    .select("role")
-                    .eq("group_id", group_id)
-                    .eq("user_id", current_user_id)
-                    .execute()
-            )
-            
-            if not admin_check.data or admin_check.data[0].get("role") != "admin":
+            if not await is_group_admin(group_id, current_user_id):
                 raise HTTPException(
                     status_code=403,
                     detail="Only admins can remove members"
                 )
             
             # Check if user to remove is an admin
-            target_check = await run_in_threadpool(
-                lambda: supabase
-                    .table("group_members")
-                    .select("role")
-                    .eq("group_id", group_id)
-                    .eq("user_id", user_id_to_remove)
-                    .execute()
-            )
-            
-            if target_check.data and target_check.data[0].get("role") == "admin":
+            if await is_group_admin(group_id, user_id_to_remove):
                 # Count total admins
-                admin_count = await run_in_threadpool(
-                    lambda: supabase
+                admin_count = await (
+                    supabase
                         .table("group_members")
                         .select("id")
                         .eq("group_id", group_id)
@@ -308,8 +308,8 @@ class ChatGroupService:
                     )
             
             # Remove the member
-            response = await run_in_threadpool(
-                lambda: supabase
+            response = await (
+                supabase
                     .table("group_members")
                     .delete()
                     .eq("group_id", group_id)
@@ -318,6 +318,9 @@ class ChatGroupService:
             )
 
             print("Remove member response:", response)
+            invalidate_member(group_id, user_id_to_remove)
+            manager.presence.forget_audience(user_id_to_remove)
+            await ChatGroupService._announce_membership(group_id, [user_id_to_remove])
 
             return {
                 "message": "Member removed successfully"
@@ -332,16 +335,7 @@ class ChatGroupService:
         """Update a member's role in the group (admin only)"""
         try:
             # Check if current user is admin
-            admin_check = await run_in_threadpool(
-                lambda: supabase
-                    .table("group_members")
-                    .select("role")
-                    .eq("group_id", group_id)
-                    .eq("user_id", admin_user_id)
-                    .execute()
-            )
-            
-            if not admin_check.data or admin_check.data[0].get("role") != "admin":
+            if not await is_group_admin(group_id, admin_user_id):
                 raise HTTPException(
                     status_code=403,
                     detail="Only admins can change member roles"
@@ -357,19 +351,10 @@ class ChatGroupService:
             # If demoting from admin, check there's at least one other admin
             if new_role != "admin":
                 # Get current role of target user
-                target_role_check = await run_in_threadpool(
-                    lambda: supabase
-                        .table("group_members")
-                        .select("role")
-                        .eq("group_id", group_id)
-                        .eq("user_id", target_user_id)
-                        .execute()
-                )
-                
-                if target_role_check.data and target_role_check.data[0].get("role") == "admin":
+                if await is_group_admin(group_id, target_user_id):
                     # Count total admins
-                    admin_count = await run_in_threadpool(
-                        lambda: supabase
+                    admin_count = await (
+                        supabase
                             .table("group_members")
                             .select("id")
                             .eq("group_id", group_id)
@@ -384,8 +369,8 @@ class ChatGroupService:
                         )
             
             # Update the member's role
-            response = await run_in_threadpool(
-                lambda: supabase
+            response = await (
+                supabase
                     .table("group_members")
                     .update({"role": new_role})
                     .eq("group_id", group_id)
@@ -394,6 +379,8 @@ class ChatGroupService:
             )
 
             print("Update role response:", response)
+            invalidate_member(group_id, target_user_id)
+            await ChatGroupService._announce_membership(group_id, [target_user_id])
 
             if not response.data:
                 raise HTTPException(
@@ -416,24 +403,15 @@ class ChatGroupService:
         """Get all members of a group with user details"""
         try:
             # Verify user is a member
-            member_check = await run_in_threadpool(
-                lambda: supabase
-                    .table("group_members")
-                    .select("id")
-                    .eq("group_id", group_id)
-                    .eq("user_id", current_user_id)
-                    .execute()
-            )
-            
-            if not member_check.data:
+            if not await is_group_member(group_id, current_user_id):
                 raise HTTPException(
                     status_code=403,
                     detail="You are not a member of this group"
                 )
             
             # Get members with user details using the view
-            response = await run_in_threadpool(
-                lambda: supabase
+            response = await (
+                supabase
                     .table("group_members_with_details")
                     .select("*")
                     .eq("group_id", group_id)
@@ -455,8 +433,8 @@ class ChatGroupService:
     @staticmethod
     async def leave_group(group_id,user_id):
         try:
-            response = await run_in_threadpool(
-                lambda: supabase
+            response = await (
+                supabase
                     .table("group_members")
                     .delete()
                     .eq("group_id", group_id)
@@ -465,6 +443,9 @@ class ChatGroupService:
             )
 
             print("Database response:", response)
+            invalidate_member(group_id, user_id)
+            manager.presence.forget_audience(user_id)
+            await ChatGroupService._announce_membership(group_id, [user_id])
 
             group = response.data[0]
 
@@ -482,8 +463,8 @@ class ChatGroupService:
             # Generate UUID for the message
             message_id = str(uuid.uuid4())
             
-            response = await run_in_threadpool(
-                lambda: supabase
+            response = await (
+                supabase
                     .table("group_messeges")
                     .insert({
                         "id": message_id,
@@ -499,15 +480,16 @@ class ChatGroupService:
             if not response.data:
                 raise HTTPException(status_code=500, detail="Failed to send message")
 
-            fetch_response = await run_in_threadpool(
-                lambda: supabase
+            fetch_response = await (
+                supabase
                     .table("group_messeges")
-                    .select("id, group_id, sender_id, content, created_at, updated_at")
+                    .select("id, group_id, sender_id, content, created_at, updated_at, seq")
                     .eq("id", message_id)
                     .execute()
             )
 
             message_record = fetch_response.data[0] if fetch_response.data else response.data[0]
+            sender_record = await ProfileLoader().load(user_id) or {}
 
             # 🧠 Background AI (only after success)
             import asyncio
@@ -547,106 +529,144 @@ class ChatGroupService:
             print("ERROR:", str(e))
             raise HTTPException(status_code=500, detail=str(e))
     @staticmethod
-    async def get_group_messages(group_id, user_id, limit=20, offset=0):
+    async def link_attachment(attachment_id, message_id, group_id, uploader_id):
+        """
+        Attach an uploaded file to a just-sent message in one round trip
+
+        The update returns the linked row, the uploader name comes from the
+        profile cache and the public URL is memoized, so nothing here waits
+        on more than the single update. Returns None if the attachment is not
+        the sender's upload in this group.
+        """
+        response = await (
+            supabase
+                .table("group_attachments")
+                .update({"message_id": str(message_id)})
+                .eq("id", attachment_id)
+                .eq("group_id", group_id)
+                .eq("uploader_id", uploader_id)
+                .execute()
+        )
+        if not response.data:
+            return None
+
+        row = response.data[0]
+        attachment = {
+            key: row.get(key)
+            for key in ("id", "file_name", "file_type", "file_size", "uploader_id", "created_at", "file_path")
+        }
+        if attachment["file_path"]:
+            attachment["file_url"] = get_public_url("message", attachment["file_path"])
+
+        uploader = await ProfileLoader().load(uploader_id)
+        if uploader:
+            attachment["uploader_username"] = uploader.get("username")
+        return attachment
+
+    @staticmethod
+    async def _get_attachments_by_message(message_ids):
+        """Load the first attachment of each message with a single query"""
+        if not message_ids:
+            return {}
+        
+        response = await (
+            supabase
+                .table("group_attachments")
+                .select("id, message_id, file_name, file_type, file_size, uploader_id, created_at, file_path")
+                .in_("message_id", message_ids)
+                .order("created_at")
+                .execute()
+        )
+        
+        attachments = {}
+        for attachment in response.data or []:
+            message_id = attachment.pop("message_id")
+            if message_id in attachments:
+                continue
+            
+            file_path = attachment.get("file_path")
+            if file_path:
+                attachment["file_url"] = get_public_url("message", file_path)
+            attachments[message_id] = attachment
+        
+        return attachments
+    
+    @staticmethod
+    async def get_group_messages(group_id, user_id, limit=20, offset=0, before=None, after=None):
         try:
             # Verify user is a member of the group
-            member_check = await run_in_threadpool(
-                lambda: supabase
-                    .table("group_members")
-                    .select("id")
-                    .eq("group_id", group_id)
-                    .eq("user_id", user_id)
-                    .execute()
-            )
-            
-            if not member_check.data:
+            if not await is_group_member(group_id, user_id):
                 raise HTTPException(
                     status_code=403,
                     detail="You are not a member of this group"
                 )
             
-            # Get total count
-            count_response = await run_in_threadpool(
-                lambda: supabase
+            messages_query = (
+                supabase
                     .table("group_messeges")
-                    .select("id", count="exact")
+                    .select("id, group_id, sender_id, content, created_at, updated_at, seq")
                     .eq("group_id", group_id)
-                    .execute()
             )
-            total_count = count_response.count if count_response.count else 0
             
-            # Get messages
-            response = await run_in_threadpool(
-                lambda: supabase
-                    .table("group_messeges")
-                    .select("id, group_id, sender_id, content, created_at, updated_at")
-                    .eq("group_id", group_id)
-                    .order("created_at", desc=True)
-                    .limit(limit)
-                    .range(offset, offset + limit - 1)
-                    .execute()
-            )
-
-            messages = response.data or []
-            
-            # Fetch sender info for each message
-            for msg in messages:
-                sender_response = await run_in_threadpool(
-                    lambda m=msg: supabase
-                        .table("profiles")
-                        .select("username, email")
-                        .eq("id", m["sender_id"])
+            if before or after:
+                # Keyset page - no count query, cost is independent of depth
+                page = await fetch_keyset_page(messages_query, limit, before=before, after=after)
+                messages = page["rows"]
+                total_count = None
+                has_more = page["has_more"]
+            else:
+                # Get total count
+                count_response = await (
+                    supabase
+                        .table("group_messeges")
+                        .select("id", count="exact")
+                        .eq("group_id", group_id)
                         .execute()
                 )
+                total_count = count_response.count if count_response.count else 0
                 
-                if sender_response.data and len(sender_response.data) > 0:
-                    sender = sender_response.data[0]
-                    msg["sender_username"] = sender.get("username") or sender.get("email")
-                else:
-                    msg["sender_username"] = "Unknown"
-            
-            # Fetch attachments for all messages concurrently
-            async def fetch_attachment(msg):
-                attachment_response = await run_in_threadpool(
-                    lambda m=msg: supabase
-                        .table("group_attachments")
-                        .select("id, file_name, file_type, file_size, uploader_id, created_at, file_path")
-                        .eq("message_id", m["id"])
+                # Get messages
+                response = await (
+                    messages_query
+                        .order("created_at", desc=True)
+                        .order("id", desc=True)
+                        .limit(limit)
+                        .range(offset, offset + limit - 1)
                         .execute()
                 )
                 
-                if attachment_response.data and len(attachment_response.data) > 0:
-                    attachment = attachment_response.data[0]
-
-                    # Generate file URL
-                    bucket_name = "message"
-                    file_path = attachment.get("file_path")
-
-                    if file_path:
-                        public_url = supabase.storage.from_(bucket_name).get_public_url(file_path)
-                        attachment["file_url"] = public_url
-
-                    # Get uploader username
-                    uploader_response = await run_in_threadpool(
-                        lambda a=attachment: supabase
-                            .table("profiles")
-                            .select("username")
-                            .eq("id", a["uploader_id"])
-                            .execute()
-                    )
-
-                    if uploader_response.data and len(uploader_response.data) > 0:
-                        attachment["uploader_username"] = uploader_response.data[0].get("username")
-
-                    msg["attachment"] = attachment
-                
-                return msg
-            
-            # Process all messages concurrently
-            messages = await asyncio.gather(*[fetch_attachment(msg) for msg in messages])
+                messages = response.data or []
+                # Reverse to show oldest first
+                messages.reverse()
+                has_more = (offset + len(messages)) < total_count
+            
+            message_ids = [msg["id"] for msg in messages]
+            
+            # Fetch sender info and the page's attachments in parallel, one query each
+            profiles = ProfileLoader()
+            senders, attachments_by_message = await asyncio.gather(
+                profiles.load_many(msg["sender_id"] for msg in messages),
+                ChatGroupService._get_attachments_by_message(message_ids),
+            )
+            for msg in messages:
+                sender = senders.get(str(msg["sender_id"]))
+                if sender:
+                    msg["sender_username"] = sender.get("username") or sender.get("email")
+                else:
+                    msg["sender_username"] = "Unknown"
             
-            # Reverse to show oldest first
-            messages.reverse()
+            # Uploaders are usually the senders, so this is mostly served from the loader
+            uploaders = await profiles.load_many(
+                a["uploader_id"] for a in attachments_by_message.values()
+            )
+            for msg in messages:
+                attachment = attachments_by_message.get(msg["id"])
+                if not attachment:
+                    continue
+                uploader = uploaders.get(str(attachment["uploader_id"]))
+                if uploader:
+                    attachment["uploader_username"] = uploader.get("username")
+                msg["attachment"] = attachment
 
             return {
                 "count": len(messages),
@@ -654,7 +674,9 @@ class ChatGroupService:
                 "total_count": total_count,
                 "limit": limit,
                 "offset": offset,
-                "has_more": (offset + len(messages)) < total_count
+                "has_more": has_more,
+                "before_cursor": encode_cursor(messages[0]) if messages else None,
+                "after_cursor": encode_cursor(messages[-1]) if messages else None
             }
 
         except HTTPException:
@@ -664,11 +686,54 @@ class ChatGroupService:
             import traceback
             traceback.print_exc()
             raise HTTPException(status_code=500, detail=str(e))
+
+    @staticmethod
+    async def get_group_messages_after_seq(group_id, user_id, after_seq, limit):
+        """
+        Messages with seq > after_seq, oldest first, shaped like the
+        new_group_message broadcast - the database side of a WebSocket resume
+        """
+        if not await is_group_member(group_id, user_id):
+            raise HTTPException(
+                status_code=403,
+                detail="You are not a member of this group"
+            )
+
+        response = await (
+            supabase
+                .table("group_messeges")
+                .select("id, group_id, sender_id, content, created_at, seq")
+                .eq("group_id", group_id)
+                .gt("seq", after_seq)
+                .order("seq")
+                .limit(limit + 1)
+                .execute()
+        )
+        messages = response.data or []
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+
+        attachments_by_message = await ChatGroupService._get_attachments_by_message(
+            [msg["id"] for msg in messages]
+        )
+        uploaders = await ProfileLoader().load_many(
+            a["uploader_id"] for a in attachments_by_message.values()
+        )
+        for msg in messages:
+            attachment = attachments_by_message.get(msg["id"])
+            if attachment:
+                uploader = uploaders.get(str(attachment["uploader_id"]))
+                if uploader:
+                    attachment["uploader_username"] = uploader.get("username")
+            msg["attachment"] = attachment
+
+        return {"messages": messages, "has_more": has_more}
+
     @staticmethod
     async def delete_message(message_id, user_id):
         try:
-            response = await run_in_threadpool(
-                lambda: supabase
+            response = await (
+                supabase
                 .table("group_messeges")
                 .delete()
                 .eq("id", message_id)
@@ -688,8 +753,8 @@ class ChatGroupService:
             print(f"Fetching groups for user: {user_id}")
             
             # First, get all group IDs where the user is a member
-            member_response = await run_in_threadpool(
-                lambda: supabase
+            member_response = await (
+                supabase
                     .table("group_members")
                     .select("group_id")
                     .eq("user_id", user_id)
@@ -709,8 +774,8 @@ class ChatGroupService:
             print(f"Group IDs: {group_ids}")
             
             # Then, fetch the chat groups for those IDs
-            groups_response = await run_in_threadpool(
-                lambda: supabase
+            groups_response = await (
+                supabase
                     .table("chat_groups")
                     .select("id, name, description, avatar_url, created_at, updated_at")
                     .in_("id", group_ids)
@@ -740,16 +805,7 @@ class ChatGroupService:
            
 
             # Verify user is a member
-            member_check = await run_in_threadpool(
-                lambda: supabase
-                    .table("group_members")
-                    .select("id")
-                    .eq("group_id", group_id)
-                    .eq("user_id", current_user_id)
-                    .execute()
-            )
-            
-            if not member_check.data:
+            if not await is_group_member(group_id, current_user_id):
                 raise HTTPException(
                     status_code=403,
                     detail="You must be a member to upload files"
@@ -771,8 +827,8 @@ class ChatGroupService:
             file_path = f"{group_id}/{current_user_id}/{file.filename}"
             
             # Upload to Supabase Storage
-            upload_response = await run_in_threadpool(
-                lambda: supabase.storage
+            upload_response = await (
+                supabase.storage
                     .from_("message")
                     .upload(file_path, file_content, {
                         "content-type": file.content_type
@@ -793,8 +849,8 @@ class ChatGroupService:
                 "file_size": file_size
             }
             
-            db_response = await run_in_threadpool(
-                lambda: supabase
+            db_response = await (
+                supabase
                     .table("group_attachments")
                     .insert(attachment_data)
                     .execute()
@@ -833,8 +889,8 @@ class ChatGroupService:
         """Delete a group message (only if user is the sender)"""
         try:
             # Verify user is the sender and message belongs to group
-            message = await run_in_threadpool(
-                lambda: supabase.table("group_messeges")
+            message = await (
+                supabase.table("group_messeges")
                 .select("*")
                 .eq("id", message_id)
                 .eq("sender_id", user_id)
@@ -846,8 +902,8 @@ class ChatGroupService:
                 raise HTTPException(403, "Not authorized to delete this message")
             
             # Delete the message
-            await run_in_threadpool(
-                lambda: supabase.table("group_messeges")
+            await (
+                supabase.table("group_messeges")
                 .delete()
                 .eq("id", message_id)
                 .execute()
@@ -871,8 +927,8 @@ class ChatGroupService:
         """Update group details (only if user is admin/creator)"""
         try:
             # Verify user is the creator (admin)
-            group = await run_in_threadpool(
-                lambda: supabase.table("chat_groups")
+            group = await (
+                supabase.table("chat_groups")
                 .select("*")
                 .eq("id", group_id)
                 .execute()
@@ -900,8 +956,8 @@ class ChatGroupService:
             update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
             
             # Update the group
-            updated_group = await run_in_threadpool(
-                lambda: supabase.table("chat_groups")
+            updated_group = await (
+                supabase.table("chat_groups")
                 .update(update_data)
                 .eq("id", group_id)
                 .execute()
@@ -927,16 +983,7 @@ class ChatGroupService:
         """Upload group avatar (admin only)"""
         try:
             # Check if current user is admin
-            admin_check = await run_in_threadpool(
-                lambda: supabase
-                    .table("group_members")
-                    .select("role")
-                    .eq("group_id", group_id)
-                    .eq("user_id", user_id)
-                    .execute()
-            )
-            
-            if not admin_check.data or admin_check.data[0].get("role") != "admin":
+            if not await is_group_admin(group_id, user_id):
                 raise HTTPException(
                     status_code=403,
                     detail="Only admins can update group avatar"
@@ -968,8 +1015,8 @@ class ChatGroupService:
             file_path = f"group-avatars/{group_id}/avatar{file_ext}"
             
             # Upload to Supabase Storage
-            upload_response = await run_in_threadpool(
-                lambda: supabase.storage
+            upload_response = await (
+                supabase.storage
                     .from_("group-documents")
                     .upload(file_path, file_content, {
                         "content-type": file.content_type,
@@ -979,11 +1026,11 @@ class ChatGroupService:
             # Note: Supabase Python client raises exceptions on upload errors
             
             # Get public URL
-            avatar_url = supabase.storage.from_("group-documents").get_public_url(file_path)
+            avatar_url = get_public_url("group-documents", file_path)
             
             # Update group with new avatar_url
-            response = await run_in_threadpool(
-                lambda: supabase
+            response = await (
+                supabase
                     .table("chat_groups")
                     .update({"avatar_url": avatar_url})
                     .eq("id", group_id)
@@ -1009,24 +1056,15 @@ class ChatGroupService:
         """Get all attachments in a group"""
         try:
             # Verify user is a member
-            member_check = await run_in_threadpool(
-                lambda: supabase
-                    .table("group_members")
-                    .select("id")
-                    .eq("group_id", group_id)
-                    .eq("user_id", current_user_id)
-                    .execute()
-            )
-            
-            if not member_check.data:
+            if not await is_group_member(group_id, current_user_id):
                 raise HTTPException(
                     status_code=403,
                     detail="You must be a member to view attachments"
                 )
             
             # Get attachments with user info
-            response = await run_in_threadpool(
-                lambda: supabase
+            response = await (
+                supabase
                     .table("group_attachments_with_user")
                     .select("*")
                     .eq("group_id", group_id)
@@ -1050,8 +1088,8 @@ class ChatGroupService:
         """Get a signed URL to download an attachment"""
         try:
             # Get attachment details
-            attachment_response = await run_in_threadpool(
-                lambda: supabase
+            attachment_response = await (
+                supabase
                     .table("group_attachments")
                     .select("*")
                     .eq("id", attachment_id)
@@ -1067,24 +1105,15 @@ class ChatGroupService:
             attachment = attachment_response.data[0]
             
             # Verify user is a member of the group
-            member_check = await run_in_threadpool(
-                lambda: supabase
-                    .table("group_members")
-                    .select("id")
-                    .eq("group_id", attachment["group_id"])
-                    .eq("user_id", current_user_id)
-                    .execute()
-            )
-            
-            if not member_check.data:
+            if not await is_group_member(attachment["group_id"], current_user_id):
                 raise HTTPException(
                     status_code=403,
                     detail="You must be a member to download this file"
                 )
             
             # Generate signed URL (expires in 1 hour)
-            signed_url = await run_in_threadpool(
-                lambda: supabase.storage
+            signed_url = await (
+                supabase.storage
                     .from_("message")
                     .create_signed_url(attachment["file_path"], 3600)
             )
@@ -1110,8 +1139,8 @@ class ChatGroupService:
         """Delete an attachment (uploader or admin only)"""
         try:
             # Get attachment details
-            attachment_response = await run_in_threadpool(
-                lambda: supabase
+            attachment_response = await (
+                supabase
                     .table("group_attachments")
                     .select("*")
                     .eq("id", attachment_id)
@@ -1131,31 +1160,22 @@ class ChatGroupService:
             
             if not is_uploader:
                 # Check if user is admin
-                admin_check = await run_in_threadpool(
-                    lambda: supabase
-                        .table("group_members")
-                        .select("role")
-                        .eq("group_id", attachment["group_id"])
-                        .eq("user_id", current_user_id)
-                        .execute()
-                )
-                
-                if not admin_check.data or admin_check.data[0].get("role") != "admin":
+                if not await is_group_admin(attachment["group_id"], current_user_id):
                     raise HTTPException(
                         status_code=403,
                         detail="Only the uploader or group admin can delete this file"
                     )
             
             # Delete from storage
-            storage_response = await run_in_threadpool(
-                lambda: supabase.storage
+            storage_response = await (
+                supabase.storage
                     .from_("message")
                     .remove([attachment["file_path"]])
             )
             
             # Delete from database
-            db_response = await run_in_threadpool(
-                lambda: supabase
+            db_response = await (
+                supabase
                     .table("group_attachments")
                     .delete()
                     .eq("id", attachment_id)
@@ -1173,24 +1193,15 @@ class ChatGroupService:
         """Get users that can be added to the group (not already members)"""
         try:
             # Verify current user is a member (and preferably admin)
-            member_check = await run_in_threadpool(
-                lambda: supabase
-                    .table("group_members")
-                    .select("role")
-                    .eq("group_id", group_id)
-                    .eq("user_id", current_user_id)
-                    .execute()
-            )
-            
-            if not member_check.data:
+            if not await is_group_member(group_id, current_user_id):
                 raise HTTPException(
                     status_code=403,
                     detail="You must be a member to view available users"
                 )
             
             # Get existing member user IDs
-            existing_members = await run_in_threadpool(
-                lambda: supabase
+            existing_members = await (
+                supabase
                     .table("group_members")
                     .select("user_id")
                     .eq("group_id", group_id)
@@ -1200,8 +1211,8 @@ class ChatGroupService:
             existing_user_ids = [m["user_id"] for m in existing_members.data]
             
             # Get all users
-            all_users = await run_in_threadpool(
-                lambda: supabase
+            all_users = await (
+                supabase
                     .table("profiles")  # Fixed: table name is profiles, not user_profiles
                     .select("id, username, full_name, avatar_url")  # Fixed: column is id, not user_id
                     .execute()
@@ -1,10 +1,11 @@
 from app.core.supabase import supabase
+from app.core.pagination import fetch_keyset_page, encode_cursor
+from app.services.conversation_summary_service import ConversationSummaryService
+from app.services.connection_manager import manager
 from fastapi import HTTPException
 from app.schemas.chat import Message, ConversationOut, ConversationParticipant
-from typing import List
+from typing import List, Optional
 from uuid import UUID
-import asyncio
-from fastapi.concurrency import run_in_threadpool
 
 class ChatService:
     @staticmethod
@@ -12,7 +13,7 @@ class ChatService:
         """Get existing conversation or create new one between two users"""
         try:
             # Use the database function to get or create conversation
-            result = supabase.rpc(
+            result = await supabase.rpc(
                 'get_or_create_conversation',
                 {'user1_id': user_id, 'user2_id': friend_id}
             ).execute()
@@ -24,7 +25,7 @@ class ChatService:
             
             # Fetch the conversation details
             conversation = (
-                supabase.table("conversations")
+                await supabase.table("conversations")
                 .select("*")
                 .eq("id", conversation_id)
                 .execute()
@@ -45,80 +46,28 @@ class ChatService:
         try:
             print(f"\n=== Getting conversations for user: {user_id} ===")
             
-            # Get all conversations where user is a participant
-            conversations = (
-                supabase.table("conversations")
-                .select("*")
-                .or_(f"participant1_id.eq.{user_id},participant2_id.eq.{user_id}")
-                .order("updated_at", desc=True)
-                .execute()
-            ).data
-            
-            print(f"Found {len(conversations) if conversations else 0} conversations")
+            # Participant, last message and unread count for every conversation
+            # in one call (see migrations/007_conversation_inbox.sql)
+            rows = (
+                await supabase.rpc("get_user_inbox", {"p_user_id": user_id}).execute()
+            ).data or []
             
-            if not conversations:
-                return {"conversations": []}
+            print(f"Found {len(rows)} conversations")
             
-            # Prepare concurrent tasks for each conversation
-            async def process_conversation(conv):
-                # Determine the other participant
-                other_user_id = conv["participant2_id"] if conv["participant1_id"] == user_id else conv["participant1_id"]
-                
-                # Fetch profile, last message, and unread count concurrently
-                profile_task = run_in_threadpool(
-                    lambda: supabase.table("profiles")
-                    .select("id, username")
-                    .eq("id", other_user_id)
-                    .execute()
-                )
-                
-                last_message_task = run_in_threadpool(
-                    lambda: supabase.table("messages")
-                    .select("*")
-                    .eq("conversation_id", conv["id"])
-                    .order("created_at", desc=True)
-                    .limit(1)
-                    .execute()
-                )
-                
-                unread_task = run_in_threadpool(
-                    lambda: supabase.table("messages")
-                    .select("id", count="exact")
-                    .eq("conversation_id", conv["id"])
-                    .eq("sender_id", other_user_id)
-                    .is_("read_at", "null")
-                    .execute()
-                )
-                
-                # Wait for all tasks to complete
-                profile_response, last_message_response, unread_response = await asyncio.gather(
-                    profile_task, last_message_task, unread_task
-                )
-                
-                profile = profile_response.data
-                last_message = last_message_response.data
-                unread_count = unread_response.count if unread_response.count else 0
-                
-                if not profile:
-                    return None
-                
-                return ConversationOut(
-                    id=conv["id"],
+            result = [
+                ConversationOut(
+                    id=row["id"],
                     participant=ConversationParticipant(
-                        id=profile[0]["id"],
-                        username=profile[0]["username"]
+                        id=row["participant_id"],
+                        username=row["participant_username"]
                     ),
-                    last_message=Message(**last_message[0]) if last_message else None,
-                    unread_count=unread_count,
-                    created_at=conv["created_at"],
-                    updated_at=conv["updated_at"]
+                    last_message=Message(**row["last_message"]) if row.get("last_message") else None,
+                    unread_count=row.get("unread_count") or 0,
+                    created_at=row["created_at"],
+                    updated_at=row["updated_at"]
                 )
-            
-            # Process all conversations concurrently
-            results = await asyncio.gather(*[process_conversation(conv) for conv in conversations])
-            
-            # Filter out None results (conversations with missing profiles)
-            result = [r for r in results if r is not None]
+                for row in rows
+            ]
             
             print(f"\nReturning {len(result)} conversations")
             return {"conversations": result}
@@ -130,12 +79,19 @@ class ChatService:
             raise HTTPException(500, f"Failed to fetch conversations: {str(e)}")
 
     @staticmethod
-    async def get_conversation_messages(conversation_id: str, user_id: str, limit: int = 20, offset: int = 0) -> dict:
-        """Get messages in a conversation with pagination"""
+    async def get_conversation_messages(
+        conversation_id: str,
+        user_id: str,
+        limit: int = 20,
+        offset: int = 0,
+        before: Optional[str] = None,
+        after: Optional[str] = None
+    ) -> dict:
+        """Get messages in a conversation with offset or (before/after) cursor pagination"""
         try:
             # Verify user is part of the conversation
             conversation = (
-                supabase.table("conversations")
+                await supabase.table("conversations")
                 .select("*")
                 .eq("id", conversation_id)
                 .or_(f"participant1_id.eq.{user_id},participant2_id.eq.{user_id}")
@@ -145,9 +101,25 @@ class ChatService:
             if not conversation:
                 raise HTTPException(403, "Not authorized to view this conversation")
             
+            if before or after:
+                # Keyset page - no count query, cost is independent of depth
+                page = await fetch_keyset_page(
+                    supabase.table("messages").select("*").eq("conversation_id", conversation_id),
+                    limit,
+                    before=before,
+                    after=after
+                )
+                return {
+                    "messages": [Message(**msg) for msg in page["rows"]],
+                    "limit": limit,
+                    "has_more": page["has_more"],
+                    "before_cursor": page["before_cursor"],
+                    "after_cursor": page["after_cursor"]
+                }
+            
             # Get total count
-            count_response = await run_in_threadpool(
-                lambda: supabase.table("messages")
+            count_response = await (
+                supabase.table("messages")
                 .select("id", count="exact")
                 .eq("conversation_id", conversation_id)
                 .execute()
@@ -155,11 +127,12 @@ class ChatService:
             total_count = count_response.count if count_response.count else 0
             
             # Get messages with pagination (most recent first, then reverse for display)
-            messages_response = await run_in_threadpool(
-                lambda: supabase.table("messages")
+            messages_response = await (
+                supabase.table("messages")
                 .select("*")
                 .eq("conversation_id", conversation_id)
                 .order("created_at", desc=True)
+                .order("id", desc=True)
                 .limit(limit)
                 .range(offset, offset + limit - 1)
                 .execute()
@@ -174,7 +147,9 @@ class ChatService:
                 "total_count": total_count,
                 "limit": limit,
                 "offset": offset,
-                "has_more": (offset + len(messages)) < total_count
+                "has_more": (offset + len(messages)) < total_count,
+                "before_cursor": encode_cursor(messages[0]) if messages else None,
+                "after_cursor": encode_cursor(messages[-1]) if messages else None
             }
             
         except HTTPException:
@@ -183,13 +158,54 @@ class ChatService:
             print("ERROR:", e)
             raise HTTPException(500, f"Failed to fetch messages: {str(e)}")
 
+    @staticmethod
+    async def get_messages_after_seq(conversation_id: str, user_id: str, after_seq: int, limit: int) -> dict:
+        """Messages with seq > after_seq, oldest first - the database side of a WebSocket resume"""
+        conversation = (
+            await supabase.table("conversations")
+            .select("id")
+            .eq("id", conversation_id)
+            .or_(f"participant1_id.eq.{user_id},participant2_id.eq.{user_id}")
+            .execute()
+        ).data
+
+        if not conversation:
+            raise HTTPException(403, "Not authorized to view this conversation")
+
+        rows = (
+            await supabase.table("messages")
+            .select("*")
+            .eq("conversation_id", conversation_id)
+            .gt("seq", after_seq)
+            .order("seq")
+            .limit(limit + 1)
+            .execute()
+        ).data or []
+
+        return {
+            "messages": [Message(**msg) for msg in rows[:limit]],
+            "has_more": len(rows) > limit
+        }
+
+    @staticmethod
+    async def _push_unread_count(user_id: str, conversation_id: str, unread_count: int):
+        """
+        Inbox badge for every socket of the user, from the summary read-model.
+        Counts are absolute, so a backed-up socket only needs the latest.
+        """
+        await manager.send_personal_message({
+            "type": "unread_count",
+            "conversation_id": str(conversation_id),
+            "unread_count": unread_count
+        }, user_id, coalesce_key=f"unread:{conversation_id}")
+
     @staticmethod
     async def send_message(conversation_id: str, user_id: str, content: str) -> Message:
         """Send a message in a conversation"""
         try:
             # Verify user is part of the conversation
             conversation = (
-                supabase.table("conversations")
+                await supabase.table("conversations")
                 .select("*")
                 .eq("id", conversation_id)
                 .or_(f"participant1_id.eq.{user_id},participant2_id.eq.{user_id}")
@@ -201,7 +217,7 @@ class ChatService:
             
             # Insert message
             message = (
-                supabase.table("messages")
+                await supabase.table("messages")
                 .insert({
                     "conversation_id": conversation_id,
                     "sender_id": user_id,
@@ -213,6 +229,12 @@ class ChatService:
             if not message:
                 raise HTTPException(500, "Failed to send message")
             
+            conv = conversation[0]
+            recipient_id = conv["participant2_id"] if conv["participant1_id"] == user_id else conv["participant1_id"]
+            unread = await ConversationSummaryService.record_message(message[0])
+            if unread is not None:
+                await ChatService._push_unread_count(str(recipient_id), conversation_id, unread)
+            
             return Message(**message[0])
             
         except HTTPException:
@@ -227,7 +249,7 @@ class ChatService:
         try:
             # Get the other participant's ID
             conversation = (
-                supabase.table("conversations")
+                await supabase.table("conversations")
                 .select("*")
                 .eq("id", conversation_id)
                 .or_(f"participant1_id.eq.{user_id},participant2_id.eq.{user_id}")
@@ -241,13 +263,16 @@ class ChatService:
             other_user_id = conv["participant2_id"] if conv["participant1_id"] == user_id else conv["participant1_id"]
             
             # Mark messages from other user as read
-            supabase.table("messages")\
+            await supabase.table("messages")\
                 .update({"read_at": "now()"})\
                 .eq("conversation_id", conversation_id)\
                 .eq("sender_id", other_user_id)\
                 .is_("read_at", "null")\
                 .execute()
             
+            await ConversationSummaryService.mark_read(conversation_id, user_id)
+            await ChatService._push_unread_count(user_id, conversation_id, 0)
+            
             return True
             
         except HTTPException:
@@ -261,8 +286,8 @@ class ChatService:
         """Delete entire conversation and all its messages"""
         try:
             # Verify user is a participant
-            conversation = await run_in_threadpool(
-                lambda: supabase.table("conversations")
+            conversation = await (
+                supabase.table("conversations")
                 .select("*")
                 .eq("id", conversation_id)
                 .or_(f"participant1_id.eq.{user_id},participant2_id.eq.{user_id}")
@@ -273,16 +298,16 @@ class ChatService:
                 raise HTTPException(403, "Not authorized to delete this conversation")
             
             # Delete all messages in the conversation first
-            await run_in_threadpool(
-                lambda: supabase.table("messages")
+            await (
+                supabase.table("messages")
                 .delete()
                 .eq("conversation_id", conversation_id)
                 .execute()
             )
             
             # Delete the conversation
-            await run_in_threadpool(
-                lambda: supabase.table("conversations")
+            await (
+                supabase.table("conversations")
                 .delete()
                 .eq("id", conversation_id)
                 .execute()
@@ -305,8 +330,8 @@ class ChatService:
         """Delete a specific message (only if user is the sender)"""
         try:
             # Verify user is the sender
-            message = await run_in_threadpool(
-                lambda: supabase.table("messages")
+            message = await (
+                supabase.table("messages")
                 .select("*")
                 .eq("id", message_id)
                 .eq("sender_id", user_id)
@@ -317,13 +342,15 @@ class ChatService:
                 raise HTTPException(403, "Not authorized to delete this message")
             
             # Delete the message
-            await run_in_threadpool(
-                lambda: supabase.table("messages")
+            await (
+                supabase.table("messages")
                 .delete()
                 .eq("id", message_id)
                 .execute()
             )
             
+            await ConversationSummaryService.refresh(message.data[0]["conversation_id"])
+            
             return {
                 "success": True,
                 "message": "Message deleted successfully",
@@ -342,8 +369,8 @@ class ChatService:
         """Update/edit a message (only if user is the sender)"""
         try:
             # Verify user is the sender
-            message = await run_in_threadpool(
-                lambda: supabase.table("messages")
+            message = await (
+                supabase.table("messages")
                 .select("*")
                 .eq("id", message_id)
                 .eq("sender_id", user_id)
@@ -355,8 +382,8 @@ class ChatService:
             
             # Update the message
             from datetime import datetime
-            updated_message = await run_in_threadpool(
-                lambda: supabase.table("messages")
+            updated_message = await (
+                supabase.table("messages")
                 .update({
                     "content": new_content,
                     "updated_at": datetime.now().isoformat()
@@ -368,6 +395,8 @@ class ChatService:
             if not updated_message.data:
                 raise HTTPException(500, "Failed to update message")
             
+            await ConversationSummaryService.refresh(message.data[0]["conversation_id"])
+            
             return {
                 "success": True,
                 "message": updated_message.data[0],
@@ -387,7 +416,7 @@ class ChatService:
         """Get conversation details for WebSocket"""
         try:
             conversation = (
-                supabase.table("conversations")
+                await supabase.table("conversations")
                 .select("*")
                 .eq("id", conversation_id)
                 .or_(f"participant1_id.eq.{user_id},participant2_id.eq.{user_id}")
@@ -0,0 +1,218 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Deque, List, Optional, Set, Union
+
+from fastapi import WebSocket
+
+from app.services.ws_protocol import JsonCodec
+
+DROP_OLDEST = "drop_oldest"
+COALESCE = "coalesce"
+DISCONNECT = "disconnect"
+SLOW_CONSUMER_POLICIES = (DROP_OLDEST, COALESCE, DISCONNECT)
+
+# Close code sent to a client that could not keep up ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+# Close code sent after a failed write
+SEND_FAILED_CLOSE_CODE = 1011
+# Close code sent to a client that stopped heartbeating ("going away")
+HEARTBEAT_TIMEOUT_CLOSE_CODE = 1001
+
+
+class OutboundFrame:
+    __slots__ = ("data", "coalesce_key", "group_id", "published_at")
+
+    def __init__(self, data: Union[str, bytes], coalesce_key: Optional[str], group_id: Optional[str], published_at: float):
+        self.data = data
+        self.coalesce_key = coalesce_key
+        self.group_id = group_id
+        self.published_at = published_at
+
+
+class ClientConnection:
+    """
+    One WebSocket plus its wire codec, bounded outbound queue and writer task
+
+    enqueue() never blocks: broadcasts append to the queue and return, and
+    the writer task drains it at whatever pace the client reads. When the
+    queue is full the slow-consumer policy decides what gives:
+
+    - drop_oldest: discard the oldest queued frame
+    - coalesce:    frames with a coalesce key (typing, presence) replace an
+                   older queued frame with the same key; when full, drop the
+                   oldest coalescible frame first, then the oldest frame
+    - disconnect:  close the socket so the client reconnects and resyncs
+
+    With a batch window set, a frame reaching an idle socket is written
+    straight away; while the socket is busy (it sent something within the
+    last window) the writer waits out the window and sends everything that
+    piled up as one {"type": "batch", "events": [...]} frame.
+
+    A failed write or a slow-consumer disconnect marks the connection closed
+    and calls on_closed, so the owner can deregister it straight away
+    instead of queueing frames for a dead socket until its receive loop
+    notices.
+    """
+
+    def __init__(
+        self,
+        user_id: str,
+        websocket: WebSocket,
+        max_queue: int = 256,
+        policy: str = DROP_OLDEST,
+        on_sent: Optional[Callable[[OutboundFrame, float], None]] = None,
+        on_closed: Optional[Callable[["ClientConnection"], None]] = None,
+        codec: type = JsonCodec,
+        batch_window: float = 0.0,
+        batch_max: int = 64,
+    ):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+
+        self.user_id = user_id
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.policy = policy
+        self.on_sent = on_sent
+        self.on_closed = on_closed
+        self.codec = codec
+        self.batch_window = batch_window
+        self.batch_max = batch_max
+        self.dropped = 0
+        self.coalesced = 0
+        self.sent = 0
+        self.batches = 0
+        # Groups this socket joined; another tab of the same user may differ
+        self.groups: Set[str] = set()
+        self._last_write = 0.0
+        self.closed = False
+        self._queue: Deque[OutboundFrame] = deque()
+        self._ready = asyncio.Event()
+        self._writer = asyncio.create_task(self._run())
+
+    @property
+    def queue_size(self) -> int:
+        return len(self._queue)
+
+    async def receive(self) -> Any:
+        return await self.codec.receive(self.websocket)
+
+    def send(self, message: Any) -> bool:
+        """Queue a frame for this socket only"""
+        return self.enqueue(self.codec.encode(message))
+
+    def enqueue(
+        self,
+        data: Union[str, bytes],
+        coalesce_key: Optional[str] = None,
+        group_id: Optional[str] = None,
+        published_at: Optional[float] = None,
+    ) -> bool:
+        if self.closed:
+            return False
+
+        frame = OutboundFrame(data, coalesce_key, group_id, published_at or time.time())
+
+        if coalesce_key and self.policy == COALESCE and self._replace(frame):
+            return True
+
+        if len(self._queue) >= self.max_queue:
+            if self.policy == DISCONNECT:
+                self._overflow_disconnect()
+                return False
+            self._drop_one()
+
+        self._queue.append(frame)
+        self._ready.set()
+        return True
+
+    def _replace(self, frame: OutboundFrame) -> bool:
+        for index, queued in enumerate(self._queue):
+            if queued.coalesce_key == frame.coalesce_key:
+                self._queue[index] = frame
+                self.coalesced += 1
+                return True
+        return False
+
+    def _drop_one(self):
+        if self.policy == COALESCE:
+            for index, queued in enumerate(self._queue):
+                if queued.coalesce_key:
+                    del self._queue[index]
+                    self.dropped += 1
+                    return
+        self._queue.popleft()
+        self.dropped += 1
+
+    def _overflow_disconnect(self):
+        print(f"⚠️ Disconnecting slow consumer {self.user_id} ({len(self._queue)} frames queued)")
+        self._writer.cancel()
+        self._abandon(SLOW_CONSUMER_CLOSE_CODE)
+
+    def _abandon(self, code: int):
+        """Stop writing for good: drop what is queued, close the socket, tell the owner"""
+        self.dropped += len(self._queue)
+        self._queue.clear()
+        self.closed = True
+        asyncio.create_task(self._close_socket(code))
+        if self.on_closed:
+            self.on_closed(self)
+
+    async def _close_socket(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    async def _run(self):
+        while True:
+            await self._ready.wait()
+            if self.batch_window:
+                # Busy socket: let the rest of the burst arrive first
+                wait = self._last_write + self.batch_window - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            while self._queue:
+                count = min(len(self._queue), self.batch_max) if self.batch_window else 1
+                frames = [self._queue.popleft() for _ in range(count)]
+                await self._write(frames)
+                if self.closed:
+                    return
+            self._ready.clear()
+
+    async def _write(self, frames: List[OutboundFrame]):
+        if len(frames) == 1:
+            data = frames[0].data
+        else:
+            data = self.codec.batch([frame.data for frame in frames])
+        try:
+            if isinstance(data, bytes):
+                await self.websocket.send_bytes(data)
+            else:
+                await self.websocket.send_text(data)
+        except Exception as e:
+            print(f"Error sending message to {self.user_id}, dropping the connection: {e}")
+            self.dropped += len(frames)
+            self._abandon(SEND_FAILED_CLOSE_CODE)
+            return
+        self._last_write = time.monotonic()
+        self.sent += len(frames)
+        if len(frames) > 1:
+            self.batches += 1
+        if self.on_sent:
+            sent_at = time.time()
+            for frame in frames:
+                self.on_sent(frame, sent_at)
+
+    async def close(self, code: Optional[int] = None):
+        """Stop the writer; with a close code, also close the socket itself"""
+        self.closed = True
+        self._queue.clear()
+        self._writer.cancel()
+        try:
+            await self._writer
+        except (asyncio.CancelledError, Exception):
+            pass
+        if code is not None:
+            await self._close_socket(code)
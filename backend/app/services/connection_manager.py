@@ -0,0 +1,354 @@
+from fastapi import WebSocket
+from typing import Dict, List, Optional, Set
+import asyncio
+import json
+import time
+
+from app.core.config import WS_BATCH_MAX_EVENTS, WS_BATCH_WINDOW_MS, WS_SEND_QUEUE_SIZE, WS_SLOW_CONSUMER_POLICY
+from app.core.metrics import LatencyRecorder
+from app.services.client_connection import HEARTBEAT_TIMEOUT_CLOSE_CODE, ClientConnection
+from app.services.presence import PRESENCE_CHANNEL, PresenceTracker
+from app.services.realtime_broker import create_broker
+from app.services.replay_buffer import ReplayBuffer
+from app.services.typing_aggregator import TypingAggregator
+from app.services.ws_protocol import negotiate
+
+
+def user_channel(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+def group_channel(group_id: str) -> str:
+    return f"group:{group_id}"
+
+
+# Broker channel announcing profile edits, so every worker drops its cached row
+PROFILE_CHANNEL = "profiles"
+# Broker channel announcing group membership changes, for the same reason
+MEMBERSHIP_CHANNEL = "memberships"
+
+
+# Store active WebSocket connections
+class ConnectionManager:
+    """
+    Tracks this worker's WebSocket connections and routes frames through a
+    broker, so users connected to different workers still reach each other
+    """
+
+    def __init__(
+        self,
+        broker=None,
+        max_queue: int = WS_SEND_QUEUE_SIZE,
+        policy: str = WS_SLOW_CONSUMER_POLICY,
+        batch_window: float = WS_BATCH_WINDOW_MS / 1000,
+    ):
+        # Map of user_id -> that user's open sockets (tabs/devices) on this worker
+        self.active_connections: Dict[str, Set[ClientConnection]] = {}
+        # Map of group_id -> local user_id -> that user's sockets that joined the group
+        self.group_subscriptions: Dict[str, Dict[str, Set[ClientConnection]]] = {}
+        self.broker = broker or create_broker()
+        self.broker.set_handler(self._deliver)
+        self.max_queue = max_queue
+        self.policy = policy
+        self.batch_window = batch_window
+        # Publish -> written-to-socket latency of group broadcasts, per group
+        self.fanout_latency = LatencyRecorder()
+        # Sockets dropped after a failed write or overflow, and the frames they lost
+        self.lost_connections = 0
+        self.lost_frames = 0
+        self.typing = TypingAggregator(self._flush_typing)
+        # Recent sequenced events per group/conversation for resume
+        self.replay = ReplayBuffer()
+        self.presence = PresenceTracker(self._publish_presence, self._deliver_presence, self._presence_timeout)
+
+    async def start(self):
+        await self.broker.start()
+        await self.broker.subscribe(PRESENCE_CHANNEL)
+        await self.broker.subscribe(PROFILE_CHANNEL)
+        await self.broker.subscribe(MEMBERSHIP_CHANNEL)
+        await self.typing.start()
+        await self.presence.start()
+
+    async def close(self):
+        await self.presence.close()
+        await self.typing.close()
+        await self.broker.close()
+
+    async def connect(self, user_id: str, websocket: WebSocket) -> ClientConnection:
+        codec = negotiate(websocket)
+        await websocket.accept(subprotocol=codec.subprotocol)
+        connection = ClientConnection(
+            user_id, websocket, self.max_queue, self.policy, on_sent=self._record_sent,
+            on_closed=self._connection_lost, codec=codec,
+            batch_window=self.batch_window, batch_max=WS_BATCH_MAX_EVENTS,
+        )
+        connections = self.active_connections.get(user_id)
+        if connections is None:
+            # First socket for this user on this worker
+            connections = self.active_connections[user_id] = set()
+            await self.broker.subscribe(user_channel(user_id))
+            self.presence.connect(user_id)
+        connections.add(connection)
+        print(f"User {user_id} connected ({len(connections)} device(s)). Total users: {len(self.active_connections)}")
+        return connection
+
+    def _connection_lost(self, connection: ClientConnection):
+        """A socket failed a write or fell too far behind - deregister it now"""
+        self.lost_connections += 1
+        self.lost_frames += connection.dropped
+        asyncio.create_task(self.disconnect(connection.user_id, connection.websocket))
+
+    async def disconnect(self, user_id: str, websocket: Optional[WebSocket] = None, code: Optional[int] = None):
+        """
+        Drop one socket of a user (or all of them when websocket is None),
+        along with the group subscriptions of just those sockets.
+        Pass a close code to also close sockets the client still holds open.
+        """
+        connections = self.active_connections.get(user_id)
+        if not connections:
+            return
+
+        closing = [c for c in connections if websocket is None or c.websocket is websocket]
+        for connection in closing:
+            connections.discard(connection)
+            for group_id in list(connection.groups):
+                await self._leave_group(connection, group_id)
+            await connection.close(code)
+
+        if not connections:
+            del self.active_connections[user_id]
+            self.presence.disconnect(user_id)
+            await self.broker.unsubscribe(user_channel(user_id))
+            self.replay.forget(user_channel(user_id))
+        print(f"User {user_id} disconnected. Total users: {len(self.active_connections)}")
+
+    async def send_personal_message(
+        self, message: dict, user_id: str, coalesce_key: Optional[str] = None, stream: Optional[str] = None
+    ):
+        """
+        Send a frame to every socket of a user. Pass the stream
+        ("conversation:<id>") for sequenced frames so they can be replayed.
+        """
+        envelope = self._envelope(message, coalesce_key, stream=stream if message.get("seq") is not None else None)
+        await self.broker.publish(user_channel(user_id), envelope)
+
+    # Group chat methods
+    async def subscribe_to_group(self, user_id: str, group_id: str, connection: Optional[ClientConnection] = None):
+        """
+        Subscribe one socket of a user to a group for real-time updates
+        (every socket of the user when connection is None)
+        """
+        joining = [connection] if connection is not None else list(self.active_connections.get(user_id, ()))
+        for conn in joining:
+            members = self.group_subscriptions.get(group_id)
+            if members is None:
+                members = self.group_subscriptions[group_id] = {}
+                await self.broker.subscribe(group_channel(group_id))
+            members.setdefault(user_id, set()).add(conn)
+            conn.groups.add(group_id)
+        print(f"User {user_id} subscribed to group {group_id}. Total subscribers: {len(self.group_subscriptions.get(group_id, ()))}")
+
+    async def unsubscribe_from_group(self, user_id: str, group_id: str, connection: Optional[ClientConnection] = None):
+        """
+        Unsubscribe one socket of a user from a group (every socket of the
+        user when connection is None). The user stays subscribed while any
+        other of their sockets is still joined.
+        """
+        leaving = [connection] if connection is not None else list(self.active_connections.get(user_id, ()))
+        for conn in leaving:
+            await self._leave_group(conn, group_id)
+        print(f"User {user_id} unsubscribed from group {group_id}")
+
+    async def _leave_group(self, connection: ClientConnection, group_id: str):
+        connection.groups.discard(group_id)
+        members = self.group_subscriptions.get(group_id)
+        if members is None:
+            return
+        sockets = members.get(connection.user_id)
+        if sockets is not None:
+            sockets.discard(connection)
+            if not sockets:
+                del members[connection.user_id]
+        if not members:
+            del self.group_subscriptions[group_id]
+            await self.broker.unsubscribe(group_channel(group_id))
+            self.replay.forget(group_channel(group_id))
+
+    async def send_group_message(self, message: dict, group_id: str, coalesce_key: Optional[str] = None):
+        """Send message to all users subscribed to a group, on every worker"""
+        stream = group_channel(group_id) if message.get("seq") is not None else None
+        await self.broker.publish(group_channel(group_id), self._envelope(message, coalesce_key, stream=stream))
+
+    async def send_typing(self, group_id: str, user_id: str):
+        """
+        Note that a user is typing in a group. Keystroke bursts are throttled
+        here; subscribers get the merged users_typing frame from each
+        worker's flush loop rather than one frame per event.
+        """
+        if not self.typing.allow(group_id, user_id):
+            return
+        await self.broker.publish(
+            group_channel(group_id), self._envelope({"user_id": user_id}, None, op="typing")
+        )
+
+    async def _flush_typing(self, group_id: str, user_ids: list):
+        message = {"type": "users_typing", "group_id": group_id, "user_ids": user_ids}
+        self._enqueue_group(group_id, message, f"typing:{group_id}", time.time())
+
+    async def publish_profile_change(self, user_id: str):
+        """Tell the other workers a profile changed; this one already cached the new row"""
+        await self.broker.publish(
+            PROFILE_CHANNEL, json.dumps({"worker": self.presence.worker_id, "user_id": str(user_id)})
+        )
+
+    async def publish_membership_change(self, group_id: str, user_ids: Optional[List[str]] = None):
+        """
+        Tell the other workers memberships in a group changed - for user_ids,
+        or for everyone when None (the group was deleted)
+        """
+        await self.broker.publish(MEMBERSHIP_CHANNEL, json.dumps({
+            "worker": self.presence.worker_id,
+            "group_id": str(group_id),
+            "user_ids": [str(user_id) for user_id in user_ids] if user_ids is not None else None,
+        }))
+
+    def _apply_membership_change(self, change: dict):
+        # Imported here so the connection manager does not need Supabase configured
+        from app.core.membership import invalidate_group, invalidate_member
+        if change["user_ids"] is None:
+            invalidate_group(change["group_id"])
+            return
+        for user_id in change["user_ids"]:
+            invalidate_member(change["group_id"], user_id)
+            self.presence.forget_audience(user_id)
+
+    async def _publish_presence(self, payload: dict):
+        await self.broker.publish(PRESENCE_CHANNEL, json.dumps(payload))
+
+    async def _deliver_presence(self, changes: list):
+        """
+        Tell this worker's sockets about presence changes: subscribers of the
+        changed user's groups and their connected friends. Each recipient gets
+        one presence frame covering every change in the batch.
+        """
+        frames: Dict[str, Dict[str, dict]] = {}
+        for user_id, state, group_ids, friend_ids in changes:
+            recipients = set()
+            for group_id in group_ids:
+                recipients.update(self.group_subscriptions.get(group_id, ()))
+            recipients.update(f for f in friend_ids if f in self.active_connections)
+            recipients.discard(user_id)
+            for recipient in recipients:
+                frames.setdefault(recipient, {})[user_id] = state
+
+        now = time.time()
+        for recipient, users in frames.items():
+            message = {"type": "presence", "users": users}
+            encoded = {}
+            for connection in self.active_connections.get(recipient, ()):
+                connection.enqueue(self._encode(message, connection.codec, encoded), None, None, now)
+
+    async def _presence_timeout(self, user_id: str):
+        """A heartbeating client went silent - close its half-open sockets"""
+        print(f"User {user_id} missed heartbeats, closing their connections")
+        await self.disconnect(user_id, code=HEARTBEAT_TIMEOUT_CLOSE_CODE)
+
+    @staticmethod
+    def _envelope(
+        message: dict, coalesce_key: Optional[str], op: Optional[str] = None, stream: Optional[str] = None
+    ) -> str:
+        envelope = {"ts": time.time(), "key": coalesce_key, "message": message}
+        if op:
+            envelope["op"] = op
+        if stream:
+            envelope["stream"] = stream
+        return json.dumps(envelope)
+
+    async def _deliver(self, channel: str, payload: str):
+        """
+        Broker callback - queue a published frame on this worker's sockets
+
+        The frame is serialized at most once per wire format and only
+        enqueued here; each connection's writer task does the actual send,
+        so one slow client never holds up the rest of the group.
+        """
+        if channel == PRESENCE_CHANNEL:
+            await self.presence.apply(json.loads(payload))
+            return
+        if channel == PROFILE_CHANNEL:
+            change = json.loads(payload)
+            if change.get("worker") != self.presence.worker_id:
+                # Imported here so the connection manager does not need Supabase configured
+                from app.core.profile_loader import invalidate_profile
+                invalidate_profile(change["user_id"])
+            return
+        if channel == MEMBERSHIP_CHANNEL:
+            change = json.loads(payload)
+            if change.get("worker") != self.presence.worker_id:
+                self._apply_membership_change(change)
+            return
+        kind, _, target = channel.partition(":")
+        envelope = json.loads(payload)
+        if envelope.get("op") == "typing":
+            if target in self.group_subscriptions:
+                self.typing.add(target, envelope["message"]["user_id"])
+            return
+        message = envelope["message"]
+        if envelope.get("stream"):
+            self.replay.record(envelope["stream"], message["seq"], message, channel)
+
+        if kind == "user":
+            encoded = {}
+            for connection in self.active_connections.get(target, ()):
+                data = self._encode(message, connection.codec, encoded)
+                connection.enqueue(data, envelope.get("key"), None, envelope["ts"])
+        elif kind == "group":
+            sender_id = (message.get("message") or {}).get("sender_id") if message.get("type") == "new_group_message" else None
+            if sender_id:
+                # The sender stopped typing - don't wait for the TTL to clear them
+                self.typing.remove(target, str(sender_id))
+            self._enqueue_group(target, message, envelope.get("key"), envelope["ts"])
+
+    def _enqueue_group(self, group_id: str, message: dict, coalesce_key: Optional[str], published_at: float):
+        encoded = {}
+        for connections in self.group_subscriptions.get(group_id, {}).values():
+            for connection in connections:
+                data = self._encode(message, connection.codec, encoded)
+                connection.enqueue(data, coalesce_key, group_id, published_at)
+
+    @staticmethod
+    def _encode(message: dict, codec, encoded: dict):
+        """Serialize once per codec for the whole fan-out"""
+        data = encoded.get(codec.name)
+        if data is None:
+            data = encoded[codec.name] = codec.encode(message)
+        return data
+
+    def _record_sent(self, frame, sent_at: float):
+        if frame.group_id:
+            self.fanout_latency.record(frame.group_id, sent_at - frame.published_at)
+
+    def stats(self) -> dict:
+        connections = [c for user_connections in self.active_connections.values() for c in user_connections]
+        return {
+            "users": len(self.active_connections),
+            "connections": len(connections),
+            "msgpack_connections": sum(1 for c in connections if c.codec.name == "msgpack"),
+            "groups": len(self.group_subscriptions),
+            "slow_consumer_policy": self.policy,
+            "max_queue": self.max_queue,
+            "queued_frames": sum(c.queue_size for c in connections),
+            "dropped_frames": self.lost_frames + sum(c.dropped for c in connections),
+            "lost_connections": self.lost_connections,
+            "coalesced_frames": sum(c.coalesced for c in connections),
+            "batch_window_ms": self.batch_window * 1000,
+            "sent_events": sum(c.sent for c in connections),
+            "sent_batches": sum(c.batches for c in connections),
+            "typing": self.typing.stats(),
+            "replay": self.replay.stats(),
+            "presence": self.presence.stats(),
+            "group_fanout_latency": self.fanout_latency.snapshot(),
+        }
+
+
+manager = ConnectionManager()
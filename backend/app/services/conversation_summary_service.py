@@ -0,0 +1,46 @@
+from app.core.supabase import supabase
+from typing import Optional
+
+
+class ConversationSummaryService:
+    """
+    Keeps the conversation_summaries read-model in step with messages
+    (see migrations/009_conversation_summaries.sql)
+
+    Failures are logged and swallowed: the message write already succeeded,
+    and summary_refresh() can rebuild any row that drifts.
+    """
+
+    @staticmethod
+    async def record_message(message: dict) -> Optional[int]:
+        """Apply a newly sent message; returns the recipient's unread count"""
+        try:
+            result = await supabase.rpc(
+                "summary_apply_message",
+                {"p_message": message}
+            ).execute()
+            return result.data
+        except Exception as e:
+            print(f"⚠️ Failed to update conversation summary: {e}")
+            return None
+
+    @staticmethod
+    async def mark_read(conversation_id: str, user_id: str) -> None:
+        try:
+            await supabase.rpc(
+                "summary_mark_read",
+                {"p_conversation_id": conversation_id, "p_user_id": user_id}
+            ).execute()
+        except Exception as e:
+            print(f"⚠️ Failed to reset unread count: {e}")
+
+    @staticmethod
+    async def refresh(conversation_id: str) -> None:
+        """Recompute after a message was edited or deleted"""
+        try:
+            await supabase.rpc(
+                "summary_refresh",
+                {"p_conversation_id": conversation_id}
+            ).execute()
+        except Exception as e:
+            print(f"⚠️ Failed to refresh conversation summary: {e}")
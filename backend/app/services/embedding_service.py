@@ -88,7 +88,7 @@ async def store_question_embeddings(assignment_id: str, questions: List[Dict]):
             }
             
             try:
-                supabase.table("question_embeddings").insert(data).execute()
+                await supabase.table("question_embeddings").insert(data).execute()
                 print(f"✅ Stored embedding for Q: {text[:20]}...")
             except Exception as e:
                 print(f"❌ DB Error storing embedding: {e}")
@@ -1,6 +1,7 @@
 from app.core.supabase import supabase
 from fastapi import HTTPException
 from app.schemas.friends import Friend
+from app.services.connection_manager import manager
 
 class Friendservices:
     @staticmethod
@@ -8,7 +9,7 @@ class Friendservices:
         try:
            
             request = (
-                supabase.table("friend_request")
+                await supabase.table("friend_request")
                 .select("*")
                 .eq("id", request_id)
                 .eq("receiver_id", user_id)
@@ -20,19 +21,21 @@ class Friendservices:
                 raise HTTPException(404, "Friend request not found")
 
         
-            supabase.table("friend_request")\
+            await supabase.table("friend_request")\
                 .update({"status": "accepted"})\
                 .eq("id", request[0]["id"])\
                 .execute()
 
         
-            supabase.table("friends").insert({
+            await supabase.table("friends").insert({
                 "user_id": user_id,
                 "friend_id": request[0]["sender_id"]
             }).execute()
+            manager.presence.forget_audience(user_id)
+            manager.presence.forget_audience(request[0]["sender_id"])
 
         
-            supabase.table("friend_request")\
+            await supabase.table("friend_request")\
                 .delete()\
                 .eq("id", request[0]["id"])\
                 .execute()
@@ -49,7 +52,7 @@ class Friendservices:
     async def addfriend(user_id: str, friend_id: str):
         try:
             existing = (
-                supabase
+                await supabase
                 .table("friends")
                 .select("*")
                 .or_(
@@ -63,7 +66,7 @@ class Friendservices:
                 raise HTTPException(400, "Friend request already exists")
 
             response = (
-                supabase
+                await supabase
                 .table("friend_request")
                 .insert({
                     "sender_id": user_id,
@@ -88,7 +91,7 @@ class Friendservices:
     async def getfriends(user_id: str):
         try:
             rows = (
-                supabase
+                await supabase
                 .table("friends")
                 .select("user_id, friend_id, created_at")
                 .or_(f"user_id.eq.{user_id},friend_id.eq.{user_id}")
@@ -104,7 +107,7 @@ class Friendservices:
             ]
 
             profiles = (
-                supabase
+                await supabase
                 .table("profiles")
                 .select("id, username")
                 .in_("id", friend_ids)
@@ -136,7 +139,7 @@ class Friendservices:
     async def unfriend(user_id: str, friend_id: str):
         try:
             response = (
-                supabase
+                await supabase
                 .table("friends")
                 .delete()
                 .or_(
@@ -148,6 +151,8 @@ class Friendservices:
 
             if not response.data:
                 raise HTTPException(500, "Failed to unfriend user")
+            manager.presence.forget_audience(user_id)
+            manager.presence.forget_audience(friend_id)
 
             return True
 
@@ -158,7 +163,7 @@ class Friendservices:
     async def searchfriends(query: str):
         try:
             rows = (
-                supabase
+                await supabase
                 .table("profiles")
                 .select("id, username")
                 .ilike("username", f"%{query}%")
@@ -183,7 +188,7 @@ class Friendservices:
         """Get all pending friend requests for the current user"""
         try:
             rows = (
-                supabase
+                await supabase
                 .table("friend_request")
                 .select("id, sender_id, receiver_id, status, created_at")
                 .eq("receiver_id", user_id)
@@ -197,7 +202,7 @@ class Friendservices:
             # Get sender profiles
             sender_ids = [r["sender_id"] for r in rows]
             profiles = (
-                supabase
+                await supabase
                 .table("profiles")
                 .select("id, username")
                 .in_("id", sender_ids)
@@ -227,7 +232,7 @@ class Friendservices:
         try:
             # Find the pending request
             request = (
-                supabase.table("friend_request")
+                await supabase.table("friend_request")
                 .select("*")
                 .eq("id", request_id)
                 .eq("receiver_id", user_id)
@@ -239,7 +244,7 @@ class Friendservices:
                 raise HTTPException(404, "Friend request not found")
 
             # Delete the request
-            supabase.table("friend_request")\
+            await supabase.table("friend_request")\
                 .delete()\
                 .eq("id", request[0]["id"])\
                 .execute()
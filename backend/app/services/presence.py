@@ -0,0 +1,515 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.cache import TTLCache
+from app.core.config import (
+    PRESENCE_AUDIENCE_CACHE_SIZE,
+    PRESENCE_AUDIENCE_TTL,
+    PRESENCE_AWAY_SECONDS,
+    PRESENCE_FLUSH_INTERVAL_MS,
+    PRESENCE_HEARTBEAT_TIMEOUT_SECONDS,
+    PRESENCE_IDLE_SECONDS,
+    PRESENCE_LAST_SEEN_CACHE_SIZE,
+    PRESENCE_SYNC_SECONDS,
+    PRESENCE_USER_MIN_INTERVAL_MS,
+)
+
+# Broker channel every worker subscribes to for presence changes
+PRESENCE_CHANNEL = "presence"
+
+ONLINE, IDLE, AWAY, OFFLINE = "online", "idle", "away", "offline"
+# A user connected to several workers shows their most present status
+_RANK = {OFFLINE: 0, AWAY: 1, IDLE: 2, ONLINE: 3}
+
+# Ids per group_members / friends query when loading audiences
+_AUDIENCE_CHUNK = 200
+
+# Largest bulk presence lookup accepted from a client
+MAX_PRESENCE_QUERY = 500
+
+PublishHandler = Callable[[dict], Awaitable[None]]
+# (user_id, public state, group_ids, friend_ids) for each user whose presence changed
+ChangeHandler = Callable[[List[Tuple[str, dict, List[str], List[str]]]], Awaitable[None]]
+TimeoutHandler = Callable[[str], Awaitable[None]]
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat() if timestamp else None
+
+
+def _is_uuid(value: str) -> bool:
+    try:
+        uuid.UUID(value)
+        return True
+    except ValueError:
+        return False
+
+
+class _LocalUser:
+    """Presence of a user with sockets on this worker"""
+
+    __slots__ = ("status", "announced", "active_at", "active_wall", "heartbeat_at", "heartbeats", "bucket")
+
+    def __init__(self, now: float):
+        self.status = ONLINE
+        # Last status this worker published for the user
+        self.announced = OFFLINE
+        self.active_at = now
+        self.active_wall = time.time()
+        self.heartbeat_at = now
+        # Only clients that send heartbeats can time out; older clients rely on the socket closing
+        self.heartbeats = False
+        self.bucket: Optional[int] = None
+
+
+class PresenceTracker:
+    """
+    Online / idle / away / offline for every user, kept in step across workers
+
+    Local side, for users with sockets on this worker:
+    - touch() records activity (any client frame) and heartbeats
+    - idle/away transitions and heartbeat timeouts sit in a timing wheel of
+      one-second buckets, so each sweep only looks at users whose deadline
+      has passed instead of every connection
+    - changes are published once per flush interval as a single broker
+      message, at most once per user per PRESENCE_USER_MIN_INTERVAL_MS, with
+      the user's groups and friends (loaded in batches and cached) attached
+
+    Shared side, on every worker:
+    - apply() folds each worker's published changes into a view of everyone
+      online, which answers bulk presence lookups without a database query
+    - when a user's overall status actually changes, on_change gets it along
+      with the audience so the manager can notify local subscribers
+    """
+
+    def __init__(
+        self,
+        publish: PublishHandler,
+        on_change: ChangeHandler,
+        on_timeout: TimeoutHandler,
+        idle_after: float = PRESENCE_IDLE_SECONDS,
+        away_after: float = PRESENCE_AWAY_SECONDS,
+        timeout: float = PRESENCE_HEARTBEAT_TIMEOUT_SECONDS,
+        interval: float = PRESENCE_FLUSH_INTERVAL_MS / 1000,
+        min_interval: float = PRESENCE_USER_MIN_INTERVAL_MS / 1000,
+        sync_every: float = PRESENCE_SYNC_SECONDS,
+        resolution: float = 1.0,
+    ):
+        self.publish = publish
+        self.on_change = on_change
+        self.on_timeout = on_timeout
+        self.idle_after = idle_after
+        self.away_after = away_after
+        self.timeout = timeout
+        self.interval = interval
+        self.min_interval = min_interval
+        self.sync_every = sync_every
+        self.resolution = resolution
+        self.worker_id = uuid.uuid4().hex
+
+        # --- local users ---
+        self._local: Dict[str, _LocalUser] = {}
+        self._counts = {ONLINE: 0, IDLE: 0, AWAY: 0}
+        # bucket number -> user_ids due for a check in that bucket
+        self._wheel: Dict[int, Set[str]] = {}
+        self._swept = int(time.monotonic() / resolution)
+        self._dirty: Set[str] = set()
+        # user_id -> when their presence was last published, oldest first
+        self._published: "OrderedDict[str, float]" = OrderedDict()
+        # user_id -> (group_ids, friend_ids)
+        self.audiences = TTLCache(maxsize=PRESENCE_AUDIENCE_CACHE_SIZE, ttl=PRESENCE_AUDIENCE_TTL)
+
+        # --- shared view ---
+        # user_id -> worker_id -> (status, last_active wall time, expires_at)
+        self._view: Dict[str, Dict[str, Tuple[str, float, float]]] = {}
+        self._worker_users: Dict[str, Set[str]] = {}
+        self._worker_seen: Dict[str, float] = {}
+        # user_id -> last activity wall time, for users nobody has online
+        self.last_seen = TTLCache(maxsize=PRESENCE_LAST_SEEN_CACHE_SIZE, ttl=7 * 24 * 3600)
+
+        self._task = None
+        self._last_sync = time.monotonic()
+        self.published = 0
+        self.deferred = 0
+        self.delivered_changes = 0
+        self.timeouts = 0
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Tell the other workers this one's users are gone rather than waiting for expiry
+        if self._local:
+            now = time.time()
+            updates = [[user_id, OFFLINE, now, [], []] for user_id in self._local]
+            try:
+                await self.publish({"worker": self.worker_id, "updates": updates})
+            except Exception as e:
+                print(f"Error publishing presence on shutdown: {e}")
+
+    # ==================== LOCAL USERS ====================
+
+    def connect(self, user_id: str):
+        """First socket of a user opened on this worker"""
+        now = time.monotonic()
+        entry = self._local.get(user_id)
+        if entry is None:
+            entry = self._local[user_id] = _LocalUser(now)
+            self._counts[ONLINE] += 1
+        else:
+            # Reconnected before the offline was flushed
+            entry.active_at = entry.heartbeat_at = now
+            entry.active_wall = time.time()
+            self._set_status(entry, ONLINE)
+        self._dirty.add(user_id)
+        self._schedule(user_id, entry)
+
+    def disconnect(self, user_id: str):
+        """Last socket of a user on this worker closed"""
+        entry = self._local.get(user_id)
+        if entry is None:
+            return
+        self._unschedule(user_id, entry)
+        self._set_status(entry, OFFLINE)
+        self._dirty.add(user_id)
+
+    def touch(self, user_id: str, active: bool = True, heartbeat: bool = False):
+        """
+        A frame arrived from the user. Every frame proves the socket is alive;
+        active=False (a heartbeat from a backgrounded tab) does not reset idle.
+        """
+        entry = self._local.get(user_id)
+        if entry is None or entry.status == OFFLINE:
+            return
+        now = time.monotonic()
+        entry.heartbeat_at = now
+        if heartbeat:
+            entry.heartbeats = True
+        if active:
+            entry.active_at = now
+            entry.active_wall = time.time()
+            if entry.status != ONLINE:
+                self._set_status(entry, ONLINE)
+                self._dirty.add(user_id)
+        self._schedule(user_id, entry)
+
+    def _set_status(self, entry: _LocalUser, status: str):
+        if entry.status != OFFLINE:
+            self._counts[entry.status] -= 1
+        entry.status = status
+        if status != OFFLINE:
+            self._counts[status] += 1
+
+    def _status_for(self, entry: _LocalUser, now: float) -> str:
+        inactive = now - entry.active_at
+        if inactive >= self.away_after:
+            return AWAY
+        if inactive >= self.idle_after:
+            return IDLE
+        return ONLINE
+
+    def _next_check(self, entry: _LocalUser) -> Optional[float]:
+        due = None
+        if entry.status == ONLINE:
+            due = entry.active_at + self.idle_after
+        elif entry.status == IDLE:
+            due = entry.active_at + self.away_after
+        if entry.heartbeats:
+            expires = entry.heartbeat_at + self.timeout
+            due = expires if due is None else min(due, expires)
+        return due
+
+    def _schedule(self, user_id: str, entry: _LocalUser):
+        due = self._next_check(entry)
+        bucket = None if due is None else int(due / self.resolution) + 1
+        if bucket == entry.bucket:
+            return
+        self._unschedule(user_id, entry)
+        if bucket is not None:
+            self._wheel.setdefault(bucket, set()).add(user_id)
+            entry.bucket = bucket
+
+    def _unschedule(self, user_id: str, entry: _LocalUser):
+        if entry.bucket is None:
+            return
+        users = self._wheel.get(entry.bucket)
+        if users is not None:
+            users.discard(user_id)
+            if not users:
+                del self._wheel[entry.bucket]
+        entry.bucket = None
+
+    async def sweep(self):
+        """Re-evaluate only the users whose idle/away/timeout deadline has passed"""
+        now = time.monotonic()
+        current = int(now / self.resolution)
+        timed_out = []
+        while self._swept < current:
+            self._swept += 1
+            for user_id in self._wheel.pop(self._swept, ()):
+                entry = self._local.get(user_id)
+                if entry is None or entry.bucket != self._swept:
+                    continue
+                entry.bucket = None
+                if entry.heartbeats and now - entry.heartbeat_at >= self.timeout:
+                    timed_out.append(user_id)
+                    continue
+                status = self._status_for(entry, now)
+                if status != entry.status:
+                    self._set_status(entry, status)
+                    self._dirty.add(user_id)
+                self._schedule(user_id, entry)
+
+        for user_id in timed_out:
+            self.timeouts += 1
+            self.disconnect(user_id)
+            try:
+                await self.on_timeout(user_id)
+            except Exception as e:
+                print(f"Error closing timed-out connections of {user_id}: {e}")
+
+    async def flush(self):
+        """Publish this worker's changed users as one broker message"""
+        now = time.monotonic()
+        while self._published:
+            user_id, published_at = next(iter(self._published.items()))
+            if now - published_at < self.min_interval:
+                break
+            del self._published[user_id]
+
+        ready, deferred = [], set()
+        for user_id in self._dirty:
+            entry = self._local.get(user_id)
+            if entry is None or entry.status == entry.announced:
+                # Flapped back (e.g. a quick reconnect) - nothing to tell anyone
+                if entry is not None and entry.status == OFFLINE:
+                    del self._local[user_id]
+                continue
+            if user_id in self._published:
+                # Changed again too soon - held until the user's window passes
+                deferred.add(user_id)
+                continue
+            ready.append(user_id)
+        self.deferred += len(deferred)
+        self._dirty = deferred
+        if not ready:
+            return
+
+        await self._load_audiences(ready)
+        updates = []
+        for user_id in ready:
+            entry = self._local.get(user_id)
+            if entry is None:
+                continue
+            groups, friends = self.audiences.get(user_id) or ((), ())
+            updates.append([user_id, entry.status, entry.active_wall, list(groups), list(friends)])
+            entry.announced = entry.status
+            self._published[user_id] = now
+            if entry.status == OFFLINE:
+                del self._local[user_id]
+
+        self.published += len(updates)
+        try:
+            await self.publish({"worker": self.worker_id, "updates": updates})
+        except Exception as e:
+            print(f"Error publishing presence: {e}")
+
+    async def sync(self):
+        """Re-announce every local user so other workers can expire stale entries"""
+        now = time.monotonic()
+        self._last_sync = now
+        # Forget workers that stopped syncing (crashed without a clean shutdown)
+        for worker_id, seen_at in list(self._worker_seen.items()):
+            if now - seen_at > 3 * self.sync_every:
+                self._drop_worker(worker_id)
+
+        users = [
+            [user_id, entry.status, entry.active_wall]
+            for user_id, entry in self._local.items()
+            if entry.status != OFFLINE
+        ]
+        try:
+            await self.publish({"worker": self.worker_id, "sync": users})
+        except Exception as e:
+            print(f"Error publishing presence sync: {e}")
+
+    async def _load_audiences(self, user_ids: List[str]):
+        """Groups and friends of each user, two batched queries per chunk of misses"""
+        missing = [user_id for user_id in user_ids if user_id not in self.audiences]
+        for start in range(0, len(missing), _AUDIENCE_CHUNK):
+            chunk = missing[start:start + _AUDIENCE_CHUNK]
+            ids = ",".join(chunk)
+            try:
+                # Imported here so the connection manager does not need Supabase configured
+                from app.core.supabase import supabase
+                members, links = await asyncio.gather(
+                    supabase.table("group_members").select("group_id, user_id").in_("user_id", chunk).execute(),
+                    supabase.table("friends").select("user_id, friend_id")
+                        .or_(f"user_id.in.({ids}),friend_id.in.({ids})").execute(),
+                )
+            except Exception as e:
+                print(f"⚠️ Presence audience load failed: {e}")
+                continue
+
+            groups = {user_id: [] for user_id in chunk}
+            friends = {user_id: [] for user_id in chunk}
+            for row in members.data or []:
+                groups[str(row["user_id"])].append(str(row["group_id"]))
+            for row in links.data or []:
+                a, b = str(row["user_id"]), str(row["friend_id"])
+                if a in friends:
+                    friends[a].append(b)
+                if b in friends:
+                    friends[b].append(a)
+            for user_id in chunk:
+                self.audiences.set(user_id, (groups[user_id], friends[user_id]))
+
+    def forget_audience(self, user_id: str):
+        """Drop a cached audience after the user's groups or friends changed"""
+        self.audiences.pop(str(user_id))
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep()
+                await self.flush()
+                if time.monotonic() - self._last_sync >= self.sync_every:
+                    await self.sync()
+            except Exception as e:
+                print(f"Error in presence loop: {e}")
+
+    # ==================== SHARED VIEW ====================
+
+    async def apply(self, payload: dict):
+        """Broker callback for PRESENCE_CHANNEL - fold one worker's changes into the view"""
+        worker_id = payload["worker"]
+        now = time.monotonic()
+        self._worker_seen[worker_id] = now
+        expires_at = now + 3 * self.sync_every
+
+        if "sync" in payload:
+            users = self._worker_users.setdefault(worker_id, set())
+            current = set()
+            for user_id, status, last_active in payload["sync"]:
+                current.add(user_id)
+                self._view.setdefault(user_id, {})[worker_id] = (status, last_active, expires_at)
+            for user_id in users - current:
+                self._remove(user_id, worker_id)
+            self._worker_users[worker_id] = current
+            return
+
+        changes = []
+        for user_id, status, last_active, groups, friends in payload.get("updates", ()):
+            before = self._effective(user_id, now)
+            if status == OFFLINE:
+                self._remove(user_id, worker_id, last_active)
+            else:
+                self._view.setdefault(user_id, {})[worker_id] = (status, last_active, expires_at)
+                self._worker_users.setdefault(worker_id, set()).add(user_id)
+            after = self._effective(user_id, now)
+            if after[0] != before[0]:
+                changes.append((user_id, self._public(after), groups, friends))
+
+        if changes:
+            self.delivered_changes += len(changes)
+            await self.on_change(changes)
+
+    def _remove(self, user_id: str, worker_id: str, last_active: Optional[float] = None):
+        workers = self._view.get(user_id)
+        if workers is None:
+            return
+        entry = workers.pop(worker_id, None)
+        users = self._worker_users.get(worker_id)
+        if users is not None:
+            users.discard(user_id)
+        if not workers:
+            del self._view[user_id]
+            seen = last_active or (entry[1] if entry else None)
+            if seen:
+                self.last_seen.set(user_id, seen)
+
+    def _drop_worker(self, worker_id: str):
+        for user_id in list(self._worker_users.pop(worker_id, ())):
+            self._remove(user_id, worker_id)
+        self._worker_seen.pop(worker_id, None)
+
+    def _effective(self, user_id: str, now: float) -> Tuple[str, Optional[float]]:
+        status, last_active = OFFLINE, None
+        for entry_status, entry_active, expires_at in self._view.get(user_id, {}).values():
+            if expires_at <= now:
+                continue
+            if _RANK[entry_status] > _RANK[status]:
+                status = entry_status
+            if last_active is None or entry_active > last_active:
+                last_active = entry_active
+        if status == OFFLINE:
+            last_active = last_active or self.last_seen.get(user_id)
+        return status, last_active
+
+    @staticmethod
+    def _public(effective: Tuple[str, Optional[float]]) -> dict:
+        status, last_active = effective
+        return {"status": status, "last_active_at": _iso(last_active)}
+
+    def presence_of(self, user_ids: Iterable[str]) -> Dict[str, dict]:
+        """Bulk lookup served entirely from the view - O(len(user_ids))"""
+        now = time.monotonic()
+        return {
+            str(user_id): self._public(self._effective(str(user_id), now))
+            for user_id in user_ids
+        }
+
+    async def visible_presence(self, viewer_id: str, user_ids: Iterable[str]) -> Dict[str, dict]:
+        """
+        presence_of() for what the viewer may see: themselves, their friends
+        and people sharing a group with them. Everyone else - including ids
+        whose audience could not be loaded - reads as offline with no
+        last activity.
+        """
+        viewer_id = str(viewer_id)
+        user_ids = [str(user_id) for user_id in user_ids]
+        await self._load_audiences([viewer_id])
+        groups, friends = self.audiences.get(viewer_id) or ((), ())
+        friends = set(friends)
+        visible = {user_id for user_id in user_ids if user_id == viewer_id or user_id in friends}
+
+        groups = set(groups)
+        if groups:
+            # Only well-formed ids go into the audience query's filter
+            strangers = list(dict.fromkeys(u for u in user_ids if u not in visible and _is_uuid(u)))
+            await self._load_audiences(strangers)
+            for user_id in strangers:
+                audience = self.audiences.get(user_id)
+                if audience and groups.intersection(audience[0]):
+                    visible.add(user_id)
+
+        presence = self.presence_of(visible)
+        hidden = self._public((OFFLINE, None))
+        return {user_id: presence.get(user_id, hidden) for user_id in user_ids}
+
+    def stats(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "local_users": dict(self._counts),
+            "scheduled_checks": sum(len(users) for users in self._wheel.values()),
+            "users_online_everywhere": len(self._view),
+            "workers": len(self._worker_seen),
+            "changes_published": self.published,
+            "changes_deferred": self.deferred,
+            "changes_delivered": self.delivered_changes,
+            "heartbeat_timeouts": self.timeouts,
+            "audience_cache": self.audiences.stats(),
+        }
@@ -2,6 +2,8 @@
 
 from fastapi import HTTPException
 from app.core.supabase import supabase
+from app.core.profile_loader import remember_profile
+from app.services.connection_manager import manager
 from app.schemas.profile import ProfileResponse
 from app.schemas.profileupdate import ProfileUpdate
 
@@ -26,7 +28,7 @@ class ProfileService:
             HTTPException: If profile not found or database error
         """
         try:
-            response = supabase.table("profiles").select("*").eq("id", user_id).execute()
+            response = await supabase.table("profiles").select("*").eq("id", user_id).execute()
             
             if not response.data or len(response.data) == 0:
                 raise HTTPException(
@@ -44,6 +46,14 @@ class ProfileService:
                 detail=f"Failed to fetch profile: {str(e)}"
             )
     
+    @staticmethod
+    async def _announce_change(user_id: str):
+        """Other workers drop their cached copy; the edit itself already succeeded"""
+        try:
+            await manager.publish_profile_change(user_id)
+        except Exception as e:
+            print(f"⚠️ Failed to announce profile change: {e}")
+    
     @staticmethod
     async def update_profile(user_id: str, profile_data: ProfileUpdate) -> ProfileResponse:
         """
@@ -70,7 +80,7 @@ class ProfileService:
                 )
             
             response = (
-                supabase
+                await supabase
                 .table("profiles")
                 .update(update_data)
                 .eq("id", user_id)
@@ -83,6 +93,8 @@ class ProfileService:
                     detail="Profile not found"
                 )
             
+            remember_profile(response.data[0])
+            await ProfileService._announce_change(user_id)
             return ProfileResponse(**response.data[0])
             
         except HTTPException:
@@ -95,7 +107,7 @@ class ProfileService:
     @staticmethod
     async def getAllUser()->list[ProfileResponse]:
         print('methd of get all users called')
-        response = supabase.table("profiles").select("*").execute()
+        response = await supabase.table("profiles").select("*").execute()
         if not response.data:
             return []
         print(response.data)
@@ -121,7 +133,7 @@ class ProfileService:
             insert_data = profile_data.model_dump(exclude_none=True)
             insert_data["id"] = user_id
             
-            response = supabase.table("profiles").insert(insert_data).execute()
+            response = await supabase.table("profiles").insert(insert_data).execute()
             
             if not response.data:
                 raise HTTPException(
@@ -129,6 +141,8 @@ class ProfileService:
                     detail="Failed to create profile"
                 )
             
+            remember_profile(response.data[0])
+            await ProfileService._announce_change(user_id)
             return ProfileResponse(**response.data[0])
             
         except HTTPException:
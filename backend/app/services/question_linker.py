@@ -120,13 +120,14 @@ def _fallback_question_extraction(text: str) -> List[Dict]:
     return questions
 
 
-async def store_questions_for_assignment(assignment_id: str, questions: List[Dict]) -> List[str]:
+async def store_questions_for_assignment(assignment_id: str, questions: List[Dict], group_id: Optional[str] = None) -> List[str]:
     """
     Store extracted questions in database and create embeddings
     
     Args:
         assignment_id: ID of the assignment
         questions: List of question dictionaries
+        group_id: Group the assignment belongs to (looked up from assignment_id if omitted)
         
     Returns:
         List of created question IDs
@@ -134,6 +135,17 @@ async def store_questions_for_assignment(assignment_id: str, questions: List[Dic
     question_ids = []
     
     try:
+        if group_id is None:
+            # Answers are matched within the assignment's group
+            sheet = await (
+                supabase.table("question_sheets")
+                .select("group_id")
+                .eq("id", assignment_id)
+                .execute()
+            )
+            if sheet.data:
+                group_id = sheet.data[0].get("group_id")
+
         for question in questions:
             question_id = str(uuid.uuid4())
             
@@ -146,9 +158,8 @@ async def store_questions_for_assignment(assignment_id: str, questions: List[Dic
                 "points": 0
             }
             
-            result = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("question_sheet_questions")
+            result = await (
+                supabase.table("question_sheet_questions")
                 .insert(question_data)
                 .execute()
             )
@@ -164,6 +175,7 @@ async def store_questions_for_assignment(assignment_id: str, questions: List[Dic
                             "type": "question",
                             "question_id": question_id,
                             "assignment_id": assignment_id,
+                            "group_id": group_id,
                             "question_order": question["question_order"]
                         }
                     )
@@ -192,15 +204,10 @@ async def match_answer_to_question(answer_text: str, assignment_id: str) -> Opti
         Dict with {question_id, confidence_score, question_text} or None
     """
     try:
-        # Search for similar questions
-        results = await search_similar(answer_text, limit=5)
-        
-        # Filter to questions from this assignment
-        question_matches = [
-            r for r in results
-            if r.get("metadata", {}).get("type") == "question"
-            and r.get("metadata", {}).get("assignment_id") == assignment_id
-        ]
+        # Search only this assignment's questions
+        question_matches = await search_similar(
+            answer_text, limit=5, filter_metadata={"type": "question", "assignment_id": assignment_id}
+        )
         
         if not question_matches:
             print(f"🔍 No question matches found for assignment {assignment_id}")
@@ -235,9 +242,8 @@ async def get_questions_for_assignment(assignment_id: str) -> List[Dict]:
         List of questions ordered by question_order
     """
     try:
-        result = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: supabase.table("question_sheet_questions")
+        result = await (
+            supabase.table("question_sheet_questions")
             .select("*")
             .eq("question_sheet_id", assignment_id)
             .order("question_order")
@@ -1,12 +1,12 @@
 from typing import List, Optional
 from fastapi import HTTPException, status
 from app.core.supabase import supabase
+from app.core.membership import is_group_member, is_group_admin
 from app.schemas.question_sheet import (
     QuestionSheetCreate, QuestionSheetUpdate, QuestionSheetResponse,
     QuestionResponse, AnswerSubmit, AnswerResponse, StudentProgressResponse
 )
 from datetime import datetime
-import asyncio
 import uuid
 
 class QuestionSheetService:
@@ -16,16 +16,7 @@ class QuestionSheetService:
         """Create a new question sheet with questions (admin only)"""
         try:
             # Check if user is admin of the group
-            admin_check = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("group_members")
-                .select("role")
-                .eq("group_id", group_id)
-                .eq("user_id", admin_id)
-                .execute()
-            )
-            
-            if not admin_check.data or admin_check.data[0].get("role") != "admin":
+            if not await is_group_admin(group_id, admin_id):
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="Only admins can create question sheets"
@@ -44,9 +35,8 @@ class QuestionSheetService:
                 "total_points": total_points
             }
             
-            sheet_result = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("question_sheets").insert(sheet_data).execute()
+            sheet_result = await (
+                supabase.table("question_sheets").insert(sheet_data).execute()
             )
             
             if not sheet_result.data:
@@ -71,9 +61,8 @@ class QuestionSheetService:
             ]
             
             if questions_data:
-                await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    lambda: supabase.table("question_sheet_questions")
+                await (
+                    supabase.table("question_sheet_questions")
                     .insert(questions_data)
                     .execute()
                 )
@@ -97,25 +86,15 @@ class QuestionSheetService:
         """Get all question sheets for a group"""
         try:
             # Check if user is member of group
-            member_check = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("group_members")
-                .select("id")
-                .eq("group_id", group_id)
-                .eq("user_id", user_id)
-                .execute()
-            )
-            
-            if not member_check.data:
+            if not await is_group_member(group_id, user_id):
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="You are not a member of this group"
                 )
             
             # Get question sheets with stats from view
-            result = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("question_sheets_with_stats")
+            result = await (
+                supabase.table("question_sheets_with_stats")
                 .select("*")
                 .eq("group_id", group_id)
                 .order("created_at", desc=True)
@@ -139,9 +118,8 @@ class QuestionSheetService:
         """Get question sheet details with questions and user's answers"""
         try:
             # Get sheet details
-            sheet_result = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("question_sheets_with_stats")
+            sheet_result = await (
+                supabase.table("question_sheets_with_stats")
                 .select("*")
                 .eq("id", sheet_id)
                 .execute()
@@ -156,9 +134,8 @@ class QuestionSheetService:
             sheet_data = sheet_result.data[0]
             
             # Get questions
-            questions_result = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("question_sheet_questions")
+            questions_result = await (
+                supabase.table("question_sheet_questions")
                 .select("*")
                 .eq("question_sheet_id", sheet_id)
                 .order("question_order")
@@ -184,9 +161,8 @@ class QuestionSheetService:
         """Submit or update an answer to a question"""
         try:
             # Verify question belongs to sheet
-            question_check = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("question_sheet_questions")
+            question_check = await (
+                supabase.table("question_sheet_questions")
                 .select("id")
                 .eq("id", question_id)
                 .eq("question_sheet_id", sheet_id)
@@ -209,9 +185,8 @@ class QuestionSheetService:
                 "submitted_at": datetime.utcnow().isoformat()
             }
             
-            result = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("user_question_sheet_answers")
+            result = await (
+                supabase.table("user_question_sheet_answers")
                 .upsert(answer_data, on_conflict="question_id,student_id")
                 .execute()
             )
@@ -251,9 +226,8 @@ class QuestionSheetService:
                 "submitted_at": datetime.utcnow().isoformat()
             }
             
-            result = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("user_question_sheet_answers")
+            result = await (
+                supabase.table("user_question_sheet_answers")
                 .upsert(answer_data, on_conflict="question_id,student_id")
                 .execute()
             )
@@ -274,9 +248,8 @@ class QuestionSheetService:
             sheet = await QuestionSheetService.get_question_sheet_detail(sheet_id, student_id)
             
             # Get student's answers
-            answers_result = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("user_question_sheet_answers")
+            answers_result = await (
+                supabase.table("user_question_sheet_answers")
                 .select("*")
                 .eq("question_sheet_id", sheet_id)
                 .eq("student_id", student_id)
@@ -320,9 +293,8 @@ class QuestionSheetService:
         """Delete a question sheet (admin/creator only)"""
         try:
             # Verify user is the creator
-            sheet_check = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("question_sheets")
+            sheet_check = await (
+                supabase.table("question_sheets")
                 .select("creator_id")
                 .eq("id", sheet_id)
                 .execute()
@@ -341,9 +313,8 @@ class QuestionSheetService:
                 )
             
             # Delete sheet (cascade will delete questions and answers)
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: supabase.table("question_sheets")
+            await (
+                supabase.table("question_sheets")
                 .delete()
                 .eq("id", sheet_id)
                 .execute()
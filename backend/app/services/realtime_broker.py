@@ -0,0 +1,215 @@
+"""
+Pub/sub brokers behind the WebSocket ConnectionManager
+
+Every real-time frame is published to a channel (`user:<id>` or
+`group:<id>`). Each worker subscribes to the channels of the users and
+groups it has local sockets for and delivers what it receives, so a user on
+one uvicorn worker reaches users on any other.
+
+- InMemoryBroker: single process, delivers straight to the local handler
+- RedisBroker: speaks the Redis pub/sub protocol (RESP) over TCP or a Unix
+  socket, so it works against Redis itself or the bundled broker_hub
+"""
+
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Set
+from urllib.parse import urlparse
+
+from app.core.config import REALTIME_BROKER, REALTIME_BROKER_URL
+
+DeliverHandler = Callable[[str, str], Awaitable[None]]
+
+
+class InMemoryBroker:
+    """Single-process broker - publish is a direct local delivery"""
+
+    def __init__(self):
+        self._handler: Optional[DeliverHandler] = None
+        self._channels: Set[str] = set()
+
+    def set_handler(self, handler: DeliverHandler):
+        self._handler = handler
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def subscribe(self, channel: str):
+        self._channels.add(channel)
+
+    async def unsubscribe(self, channel: str):
+        self._channels.discard(channel)
+
+    async def publish(self, channel: str, payload: str):
+        if self._handler and channel in self._channels:
+            await self._handler(channel, payload)
+
+
+# ==================== RESP (Redis protocol) helpers ====================
+
+def encode_command(*parts) -> bytes:
+    out = [f"*{len(parts)}\r\n".encode()]
+    for part in parts:
+        data = part if isinstance(part, bytes) else str(part).encode()
+        out.append(f"${len(data)}\r\n".encode())
+        out.append(data)
+        out.append(b"\r\n")
+    return b"".join(out)
+
+
+async def read_reply(reader: asyncio.StreamReader):
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("broker connection closed")
+
+    prefix, rest = line[:1], line[1:-2]
+    if prefix == b"+":
+        return rest.decode()
+    if prefix == b"-":
+        raise RuntimeError(rest.decode())
+    if prefix == b":":
+        return int(rest)
+    if prefix == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if prefix == b"*":
+        count = int(rest)
+        if count < 0:
+            return None
+        return [await read_reply(reader) for _ in range(count)]
+    raise RuntimeError(f"unexpected broker reply: {line!r}")
+
+
+async def open_connection(url: str):
+    """Open a stream to redis://host:port or unix:///path/to.sock"""
+    parsed = urlparse(url)
+    if parsed.scheme == "unix":
+        return await asyncio.open_unix_connection(parsed.path)
+    return await asyncio.open_connection(parsed.hostname or "127.0.0.1", parsed.port or 6379)
+
+
+class RedisBroker:
+    """
+    Multi-process broker over the Redis pub/sub protocol
+
+    Uses two connections, as Redis requires: one in subscriber mode whose
+    reader task delivers incoming messages, and one for PUBLISH whose
+    replies are drained in the background so publishers never wait on a
+    round trip. Both reconnect with backoff and re-subscribe on failure.
+    """
+
+    RECONNECT_DELAYS = (0.1, 0.5, 1, 2, 5)
+
+    def __init__(self, url: str):
+        self.url = url
+        self._handler: Optional[DeliverHandler] = None
+        self._channels: Set[str] = set()
+        self._sub_writer: Optional[asyncio.StreamWriter] = None
+        self._pub_writer: Optional[asyncio.StreamWriter] = None
+        self._tasks: List[asyncio.Task] = []
+        self._connected = asyncio.Event()
+        self._closing = False
+
+    def set_handler(self, handler: DeliverHandler):
+        self._handler = handler
+
+    async def start(self):
+        self._tasks = [
+            asyncio.create_task(self._run_subscriber()),
+            asyncio.create_task(self._run_publisher()),
+        ]
+        await asyncio.wait_for(self._connected.wait(), timeout=10)
+
+    async def close(self):
+        self._closing = True
+        for task in self._tasks:
+            task.cancel()
+        for writer in (self._sub_writer, self._pub_writer):
+            if writer:
+                writer.close()
+
+    async def subscribe(self, channel: str):
+        if channel in self._channels:
+            return
+        self._channels.add(channel)
+        if self._sub_writer:
+            self._sub_writer.write(encode_command("SUBSCRIBE", channel))
+
+    async def unsubscribe(self, channel: str):
+        if channel not in self._channels:
+            return
+        self._channels.discard(channel)
+        if self._sub_writer:
+            self._sub_writer.write(encode_command("UNSUBSCRIBE", channel))
+
+    async def publish(self, channel: str, payload: str):
+        if not self._pub_writer:
+            await self._connected.wait()
+        self._pub_writer.write(encode_command("PUBLISH", channel, payload))
+
+    async def _run_subscriber(self):
+        attempt = 0
+        while not self._closing:
+            try:
+                reader, self._sub_writer = await open_connection(self.url)
+                if self._channels:
+                    self._sub_writer.write(encode_command("SUBSCRIBE", *self._channels))
+                attempt = 0
+                while True:
+                    reply = await read_reply(reader)
+                    if isinstance(reply, list) and reply and reply[0] == b"message":
+                        await self._dispatch(reply[1].decode(), reply[2].decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._sub_writer = None
+                if self._closing:
+                    return
+                delay = self.RECONNECT_DELAYS[min(attempt, len(self.RECONNECT_DELAYS) - 1)]
+                print(f"⚠️ Broker subscriber disconnected ({e}), retrying in {delay}s")
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _run_publisher(self):
+        attempt = 0
+        while not self._closing:
+            try:
+                reader, self._pub_writer = await open_connection(self.url)
+                self._connected.set()
+                attempt = 0
+                while True:
+                    # PUBLISH replies are subscriber counts - nothing to do with them
+                    await read_reply(reader)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._pub_writer = None
+                self._connected.clear()
+                if self._closing:
+                    return
+                delay = self.RECONNECT_DELAYS[min(attempt, len(self.RECONNECT_DELAYS) - 1)]
+                print(f"⚠️ Broker publisher disconnected ({e}), retrying in {delay}s")
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _dispatch(self, channel: str, payload: str):
+        if not self._handler:
+            return
+        try:
+            await self._handler(channel, payload)
+        except Exception as e:
+            print(f"Error delivering broker message on {channel}: {e}")
+
+
+def create_broker(kind: str = REALTIME_BROKER, url: str = REALTIME_BROKER_URL):
+    """Broker selected by REALTIME_BROKER (memory | redis)"""
+    if kind == "redis":
+        return RedisBroker(url)
+    if kind != "memory":
+        print(f"⚠️ Unknown REALTIME_BROKER '{kind}', falling back to in-memory")
+    return InMemoryBroker()
@@ -0,0 +1,101 @@
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.core.config import REPLAY_BUFFER_EVENTS, REPLAY_BUFFER_STREAMS
+
+
+class ReplayBuffer:
+    """
+    Bounded ring of recent sequenced events per stream ("group:<id>",
+    "conversation:<id>"), kept in seq order
+
+    since() only answers when the buffer provably holds every event after
+    the client's last seq; a worker that was not subscribed for part of the
+    gap, or a message that was never broadcast, leaves a hole and the
+    caller falls back to the database.
+
+    Streams are only live while the worker stays subscribed to the broker
+    channel that feeds them; forget() drops them when it unsubscribes, since
+    anything published afterwards would be missing from the end of the
+    buffer with no hole to detect.
+    """
+
+    def __init__(self, events_per_stream: int = REPLAY_BUFFER_EVENTS, max_streams: int = REPLAY_BUFFER_STREAMS):
+        self.events_per_stream = events_per_stream
+        self.max_streams = max_streams
+        self._streams: "OrderedDict[str, Tuple[List[int], List[dict], Set[str]]]" = OrderedDict()
+        # Broker channel -> streams it has fed
+        self._fed_by: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, stream: str, seq: int, message: dict, channel: Optional[str] = None):
+        entry = self._streams.get(stream)
+        if entry is None:
+            entry = self._streams[stream] = ([], [], set())
+            while len(self._streams) > self.max_streams:
+                evicted, (_, _, channels) = self._streams.popitem(last=False)
+                self._unlink(evicted, channels)
+        else:
+            self._streams.move_to_end(stream)
+
+        seqs, messages, channels = entry
+        if channel is not None and channel not in channels:
+            channels.add(channel)
+            self._fed_by.setdefault(channel, set()).add(stream)
+        index = bisect_left(seqs, seq)
+        if index < len(seqs) and seqs[index] == seq:
+            # Same event delivered twice (e.g. to both DM participants)
+            return
+        seqs.insert(index, seq)
+        messages.insert(index, message)
+        if len(seqs) > self.events_per_stream:
+            del seqs[0]
+            del messages[0]
+
+    def since(self, stream: str, last_seq: int) -> Optional[List[dict]]:
+        """Events after last_seq, or None when the buffer cannot vouch for the gap"""
+        entry = self._streams.get(stream)
+        if not entry or not entry[0]:
+            self.misses += 1
+            return None
+
+        seqs, messages, _ = entry
+        if last_seq >= seqs[-1]:
+            self.hits += 1
+            return []
+
+        index = bisect_left(seqs, last_seq + 1)
+        # Must start right after last_seq and have no holes up to the newest
+        expected = last_seq + 1
+        if seqs[index] != expected or seqs[-1] - expected != len(seqs) - 1 - index:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return messages[index:]
+
+    def forget(self, channel: str):
+        """Drop every stream the channel fed - the worker stopped listening to it"""
+        for stream in self._fed_by.pop(channel, ()):
+            entry = self._streams.pop(stream, None)
+            if entry is not None:
+                self._unlink(stream, entry[2] - {channel})
+
+    def _unlink(self, stream: str, channels: Set[str]):
+        for channel in channels:
+            streams = self._fed_by.get(channel)
+            if streams is not None:
+                streams.discard(stream)
+                if not streams:
+                    del self._fed_by[channel]
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "streams": len(self._streams),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
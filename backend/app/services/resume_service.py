@@ -0,0 +1,97 @@
+from fastapi import HTTPException
+
+from app.core.config import RESUME_MAX_EVENTS
+from app.core.membership import is_group_member
+from app.schemas.chat import Message
+from app.services.chatgroupservices import ChatGroupService
+from app.services.chatservices import ChatService
+from app.services.connection_manager import manager
+
+# A resume asks for at most this many streams at once
+MAX_RESUME_STREAMS = 100
+
+
+def new_message_event(message: Message) -> dict:
+    """The new_message frame both DM participants receive"""
+    return {
+        "type": "new_message",
+        "seq": message.seq,
+        "message": {
+            "id": str(message.id),
+            "conversation_id": str(message.conversation_id),
+            "sender_id": str(message.sender_id),
+            "content": message.content,
+            "created_at": message.created_at.isoformat(),
+            "read_at": message.read_at.isoformat() if message.read_at else None,
+            "seq": message.seq
+        }
+    }
+
+
+def new_group_message_event(message: dict) -> dict:
+    """The new_group_message frame every group subscriber receives"""
+    return {
+        "type": "new_group_message",
+        "seq": message.get("seq"),
+        "message": {
+            "id": str(message["id"]),
+            "group_id": str(message["group_id"]),
+            "sender_id": str(message["sender_id"]),
+            "content": message["content"],
+            "created_at": message["created_at"],
+            "attachment": message.get("attachment"),
+            "seq": message.get("seq")
+        }
+    }
+
+
+class ResumeService:
+
+    @staticmethod
+    async def resume_stream(user_id: str, stream: str, last_seq: int) -> dict:
+        """
+        Events a reconnecting client missed on one stream after last_seq
+
+        Served from this worker's replay buffer when it holds the whole gap,
+        otherwise read from the database by seq. When even that gap exceeds
+        RESUME_MAX_EVENTS, has_more tells the client to reload the history.
+        """
+        kind, _, stream_id = stream.partition(":")
+        if kind not in ("group", "conversation") or not stream_id:
+            raise HTTPException(400, f"Unknown stream: {stream}")
+
+        # Authorize before touching the buffer, which holds every member's events
+        if kind == "group":
+            if not await is_group_member(stream_id, user_id):
+                raise HTTPException(403, "You are not a member of this group")
+        else:
+            await ChatService.get_conversation_details(stream_id, user_id)
+
+        events = manager.replay.since(stream, last_seq)
+        if events is not None:
+            return {
+                "type": "resume_result",
+                "stream": stream,
+                "source": "buffer",
+                "events": events,
+                "has_more": False
+            }
+
+        if kind == "group":
+            page = await ChatGroupService.get_group_messages_after_seq(
+                stream_id, user_id, last_seq, RESUME_MAX_EVENTS
+            )
+            events = [new_group_message_event(msg) for msg in page["messages"]]
+        else:
+            page = await ChatService.get_messages_after_seq(
+                stream_id, user_id, last_seq, RESUME_MAX_EVENTS
+            )
+            events = [new_message_event(msg) for msg in page["messages"]]
+
+        return {
+            "type": "resume_result",
+            "stream": stream,
+            "source": "database",
+            "events": events,
+            "has_more": page["has_more"]
+        }
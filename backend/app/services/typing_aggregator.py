@@ -0,0 +1,119 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Set, Tuple
+
+from app.core.config import TYPING_FLUSH_INTERVAL_MS, TYPING_THROTTLE_MS, TYPING_TTL_MS
+
+FlushHandler = Callable[[str, List[str]], Awaitable[None]]
+
+
+class TypingAggregator:
+    """
+    Throttles typing events on the way out and merges them on the way in
+
+    - allow(): the sending side lets one event per user/group through per
+      throttle window, so a burst of keystrokes becomes one broker publish
+    - add(): the receiving side records "user is typing in group" until the
+      TTL runs out, or remove() once their message arrives
+    - a flush loop hands each changed group's current typers to the flush
+      handler every interval, which sends one users_typing frame to the
+      group instead of a frame per keystroke per typer
+    """
+
+    def __init__(
+        self,
+        on_flush: FlushHandler,
+        throttle: float = TYPING_THROTTLE_MS / 1000,
+        interval: float = TYPING_FLUSH_INTERVAL_MS / 1000,
+        ttl: float = TYPING_TTL_MS / 1000,
+    ):
+        self.on_flush = on_flush
+        self.throttle = throttle
+        self.interval = interval
+        self.ttl = ttl
+        # (group_id, user_id) -> last time an event was let through
+        self._last_sent: Dict[Tuple[str, str], float] = {}
+        # group_id -> {user_id: expires_at}
+        self._typing: Dict[str, Dict[str, float]] = {}
+        self._dirty: Set[str] = set()
+        self._task = None
+        self.accepted = 0
+        self.throttled = 0
+        self.flushed = 0
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def allow(self, group_id: str, user_id: str) -> bool:
+        now = time.monotonic()
+        key = (group_id, user_id)
+        if now - self._last_sent.get(key, 0.0) < self.throttle:
+            self.throttled += 1
+            return False
+        self._last_sent[key] = now
+        self.accepted += 1
+        return True
+
+    def add(self, group_id: str, user_id: str):
+        typers = self._typing.setdefault(group_id, {})
+        if user_id not in typers:
+            self._dirty.add(group_id)
+        typers[user_id] = time.monotonic() + self.ttl
+
+    def remove(self, group_id: str, user_id: str):
+        """Clear a typer right away, e.g. once their message is sent"""
+        typers = self._typing.get(group_id)
+        if typers and typers.pop(user_id, None) is not None:
+            self._dirty.add(group_id)
+        self._last_sent.pop((group_id, user_id), None)
+
+    def typing_in(self, group_id: str) -> List[str]:
+        return sorted(self._typing.get(group_id, ()))
+
+    async def flush(self):
+        now = time.monotonic()
+        for group_id in list(self._typing):
+            typers = self._typing[group_id]
+            expired = [user_id for user_id, expires_at in typers.items() if expires_at <= now]
+            for user_id in expired:
+                del typers[user_id]
+            if expired:
+                self._dirty.add(group_id)
+            if not typers:
+                del self._typing[group_id]
+
+        # Forget throttle windows that have long passed
+        stale = now - max(self.throttle, self.ttl)
+        for key in [k for k, sent_at in self._last_sent.items() if sent_at < stale]:
+            del self._last_sent[key]
+
+        dirty, self._dirty = self._dirty, set()
+        for group_id in dirty:
+            self.flushed += 1
+            try:
+                await self.on_flush(group_id, self.typing_in(group_id))
+            except Exception as e:
+                print(f"Error flushing typing indicators for group {group_id}: {e}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "groups_with_typers": len(self._typing),
+            "events_published": self.accepted,
+            "events_throttled": self.throttled,
+            "frames_flushed": self.flushed,
+        }
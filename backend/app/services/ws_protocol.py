@@ -0,0 +1,81 @@
+"""
+Wire formats for the chat WebSocket
+
+JSON text frames are the default. Clients can opt into MessagePack binary
+frames by offering the MSGPACK_SUBPROTOCOL subprotocol:
+
+    new WebSocket(url, ["unified-hub.msgpack"])
+
+The server only agrees when msgpack is installed; otherwise no subprotocol
+is selected and the client should fall back to JSON. Compression is
+negotiated separately through the permessage-deflate extension (see
+WS_PER_MESSAGE_DEFLATE) and applies to either format.
+"""
+
+import json
+import struct
+from typing import Any, List
+
+from fastapi import WebSocket
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_SUBPROTOCOL = "unified-hub.msgpack"
+
+# fixmap(2) "type": "batch", "events": <array header follows>
+_MSGPACK_BATCH_PREFIX = b"\x82\xa4type\xa5batch\xa6events"
+
+
+class JsonCodec:
+    name = "json"
+    subprotocol = None
+
+    @staticmethod
+    def encode(message: Any) -> str:
+        return json.dumps(message)
+
+    @staticmethod
+    def batch(payloads: List[str]) -> str:
+        """{"type": "batch", "events": [...]} from already-encoded events"""
+        return '{"type": "batch", "events": [' + ", ".join(payloads) + "]}"
+
+    @staticmethod
+    async def receive(websocket: WebSocket) -> Any:
+        return await websocket.receive_json()
+
+
+class MsgpackCodec:
+    name = "msgpack"
+    subprotocol = MSGPACK_SUBPROTOCOL
+
+    @staticmethod
+    def encode(message: Any) -> bytes:
+        return msgpack.packb(message, use_bin_type=True)
+
+    @staticmethod
+    def batch(payloads: List[bytes]) -> bytes:
+        """{"type": "batch", "events": [...]} from already-encoded events"""
+        count = len(payloads)
+        if count < 16:
+            header = bytes([0x90 | count])
+        elif count < 0x10000:
+            header = b"\xdc" + struct.pack(">H", count)
+        else:
+            header = b"\xdd" + struct.pack(">I", count)
+        return _MSGPACK_BATCH_PREFIX + header + b"".join(payloads)
+
+    @staticmethod
+    async def receive(websocket: WebSocket) -> Any:
+        # receive_bytes() raises WebSocketDisconnect like receive_json() does
+        return msgpack.unpackb(await websocket.receive_bytes(), raw=False)
+
+
+def negotiate(websocket: WebSocket) -> type:
+    """Pick the codec for a connecting socket from its offered subprotocols"""
+    offered = websocket.scope.get("subprotocols") or []
+    if msgpack is not None and MSGPACK_SUBPROTOCOL in offered:
+        return MsgpackCodec
+    return JsonCodec
@@ -0,0 +1,88 @@
+"""
+Benchmark: one socket's actions while its database writes are slow
+
+A client sends --messages messages into a conversation, each write taking
+--write-ms, and meanwhile joins --joins groups and marks another
+conversation read (each a --fast-ms database call). Compares handling the
+socket's actions one at a time, as the endpoint used to, with the
+per-connection ActionDispatcher:
+  - how long the join/mark_read actions waited for an answer
+  - total time, and that the messages were still handled in order
+
+Run from backend/:
+    python -m benchmarks.bench_action_dispatch --messages 20 --write-ms 100
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.services.action_dispatcher import ActionDispatcher
+
+
+def build_actions(args):
+    actions = []
+    for index in range(args.messages):
+        actions.append({"action": "send_message", "conversation_id": "slow", "n": index})
+        if index < args.joins:
+            actions.append({"action": "join_group", "group_id": f"group-{index}"})
+        if index == args.messages // 2:
+            actions.append({"action": "mark_read", "conversation_id": "other"})
+    return actions
+
+
+def channel_of(data: dict):
+    if data.get("conversation_id"):
+        return f"conversation:{data['conversation_id']}"
+    return f"group:{data['group_id']}"
+
+
+async def run(args, concurrent: bool):
+    sent_order = []
+    waits = []
+
+    async def handle(data, received_at):
+        if data["action"] == "send_message":
+            await asyncio.sleep(args.write_ms / 1000)
+            sent_order.append(data["n"])
+        else:
+            await asyncio.sleep(args.fast_ms / 1000)
+            waits.append(time.perf_counter() - received_at)
+
+    actions = build_actions(args)
+    dispatcher = ActionDispatcher(max_in_flight=args.max_in_flight)
+    started = time.perf_counter()
+    # The client sent the whole burst at once; waits count from its arrival
+    received_at = started
+    for data in actions:
+        if concurrent:
+            await dispatcher.submit(channel_of(data), data["action"], lambda d=data: handle(d, received_at))
+        else:
+            await handle(data, received_at)
+    await dispatcher.drain()
+    elapsed = time.perf_counter() - started
+
+    assert sent_order == list(range(args.messages)), "messages handled out of order"
+    label = "dispatcher" if concurrent else "serial"
+    print(
+        f"{label:<11} total {elapsed * 1000:8.1f}ms   interactive wait "
+        f"p50 {statistics.median(waits) * 1000:7.1f}ms  max {max(waits) * 1000:7.1f}ms"
+    )
+
+
+def main(args):
+    print(f"{args.messages} messages at {args.write_ms}ms each, {args.joins} joins + 1 mark_read "
+          f"at {args.fast_ms}ms, up to {args.max_in_flight} actions in flight\n")
+    asyncio.run(run(args, concurrent=False))
+    asyncio.run(run(args, concurrent=True))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--joins", type=int, default=5)
+    parser.add_argument("--write-ms", type=float, default=100.0)
+    parser.add_argument("--fast-ms", type=float, default=5.0)
+    parser.add_argument("--max-in-flight", type=int, default=16)
+    main(parser.parse_args())
@@ -0,0 +1,77 @@
+"""
+Benchmark: token verification cost per authenticated request
+
+Compares the three paths verify_token() can take against the local stand-in:
+  - remote:  supabase.auth.get_user() round trip (the old behaviour)
+  - local:   HS256 signature check with SUPABASE_JWT_SECRET, cache cleared
+  - cached:  claims served from the token-hash cache
+
+Run from backend/:
+    python -m benchmarks.bench_auth --calls 500 --latency-ms 20
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+from app.core.metrics import percentile
+from benchmarks.supabase_standin import SupabaseStandIn, run_standin
+
+JWT_SECRET = "standin-jwt-secret-with-at-least-32-characters"
+
+
+async def measure(verify, calls: int):
+    samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        user = await verify()
+        samples.append((time.perf_counter() - started) * 1000)
+        assert user, "token was rejected"
+    return statistics.median(samples), percentile(samples, 99)
+
+
+async def main(args):
+    base_url = run_standin(SupabaseStandIn(latency=args.latency_ms / 1000))
+    os.environ["SUPABASE_URL"] = base_url
+    os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "standin-service-role-key")
+    os.environ["SUPABASE_JWT_SECRET"] = JWT_SECRET
+
+    from jose import jwt
+    from app.core import security
+    from app.core.supabase import close_supabase
+
+    user_id = str(uuid.uuid4())
+    token = jwt.encode(
+        {"sub": user_id, "aud": "authenticated", "role": "authenticated", "exp": int(time.time()) + 3600},
+        JWT_SECRET,
+        algorithm="HS256",
+    )
+
+    async def remote():
+        return await security._verify_remotely(user_id)
+
+    async def local():
+        security.token_cache.clear()
+        return await security.verify_token(token)
+
+    async def cached():
+        return await security.verify_token(token)
+
+    print(f"stand-in latency {args.latency_ms}ms, {args.calls} sequential calls\n")
+    print(f"{'path':<10}{'p50':>12}{'p99':>12}")
+    for name, verify in (("remote", remote), ("local", local), ("cached", cached)):
+        p50, p99 = await measure(verify, args.calls)
+        print(f"{name:<10}{p50:>10.3f}ms{p99:>10.3f}ms")
+
+    print(f"\ncache: {security.token_cache.stats()}")
+    await close_supabase()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    asyncio.run(main(parser.parse_args()))
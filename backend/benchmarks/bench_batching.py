@@ -0,0 +1,100 @@
+"""
+Benchmark: outbound micro-batching during a burst and under light load
+
+A --members group receives a burst of --burst messages (an announcement
+plus the replies it triggers) spread over --burst-ms, then a trickle of
+light traffic. For batching off and each --windows value, reports the
+frames written (each one a send syscall plus framing on a real socket),
+events delivered, process CPU time and publish -> written latency.
+
+Run from backend/:
+    python -m benchmarks.bench_batching --members 500 --burst 50
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import time
+
+from app.core.metrics import percentile
+from app.services.connection_manager import ConnectionManager
+from benchmarks.common import CountingSocket
+
+
+class BatchSocket(CountingSocket):
+    def __init__(self, timed: bool = False):
+        super().__init__()
+        # Only a few sockets decode frames for latency, so the client side
+        # of the benchmark does not drown out the server's CPU time
+        self.timed = timed
+        self.events = 0
+        self.latencies = []
+
+    async def send_text(self, text: str):
+        self.count += 1
+        if not self.timed:
+            self.events += text.count('"seq"')
+            return
+        frame = json.loads(text)
+        events = frame["events"] if frame.get("type") == "batch" else [frame]
+        now = time.time()
+        self.events += len(events)
+        self.latencies.extend(now - event["ts"] for event in events)
+
+
+async def run(args, window_ms: float, phase: str):
+    manager = ConnectionManager(batch_window=window_ms / 1000)
+    sockets = [BatchSocket(timed=index % 50 == 0) for index in range(args.members)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for index, sock in enumerate(sockets):
+            await manager.connect(f"user-{index}", sock)
+            await manager.subscribe_to_group(f"user-{index}", "g1")
+
+    if phase == "burst":
+        count, gap = args.burst, args.burst_ms / 1000 / args.burst
+    else:
+        count, gap = args.light, args.light_gap_ms / 1000
+
+    cpu_started = time.process_time()
+    for index in range(count):
+        await manager.send_group_message({"type": "new_group_message", "seq": index, "ts": time.time()}, "g1")
+        await asyncio.sleep(gap)
+    await asyncio.sleep(window_ms / 1000 + 0.05)
+    cpu_ms = (time.process_time() - cpu_started) * 1000
+
+    frames = sum(sock.count for sock in sockets)
+    events = sum(sock.events for sock in sockets)
+    assert events == count * args.members, (events, count * args.members)
+    samples = [s for sock in sockets for s in sock.latencies]
+    label = f"{phase} window={window_ms:g}ms"
+    print(
+        f"{label:<22} frames={frames:7d} events={events:7d} cpu={cpu_ms:7.1f}ms "
+        f"p50={percentile(samples, 50) * 1000:6.2f}ms p99={percentile(samples, 99) * 1000:6.2f}ms"
+    )
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for index, sock in enumerate(sockets):
+            await manager.disconnect(f"user-{index}", sock)
+
+
+async def main(args):
+    print(
+        f"{args.members} members; burst: {args.burst} messages over {args.burst_ms}ms; "
+        f"light: {args.light} messages {args.light_gap_ms}ms apart"
+    )
+    for phase in ("burst", "light"):
+        for window_ms in [0.0] + args.windows:
+            await run(args, window_ms, phase)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=500)
+    parser.add_argument("--burst", type=int, default=50)
+    parser.add_argument("--burst-ms", type=float, default=50)
+    parser.add_argument("--light", type=int, default=10)
+    parser.add_argument("--light-gap-ms", type=float, default=100)
+    parser.add_argument("--windows", type=float, nargs="+", default=[5, 10, 20])
+    asyncio.run(main(parser.parse_args()))
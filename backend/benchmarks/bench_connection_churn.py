@@ -0,0 +1,92 @@
+"""
+Benchmark: connect / disconnect churn in ConnectionManager
+
+Connects --users users (each with --devices sockets) that join
+--groups-per-user of --groups groups, then disconnects them all, and times
+both phases. For comparison the disconnect phase is repeated with the old
+strategy of scanning every group to find the user's subscriptions.
+
+Run from backend/:
+    python -m benchmarks.bench_connection_churn --users 10000 --groups 1000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import random
+import time
+
+from app.services.connection_manager import ConnectionManager
+from benchmarks.common import NullSocket
+
+
+async def populate(manager: ConnectionManager, args, rng: random.Random):
+    sockets = {}
+    for index in range(args.users):
+        user_id = f"user-{index}"
+        sockets[user_id] = [NullSocket() for _ in range(args.devices)]
+        for sock in sockets[user_id]:
+            await manager.connect(user_id, sock)
+        for group in rng.sample(range(args.groups), args.groups_per_user):
+            await manager.subscribe_to_group(user_id, f"group-{group}")
+    return sockets
+
+
+async def legacy_disconnect(manager: ConnectionManager, user_id: str):
+    """The pre-index disconnect: scan every group for the user"""
+    for connection in manager.active_connections.pop(user_id, ()):
+        await connection.close()
+    for group_id in list(manager.group_subscriptions.keys()):
+        if user_id in manager.group_subscriptions[group_id]:
+            del manager.group_subscriptions[group_id][user_id]
+            if not manager.group_subscriptions[group_id]:
+                del manager.group_subscriptions[group_id]
+
+
+async def run(args, indexed: bool):
+    manager = ConnectionManager()
+    rng = random.Random(42)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        sockets = await populate(manager, args, rng)
+        connect_s = time.perf_counter() - started
+        groups = len(manager.group_subscriptions)
+
+        started = time.perf_counter()
+        for user_id, user_sockets in sockets.items():
+            if indexed:
+                for sock in user_sockets:
+                    await manager.disconnect(user_id, sock)
+            else:
+                await legacy_disconnect(manager, user_id)
+        disconnect_s = time.perf_counter() - started
+
+    assert not manager.active_connections and not manager.group_subscriptions
+    label = "indexed" if indexed else "group scan"
+    sockets_total = args.users * args.devices
+    print(
+        f"{label:<11} connect+join {connect_s * 1000:8.1f}ms "
+        f"({connect_s / sockets_total * 1e6:6.1f}us/socket)  "
+        f"disconnect {disconnect_s * 1000:8.1f}ms "
+        f"({disconnect_s / sockets_total * 1e6:6.1f}us/socket)  groups={groups}"
+    )
+
+
+async def main(args):
+    print(
+        f"{args.users} users x {args.devices} device(s), "
+        f"{args.groups_per_user} of {args.groups} groups each"
+    )
+    await run(args, indexed=False)
+    await run(args, indexed=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--devices", type=int, default=1)
+    parser.add_argument("--groups", type=int, default=1000)
+    parser.add_argument("--groups-per-user", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
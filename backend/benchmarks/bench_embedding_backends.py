@@ -0,0 +1,61 @@
+"""
+Benchmark: embedding throughput per CPU core, torch vs ONNX int8
+
+Pins the process to one core, then encodes --sentences sentences with each
+backend in batches of --batch-size (the batched memory writer's default)
+and of 1 (a single search query), reporting sentences per second.
+
+Needs sentence-transformers[onnx]. Run from backend/:
+    python -m benchmarks.bench_embedding_backends --sentences 2000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import time
+
+from benchmarks.check_embedding_parity import make_sentences
+
+
+def pin_to_one_core():
+    # Measures per-core throughput for both runtimes regardless of their thread pools
+    try:
+        os.sched_setaffinity(0, {sorted(os.sched_getaffinity(0))[0]})
+        return True
+    except (AttributeError, OSError):
+        return False
+
+
+def throughput(model, sentences, batch_size: int) -> float:
+    model.encode(sentences[:batch_size], batch_size=batch_size)  # warm-up
+    started = time.perf_counter()
+    model.encode(sentences, batch_size=batch_size)
+    return len(sentences) / (time.perf_counter() - started)
+
+
+def main(args):
+    pinned = pin_to_one_core()
+    from app.core import ai_memory
+
+    sentences = make_sentences(args.sentences)
+    single = sentences[:args.single]
+    print(f"{'pinned to 1 core' if pinned else 'NOT pinned (no sched_setaffinity)'}, {len(sentences)} sentences\n")
+    print(f"{'backend':<10} {'batch ' + str(args.batch_size):>16} {'batch 1':>16}")
+    for backend in ("torch", "onnx-int8"):
+        with contextlib.redirect_stdout(io.StringIO()):
+            model = ai_memory.load_embedding_model(backend)
+        if ai_memory._model_backend != backend:
+            print(f"{backend:<10} unavailable")
+            continue
+        batched = throughput(model, sentences, args.batch_size)
+        one = throughput(model, single, 1)
+        print(f"{backend:<10} {batched:>10.1f} sent/s {one:>10.1f} sent/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=2000)
+    parser.add_argument("--single", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=64)
+    main(parser.parse_args())
@@ -0,0 +1,170 @@
+"""
+Benchmark: in-process embedding vs the shared embedding server
+
+Runs --workers worker processes side by side, first encoding in-process
+(each loads its own model) and then through app.core.embedding_server
+started as a subprocess. Each worker runs an event loop that:
+  - serves a stand-in API request every --request-interval-ms (a small
+    JSON response) and records how long each one takes end to end
+  - keeps the memory writer's load going: encode_texts() on batches of
+    --batch sentences in a thread, as EmbeddingWriter and search_similar do
+  - samples event-loop lag with LoopLagMonitor
+and reports its RSS at the end. The server's own RSS is counted in the
+remote total.
+
+Needs sentence-transformers. Run from backend/:
+    python -m benchmarks.bench_embedding_server --workers 4 --seconds 20
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+PROBE = """
+import asyncio, contextlib, io, json, sys, time
+from benchmarks.check_embedding_parity import make_sentences
+from app.core.metrics import LoopLagMonitor, percentile
+with contextlib.redirect_stdout(io.StringIO()):
+    from app.core import ai_memory
+
+SECONDS, BATCH, INTERVAL = {seconds}, {batch}, {interval}
+
+
+def rss_mb():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def handle_request(i):
+    await asyncio.sleep(0)
+    return json.dumps({{"id": i, "ok": True, "items": list(range(50))}})
+
+
+async def main():
+    sentences = make_sentences(BATCH * 8)
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.to_thread(ai_memory.encode_texts, ["warmup"])
+    monitor = LoopLagMonitor(interval=0.01, samples=100000)
+    await monitor.start()
+    deadline = time.perf_counter() + SECONDS
+    encoded = 0
+
+    async def embed():
+        nonlocal encoded
+        while time.perf_counter() < deadline:
+            start = (encoded // BATCH) % 8 * BATCH
+            await asyncio.to_thread(ai_memory.encode_texts, sentences[start:start + BATCH])
+            encoded += BATCH
+
+    async def requests():
+        latencies, i = [], 0
+        while time.perf_counter() < deadline:
+            due = time.perf_counter() + INTERVAL
+            await asyncio.sleep(INTERVAL)
+            await handle_request(i)
+            # From when the request was due, so loop stalls count against it
+            latencies.append(time.perf_counter() - due)
+            i += 1
+        return latencies
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, latencies = await asyncio.gather(embed(), requests())
+    await monitor.close()
+    print(json.dumps({{
+        "rss_mb": rss_mb(),
+        "encoded_per_s": encoded / SECONDS,
+        "request_p50_ms": percentile(latencies, 50) * 1000,
+        "request_p99_ms": percentile(latencies, 99) * 1000,
+        "lag": monitor.summary(),
+        "model_state": ai_memory.memory_status()["model_state"],
+    }}))
+
+
+asyncio.run(main())
+"""
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_workers(args, server_path: str):
+    probe = PROBE.format(seconds=args.seconds, batch=args.batch, interval=args.request_interval_ms / 1000)
+    env = {**os.environ, "MEMORY_WARMUP": "false", "MEMORY_EMBEDDING_SERVER": server_path}
+    workers = [
+        subprocess.Popen([sys.executable, "-c", probe], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env)
+        for _ in range(args.workers)
+    ]
+    results = []
+    for worker in workers:
+        out, err = worker.communicate()
+        if worker.returncode != 0:
+            raise SystemExit(f"worker failed:\n{err}")
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    return results
+
+
+def start_server(args, path: str) -> subprocess.Popen:
+    command = [sys.executable, "-m", "app.core.embedding_server", "--unix", path]
+    if args.backend:
+        command += ["--backend", args.backend]
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 300
+    while not os.path.exists(path):
+        if server.poll() is not None:
+            raise SystemExit("embedding server exited before it started listening")
+        if time.monotonic() > deadline:
+            server.kill()
+            raise SystemExit("embedding server did not start listening")
+        time.sleep(0.2)
+    return server
+
+
+def report(label: str, results, server_rss: float = 0.0):
+    worker_rss = sum(r["rss_mb"] for r in results) / len(results)
+    total = sum(r["rss_mb"] for r in results) + server_rss
+    states = ",".join(sorted({r["model_state"] for r in results}))
+    print(
+        f"{label:<10} {worker_rss:>8.0f}MB {total:>8.0f}MB "
+        f"{max(r['request_p50_ms'] for r in results):>8.2f}ms {max(r['request_p99_ms'] for r in results):>8.2f}ms "
+        f"{max(r['lag']['p99_ms'] for r in results):>8.2f}ms "
+        f"{sum(r['encoded_per_s'] for r in results):>10.0f}/s  {states}"
+    )
+
+
+def main(args):
+    print(f"{args.workers} workers, {args.seconds}s, batches of {args.batch}, "
+          f"a request every {args.request_interval_ms}ms per worker\n")
+    print(f"{'':<10} {'RSS/wkr':>10} {'RSS total':>10} {'req p50':>10} {'req p99':>10} {'lag p99':>10} {'encoded':>12}")
+
+    report("in-process", run_workers(args, ""))
+
+    path = os.path.join(tempfile.mkdtemp(prefix="embed-"), "embed.sock")
+    server = start_server(args, path)
+    try:
+        results = run_workers(args, path)
+        report("server", results, rss_mb(server.pid))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--request-interval-ms", type=float, default=10)
+    parser.add_argument("--backend", help="server backend: torch or onnx-int8 (default: MEMORY_EMBEDDING_BACKEND)")
+    main(parser.parse_args())
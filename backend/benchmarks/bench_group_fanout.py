@@ -0,0 +1,128 @@
+"""
+Benchmark: group fan-out latency with one slow client in the group
+
+Broadcasts a stream of messages to a group of fake sockets where one client
+takes --slow-ms to accept each frame. Compares:
+  - serial:  awaiting send_text() for each subscriber in turn (the old
+             broadcast loop) - every client waits behind the slow one
+  - queued:  ConnectionManager with per-connection queues, for each
+             slow-consumer policy
+
+and reports publish -> written latency for the healthy clients plus what
+the slow client lost.
+
+Run from backend/:
+    python -m benchmarks.bench_group_fanout --clients 200 --messages 200
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import time
+
+from app.core.metrics import percentile
+from app.services.client_connection import COALESCE, DISCONNECT, DROP_OLDEST
+from app.services.connection_manager import ConnectionManager
+from benchmarks.common import NullSocket
+
+
+class FakeSocket(NullSocket):
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.received = 0
+        self.latencies = []
+        self.close_code = None
+
+    async def send_text(self, text: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        frame = json.loads(text)
+        events = frame["events"] if frame.get("type") == "batch" else [frame]
+        now = time.time()
+        self.received += len(events)
+        self.latencies.extend(now - event["ts"] for event in events)
+
+    async def close(self, code: int = 1000):
+        self.close_code = code
+
+
+def _report(label: str, healthy, slow: FakeSocket, elapsed: float, extra: str = ""):
+    samples = [s for sock in healthy for s in sock.latencies]
+    print(
+        f"{label:<18} p50={percentile(samples, 50) * 1000:7.2f}ms "
+        f"p99={percentile(samples, 99) * 1000:7.2f}ms "
+        f"publish_loop={elapsed * 1000:8.1f}ms "
+        f"slow_received={slow.received}{extra}"
+    )
+
+
+async def run_serial(args):
+    healthy = [FakeSocket() for _ in range(args.clients - 1)]
+    slow = FakeSocket(args.slow_ms / 1000)
+    sockets = healthy + [slow]
+
+    started = time.perf_counter()
+    wall_start = time.time()
+    for index in range(args.messages):
+        # Latency counts from when the message was due, so time spent
+        # stuck behind the slow client's previous sends is included
+        due = wall_start + index * args.interval_ms / 1000
+        text = json.dumps({"type": "new_group_message", "ts": due})
+        for sock in sockets:
+            await sock.send_text(text)
+        await asyncio.sleep(max(0.0, due + args.interval_ms / 1000 - time.time()))
+    _report("serial", healthy, slow, time.perf_counter() - started)
+
+
+async def run_queued(args, policy: str):
+    manager = ConnectionManager(max_queue=args.queue_size, policy=policy)
+    healthy = [FakeSocket() for _ in range(args.clients - 1)]
+    slow = FakeSocket(args.slow_ms / 1000)
+    # Per-connection logging would swamp the numbers
+    with contextlib.redirect_stdout(io.StringIO()):
+        for index, sock in enumerate(healthy + [slow]):
+            user_id = f"user-{index}"
+            await manager.connect(user_id, sock)
+            await manager.subscribe_to_group(user_id, "g1")
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for index in range(args.messages):
+            # Every other frame is a typing update that coalesces per sender
+            coalesce_key = "typing:g1:user-0" if index % 2 else None
+            await manager.send_group_message({"type": "new_group_message", "ts": time.time()}, "g1", coalesce_key)
+            await asyncio.sleep(args.interval_ms / 1000)
+    elapsed = time.perf_counter() - started
+    # Let healthy writers drain
+    await asyncio.sleep(0.05)
+
+    stats = manager.stats()
+    _report(
+        f"queued/{policy}", healthy, slow, elapsed,
+        f" dropped={stats['dropped_frames']} coalesced={stats['coalesced_frames']} slow_closed={slow.close_code}",
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        for user_id in list(manager.active_connections):
+            await manager.disconnect(user_id)
+
+
+async def main(args):
+    print(
+        f"{args.clients} clients, {args.messages} messages every {args.interval_ms}ms, "
+        f"one client at {args.slow_ms}ms/frame, queue {args.queue_size}"
+    )
+    await run_serial(args)
+    for policy in (DROP_OLDEST, COALESCE, DISCONNECT):
+        await run_queued(args, policy)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--interval-ms", type=float, default=2)
+    parser.add_argument("--slow-ms", type=float, default=20)
+    parser.add_argument("--queue-size", type=int, default=32)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,162 @@
+"""
+Benchmark: conversation inbox latency as the number of conversations grows
+
+Compares the old per-conversation fan-out (profile + last message + unread
+count for every conversation) with ChatService.get_user_conversations, which
+now makes one get_user_inbox RPC call (migrations/007_conversation_inbox.sql).
+The stand-in evaluates the RPC in Python, so the numbers show round-trip
+cost, not Postgres planning time.
+
+Run from backend/:
+    python -m benchmarks.bench_inbox --sizes 10 50 200 --latency-ms 5
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.supabase_standin import SupabaseStandIn, run_standin
+
+USER_ID = str(uuid.uuid4())
+
+
+def seed_tables(conversation_count: int, messages_per_conversation: int = 20) -> dict:
+    now = datetime.now(timezone.utc)
+    profiles = [{"id": USER_ID, "username": "me"}]
+    conversations, messages = [], []
+    for i in range(conversation_count):
+        friend_id = str(uuid.uuid4())
+        conversation_id = str(uuid.uuid4())
+        profiles.append({"id": friend_id, "username": f"friend{i}"})
+        conversations.append({
+            "id": conversation_id,
+            "participant1_id": USER_ID,
+            "participant2_id": friend_id,
+            "created_at": now.isoformat(),
+            "updated_at": (now - timedelta(minutes=i)).isoformat(),
+        })
+        for j in range(messages_per_conversation):
+            messages.append({
+                "id": str(uuid.uuid4()),
+                "conversation_id": conversation_id,
+                "sender_id": random.choice((USER_ID, friend_id)),
+                "content": f"message {j}",
+                "created_at": (now - timedelta(minutes=i, seconds=j)).isoformat(),
+                "read_at": None if j % 3 else now.isoformat(),
+            })
+    return {"profiles": profiles, "conversations": conversations, "messages": messages}
+
+
+def get_user_inbox(standin, params):
+    """Python equivalent of the get_user_inbox SQL function"""
+    user_id = params["p_user_id"]
+    profiles = {p["id"]: p for p in standin.tables["profiles"]}
+    by_conversation = {}
+    for message in standin.tables["messages"]:
+        by_conversation.setdefault(message["conversation_id"], []).append(message)
+
+    rows = []
+    for conv in standin.tables["conversations"]:
+        if user_id not in (conv["participant1_id"], conv["participant2_id"]):
+            continue
+        other_id = conv["participant2_id"] if conv["participant1_id"] == user_id else conv["participant1_id"]
+        profile = profiles.get(other_id)
+        if not profile:
+            continue
+        conv_messages = by_conversation.get(conv["id"], [])
+        rows.append({
+            "id": conv["id"],
+            "created_at": conv["created_at"],
+            "updated_at": conv["updated_at"],
+            "participant_id": other_id,
+            "participant_username": profile["username"],
+            "last_message": max(conv_messages, key=lambda m: m["created_at"]) if conv_messages else None,
+            "unread_count": sum(1 for m in conv_messages if m["sender_id"] == other_id and m["read_at"] is None),
+        })
+    return sorted(rows, key=lambda r: r["updated_at"], reverse=True)
+
+
+async def fan_out_inbox(supabase, user_id: str) -> int:
+    """The query pattern get_user_conversations used before the RPC"""
+    conversations = (
+        await supabase.table("conversations")
+        .select("*")
+        .or_(f"participant1_id.eq.{user_id},participant2_id.eq.{user_id}")
+        .order("updated_at", desc=True)
+        .execute()
+    ).data
+
+    async def process_conversation(conv):
+        other_user_id = conv["participant2_id"] if conv["participant1_id"] == user_id else conv["participant1_id"]
+        await asyncio.gather(
+            supabase.table("profiles").select("id, username").eq("id", other_user_id).execute(),
+            supabase.table("messages").select("*").eq("conversation_id", conv["id"])
+            .order("created_at", desc=True).limit(1).execute(),
+            supabase.table("messages").select("id", count="exact").eq("conversation_id", conv["id"])
+            .eq("sender_id", other_user_id).is_("read_at", "null").execute(),
+        )
+
+    await asyncio.gather(*[process_conversation(conv) for conv in conversations])
+    return len(conversations)
+
+
+async def time_calls(call, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main(args):
+    os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "standin-service-role-key")
+    print(f"stand-in latency {args.latency_ms}ms, median of {args.repeat} inbox loads\n")
+    print(f"{'conversations':>14}{'fan-out':>14}{'queries':>10}{'rpc':>12}{'queries':>10}")
+
+    for size in args.sizes:
+        standin = SupabaseStandIn(latency=args.latency_ms / 1000, tables=seed_tables(size))
+        standin.rpc_handlers["get_user_inbox"] = get_user_inbox
+        os.environ["SUPABASE_URL"] = run_standin(standin)
+
+        async def run():
+            # A fresh pool per stand-in; the module-level client is bound to the first URL
+            from supabase import AsyncClient
+            from supabase.lib.client_options import AsyncClientOptions
+            from app.core.supabase import create_http_client
+            from app.services import chatservices
+
+            http_client = create_http_client()
+            client = AsyncClient(os.environ["SUPABASE_URL"], os.environ["SUPABASE_SERVICE_ROLE_KEY"],
+                                 AsyncClientOptions(httpx_client=http_client))
+            requests = 0
+
+            async def count_request(request):
+                nonlocal requests
+                requests += 1
+
+            http_client.event_hooks["request"].append(count_request)
+            chatservices.supabase = client
+
+            fan_out_ms = await time_calls(lambda: fan_out_inbox(client, USER_ID), args.repeat)
+            fan_out_queries, requests = requests // args.repeat, 0
+            rpc_ms = await time_calls(lambda: chatservices.ChatService.get_user_conversations(USER_ID), args.repeat)
+            rpc_queries = requests // args.repeat
+            await http_client.aclose()
+            return fan_out_ms, fan_out_queries, rpc_ms, rpc_queries
+
+        fan_out_ms, fan_out_queries, rpc_ms, rpc_queries = asyncio.run(run())
+        print(f"{size:>14}{fan_out_ms:>12.1f}ms{fan_out_queries:>10}{rpc_ms:>10.1f}ms{rpc_queries:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    main(parser.parse_args())
@@ -0,0 +1,105 @@
+"""
+Benchmark: group-scoped memory search - filter after vs prefilter
+
+Builds memory tables of --rows random 384-dim vectors spread over 10, 100
+and 1000 groups (--groups to override) in a temporary directory, then runs
+--queries searches scoped to one group, two ways:
+  - postfilter: global top --limit, then keep the rows of the group (what
+    search_similar did when it parsed the metadata JSON afterwards)
+  - prefilter:  build_where() pushed into the vector search
+Recall is measured against the exact top --limit rows of the group.
+
+Needs lancedb. Run from backend/:
+    python -m benchmarks.bench_memory_filters --rows 100000
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+
+def build_table(db, name, rows: int, groups: int, rng):
+    from app.core.ai_memory import _memory_schema
+
+    vectors = rng.standard_normal((rows, 384)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    group_ids = [f"group-{i}" for i in rng.integers(0, groups, rows)]
+    records = [
+        {
+            "id": str(uuid.uuid4()),
+            "text": f"row {i}",
+            "vector": vectors[i].tolist(),
+            "timestamp": "",
+            "metadata": json.dumps({"group_id": group_ids[i], "type": "message"}),
+            "group_id": group_ids[i],
+            "type": "message",
+            "assignment_id": None,
+            "question_id": None,
+        }
+        for i in range(rows)
+    ]
+    return db.create_table(name, data=records, schema=_memory_schema(), mode="overwrite")
+
+
+def exact_top(table, vector, where, limit):
+    # No vector index on these tables, so a prefiltered search is exact
+    return [r["id"] for r in table.search(vector).where(where, prefilter=True).limit(limit).to_list()]
+
+
+def run(args):
+    backend = os.getcwd()
+    sys.path.insert(0, backend)
+    os.chdir(tempfile.mkdtemp(prefix="memory-filters-"))
+    import lancedb
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app.core.ai_memory import build_where
+
+    rng = np.random.default_rng(7)
+    db = lancedb.connect("./bench_db")
+    print(f"{args.rows} rows, {args.queries} group-scoped queries, top {args.limit}\n")
+    print(f"{'groups':>7} | {'postfilter recall':>17} {'p50':>8} | {'prefilter recall':>16} {'p50':>8}")
+
+    for groups in args.groups:
+        table = build_table(db, f"memory_{groups}", args.rows, groups, rng)
+        post_recall, pre_recall, post_times, pre_times = [], [], [], []
+        for _ in range(args.queries):
+            vector = rng.standard_normal(384).astype(np.float32)
+            group_id = f"group-{rng.integers(0, groups)}"
+            where = build_where({"group_id": group_id})
+            truth = set(exact_top(table, vector, where, args.limit))
+
+            started = time.perf_counter()
+            rows = table.search(vector).limit(args.limit).to_list()
+            post = [r["id"] for r in rows if json.loads(r["metadata"]).get("group_id") == group_id]
+            post_times.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            pre = [r["id"] for r in table.search(vector).where(where, prefilter=True).limit(args.limit).to_list()]
+            pre_times.append(time.perf_counter() - started)
+
+            if truth:
+                post_recall.append(len(truth.intersection(post)) / len(truth))
+                pre_recall.append(len(truth.intersection(pre)) / len(truth))
+
+        print(
+            f"{groups:>7} | {statistics.mean(post_recall):>17.3f} {statistics.median(post_times) * 1000:>6.1f}ms | "
+            f"{statistics.mean(pre_recall):>16.3f} {statistics.median(pre_times) * 1000:>6.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--groups", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=5)
+    run(parser.parse_args())
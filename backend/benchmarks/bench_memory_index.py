@@ -0,0 +1,106 @@
+"""
+Benchmark: memory search latency with and without the vector index
+
+For each size in --sizes (10k, 100k and 1M rows by default) fills a memory
+table in a temporary directory with random unit vectors, appended in
+--append-batch chunks like the batched writer does, and measures:
+  - brute-force search latency (no index)
+  - the MemoryMaintainer pass: index build time and fragments before/after
+  - indexed search latency and recall@--limit against brute force, with
+    the nprobes/refine_factor search_similar uses
+
+Needs lancedb. Run from backend/:
+    python -m benchmarks.bench_memory_index --sizes 10000 100000 1000000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+
+def fill(table, rows: int, batch: int, rng):
+    for start in range(0, rows, batch):
+        count = min(batch, rows - start)
+        vectors = rng.standard_normal((count, 384)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        table.add([
+            {
+                "id": str(uuid.uuid4()),
+                "text": "",
+                "vector": vector.tolist(),
+                "timestamp": "",
+                "metadata": "{}",
+                "group_id": f"group-{rng.integers(0, 100)}",
+                "type": "message",
+                "assignment_id": None,
+                "question_id": None,
+            }
+            for vector in vectors
+        ])
+
+
+def timed_searches(table, queries, limit, tune=None):
+    latencies, results = [], []
+    for vector in queries:
+        search = table.search(vector).limit(limit)
+        if tune:
+            search = tune(search)
+        started = time.perf_counter()
+        rows = search.to_list()
+        latencies.append(time.perf_counter() - started)
+        results.append({r["id"] for r in rows})
+    return statistics.median(latencies) * 1000, sorted(latencies)[int(len(latencies) * 0.99) - 1] * 1000, results
+
+
+def run(args):
+    backend = os.getcwd()
+    sys.path.insert(0, backend)
+    os.chdir(tempfile.mkdtemp(prefix="memory-index-"))
+    import lancedb
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app.core import ai_memory
+    from app.core.config import MEMORY_SEARCH_NPROBES, MEMORY_SEARCH_REFINE_FACTOR
+
+    rng = np.random.default_rng(11)
+    db = lancedb.connect("./bench_db")
+    queries = rng.standard_normal((args.queries, 384)).astype(np.float32)
+
+    for rows in args.sizes:
+        table = db.create_table(f"memory_{rows}", schema=ai_memory._memory_schema(), mode="overwrite")
+        fill(table, rows, args.append_batch, rng)
+        fragments_before = len(table.to_lance().get_fragments())
+        brute_p50, brute_p99, exact = timed_searches(table, queries, args.limit)
+
+        # Run the maintainer against this table
+        ai_memory.memory_table = table
+        maintainer = ai_memory.MemoryMaintainer(min_rows=0)
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            maintainer.maintain()
+        build_seconds = time.perf_counter() - started
+        fragments_after = len(table.to_lance().get_fragments())
+
+        tune = lambda search: search.nprobes(MEMORY_SEARCH_NPROBES).refine_factor(MEMORY_SEARCH_REFINE_FACTOR)
+        index_p50, index_p99, approx = timed_searches(table, queries, args.limit, tune)
+        recall = statistics.mean(len(a & e) / len(e) for a, e in zip(approx, exact) if e)
+
+        print(f"{rows:>9} rows  fragments {fragments_before} -> {fragments_after}, index built in {build_seconds:.1f}s")
+        print(f"           no index  p50 {brute_p50:8.2f}ms  p99 {brute_p99:8.2f}ms")
+        print(f"           indexed   p50 {index_p50:8.2f}ms  p99 {index_p99:8.2f}ms  recall@{args.limit} {recall:.3f}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--append-batch", type=int, default=5000)
+    run(parser.parse_args())
@@ -0,0 +1,117 @@
+"""
+Benchmark: AI memory writes - one record per call vs the batched writer
+
+Works on a throwaway memory_db in a temporary directory. Measures:
+  - per-record: model.encode(text) + memory_table.add([record]) for each of
+    --sample texts, the way store_embedding used to write
+  - batched: --inserts texts through store_embedding and the background
+    EmbeddingWriter, in records per second, and the Lance fragments left
+  - query latency: --queries searches (search_similar) once the table holds
+    all the inserts
+
+Needs lancedb and sentence-transformers. Run from backend/:
+    python -m benchmarks.bench_memory_writer --inserts 100000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+WORDS = (
+    "assignment question answer chapter exam lecture notes deadline group project "
+    "integral derivative matrix vector proof lemma theorem essay draft review submit "
+    "python recursion pointer array tree graph database index query schema"
+).split()
+
+
+def make_texts(count: int, seed: int):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 20))) for _ in range(count)]
+
+
+def fragment_count(table) -> int:
+    try:
+        return len(table.to_lance().get_fragments())
+    except Exception:
+        return -1
+
+
+def run(args):
+    # ai_memory opens ./memory_db relative to the working directory
+    backend = os.getcwd()
+    sys.path.insert(0, backend)
+    os.chdir(tempfile.mkdtemp(prefix="memory-bench-"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app.core import ai_memory
+    from app.core.config import MEMORY_WRITE_QUEUE_SIZE
+    try:
+        model, table = ai_memory.get_model(), ai_memory.get_memory_table()
+    except Exception as e:
+        raise SystemExit(f"AI memory failed to initialise (is lancedb / sentence-transformers installed?): {e}")
+    writer = ai_memory.memory_writer
+
+    sample = make_texts(args.sample, seed=1)
+    started = time.perf_counter()
+    for text in sample:
+        table.add([{
+            "id": str(uuid.uuid4()),
+            "text": text,
+            "vector": model.encode(text).tolist(),
+            "timestamp": datetime.now().isoformat(),
+            "metadata": "{}",
+        }])
+    per_record = args.sample / (time.perf_counter() - started)
+    print(f"per-record  {per_record:9.1f} records/s   ({args.sample} records, "
+          f"{fragment_count(table)} fragments)")
+
+    texts = make_texts(args.inserts, seed=2)
+
+    async def insert_all():
+        for text in texts:
+            await ai_memory.store_embedding(text, {"group_id": "bench", "type": "message"})
+            if writer.stats()["pending"] >= MEMORY_WRITE_QUEUE_SIZE // 2:
+                # Let the writer catch up instead of dropping texts
+                await asyncio.to_thread(writer.flush)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        asyncio.run(insert_all())
+        writer.flush()
+        batched = args.inserts / (time.perf_counter() - started)
+    stats = writer.stats()
+    print(f"batched     {batched:9.1f} records/s   ({stats['written']} records in {stats['batches']} batches, "
+          f"{stats['dropped']} dropped, {fragment_count(table)} fragments)")
+    print(f"speed-up    {batched / per_record:9.1f}x\n")
+
+    queries = make_texts(args.queries, seed=3)
+    latencies = []
+
+    async def search_all():
+        for query in queries:
+            started = time.perf_counter()
+            await ai_memory.search_similar(query, limit=5)
+            latencies.append(time.perf_counter() - started)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(search_all())
+    latencies.sort()
+    print(f"search over {table.count_rows()} rows: p50 {statistics.median(latencies) * 1000:.1f}ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f}ms")
+    writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--inserts", type=int, default=100000)
+    parser.add_argument("--sample", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    run(parser.parse_args())
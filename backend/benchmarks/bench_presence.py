@@ -0,0 +1,191 @@
+"""
+Benchmark: presence for tens of thousands of connected users
+
+--users users connect to one worker's ConnectionManager, each a member of
+--groups-per-user of --groups groups (with the group open, so subscribed)
+and with --friends friends, all served by the Supabase stand-in. Measures:
+  - the first flush: audience loads (Supabase requests) and presence
+    frames written, against one frame per change per recipient
+  - reconnect churn: --churn of the users drop and reconnect within a
+    flush window, which should publish no visible change
+  - idle detection: the timing-wheel sweep only visits users whose
+    deadline passed; a quiet tick is compared with scanning every user
+  - bulk lookups of 500 users from the shared view
+
+Run from backend/:
+    python -m benchmarks.bench_presence --users 20000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import time
+import uuid
+
+from benchmarks.common import CountingSocket
+from benchmarks.supabase_standin import SupabaseStandIn, run_standin
+
+
+def frames_written(sockets) -> int:
+    return sum(sock.count for sock in sockets.values())
+
+
+def reset_counts(sockets):
+    for sock in sockets.values():
+        sock.count = 0
+
+
+def build_world(args):
+    rng = random.Random(3)
+    users = [str(uuid.uuid4()) for _ in range(args.users)]
+    groups = [str(uuid.uuid4()) for _ in range(args.groups)]
+    user_groups = {u: rng.sample(groups, args.groups_per_user) for u in users}
+    members = [{"group_id": g, "user_id": u, "role": "member"} for u, gs in user_groups.items() for g in gs]
+    friends = []
+    for index, user_id in enumerate(users):
+        # Each user befriends the next --friends users (both directions are one row)
+        for offset in range(1, args.friends // 2 + 1):
+            friends.append({"user_id": user_id, "friend_id": users[(index + offset) % len(users)]})
+    return users, user_groups, {"group_members": members, "friends": friends}
+
+
+async def drain():
+    # Let the per-connection writer tasks send what was enqueued
+    for _ in range(3):
+        await asyncio.sleep(0.05)
+
+
+async def run(args, users, user_groups):
+    from app.core.supabase import http_client
+    from app.services.connection_manager import ConnectionManager
+    from app.services.presence import PRESENCE_CHANNEL
+
+    requests = {"count": 0}
+
+    async def count_request(request):
+        requests["count"] += 1
+
+    http_client.event_hooks["request"].append(count_request)
+
+    manager = ConnectionManager()
+    await manager.broker.subscribe(PRESENCE_CHANNEL)
+    presence = manager.presence
+    sockets = {}
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for user_id in users:
+            sockets[user_id] = CountingSocket()
+            await manager.connect(user_id, sockets[user_id])
+            for group_id in user_groups[user_id]:
+                await manager.subscribe_to_group(user_id, group_id)
+    print(f"connected {len(users)} users in {time.perf_counter() - started:.1f}s")
+
+    # --- first flush: everyone came online ---
+    naive = 0
+    for user_id in users:
+        recipients = set()
+        for group_id in user_groups[user_id]:
+            recipients.update(manager.group_subscriptions.get(group_id, ()))
+        naive += len(recipients - {user_id})
+    started = time.perf_counter()
+    await presence.flush()
+    flush_s = time.perf_counter() - started
+    await drain()
+    print(f"\nfirst flush: {flush_s * 1000:.0f}ms, {requests['count']} Supabase requests for "
+          f"{len(users)} audiences, {presence.published} changes in 1 broker message")
+    print(f"  presence frames written: {frames_written(sockets)} "
+          f"(one frame per change per group subscriber would be >= {naive})")
+
+    # --- reconnect churn inside the rate-limit window ---
+    reset_counts(sockets)
+    published = presence.published
+    churned = users[: int(len(users) * args.churn)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for user_id in churned:
+            await manager.disconnect(user_id)
+            sockets[user_id] = CountingSocket()
+            await manager.connect(user_id, sockets[user_id])
+    await presence.flush()
+    await drain()
+    print(f"\nchurn: {len(churned)} reconnects -> {presence.published - published} published now, "
+          f"{len(presence._dirty)} held for the rate limit, {frames_written(sockets)} frames")
+    # After the window they go out, but the shared view sees no change
+    await asyncio.sleep(presence.min_interval)
+    await presence.flush()
+    await drain()
+    print(f"       after the window: {presence.published - published} published, "
+          f"{frames_written(sockets)} frames (status unchanged)")
+
+    # --- idle detection ---
+    reset_counts(sockets)
+    presence.idle_after = args.idle_seconds
+    for user_id in users:
+        presence.touch(user_id)
+    await asyncio.sleep(args.idle_seconds + 2 * presence.resolution)
+    # Half of them did something just before the sweep
+    for user_id in users[: len(users) // 2]:
+        presence.touch(user_id)
+
+    started = time.perf_counter()
+    await presence.sweep()
+    sweep_ms = (time.perf_counter() - started) * 1000
+    idle = presence.stats()["local_users"]["idle"]
+    print(f"\nidle: {idle} of {len(users)} users went idle, that sweep took {sweep_ms:.1f}ms")
+
+    # Most ticks have few deadlines due; compare with scanning every local user each tick
+    await asyncio.sleep(presence.resolution)
+    started = time.perf_counter()
+    await presence.sweep()
+    tick_us = (time.perf_counter() - started) * 1e6
+    started = time.perf_counter()
+    now = time.monotonic()
+    sum(1 for entry in presence._local.values() if now - entry.active_at >= presence.idle_after)
+    scan_us = (time.perf_counter() - started) * 1e6
+    print(f"  quiet tick: wheel sweep {tick_us:.0f}us vs full scan {scan_us:.0f}us")
+    await asyncio.sleep(presence.min_interval)
+    await presence.flush()
+    await drain()
+    print(f"  idle changes fanned out as {frames_written(sockets)} frames")
+
+    # --- bulk lookups ---
+    rounds = 200
+    queries = [random.sample(users, 500) for _ in range(rounds)]
+    started = time.perf_counter()
+    for user_ids in queries:
+        result = presence.presence_of(user_ids)
+    per_query_us = (time.perf_counter() - started) / rounds * 1e6
+    statuses = {}
+    for state in result.values():
+        statuses[state["status"]] = statuses.get(state["status"], 0) + 1
+    print(f"\nbulk lookup of 500 users: {per_query_us:.0f}us per query, last result {statuses}")
+    print(f"\n{presence.stats()}")
+
+
+def main(args):
+    users, user_groups, tables = build_world(args)
+    standin = SupabaseStandIn(latency=args.latency_ms / 1000, tables=tables)
+    os.environ["SUPABASE_URL"] = run_standin(standin)
+    os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "standin-service-role-key")
+
+    async def go():
+        from app.core.supabase import close_supabase
+        await run(args, users, user_groups)
+        await close_supabase()
+
+    asyncio.run(go())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--groups", type=int, default=2000)
+    parser.add_argument("--groups-per-user", type=int, default=2)
+    parser.add_argument("--friends", type=int, default=10)
+    parser.add_argument("--churn", type=float, default=0.2)
+    parser.add_argument("--idle-seconds", type=float, default=3)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    main(parser.parse_args())
@@ -0,0 +1,177 @@
+"""
+Benchmark: reconnect storm - page reload vs sequence resume
+
+--reconnects clients reconnect at once after missing --gap messages in a
+conversation holding --history messages. Compares what each reconnect
+costs, in Supabase requests and storm wall time:
+  - reload:           the old behaviour, re-fetching the latest page
+                      (ChatService.get_conversation_messages)
+  - resume/database:  ChatService.get_messages_after_seq for just the gap
+  - resume/buffer:    participant check + the worker's replay buffer (the
+                      steps ResumeService takes when the buffer holds the gap)
+
+Then replays a burst of sequenced group broadcasts through
+ConnectionManager and reports how often the replay buffer can answer a
+resume as the gap grows past its size, and checks that a gap at the end of
+the stream - messages published after the worker's last subscriber left -
+falls back to the database instead of resuming with nothing.
+
+Run from backend/:
+    python -m benchmarks.bench_resume --reconnects 500 --gap 10
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.common import NullSocket
+from benchmarks.supabase_standin import SupabaseStandIn, run_standin
+
+USER_ID = str(uuid.uuid4())
+FRIEND_ID = str(uuid.uuid4())
+CONVERSATION_ID = str(uuid.uuid4())
+
+
+def seed_tables(history: int) -> dict:
+    now = datetime.now(timezone.utc)
+    messages = [
+        {
+            "id": str(uuid.uuid4()),
+            "conversation_id": CONVERSATION_ID,
+            "sender_id": random.choice((USER_ID, FRIEND_ID)),
+            "content": f"message {seq}",
+            "created_at": (now - timedelta(seconds=history - seq)).isoformat(),
+            "read_at": None,
+            "seq": seq,
+        }
+        for seq in range(1, history + 1)
+    ]
+    conversations = [{
+        "id": CONVERSATION_ID,
+        "participant1_id": USER_ID,
+        "participant2_id": FRIEND_ID,
+        "created_at": now.isoformat(),
+        "updated_at": now.isoformat(),
+    }]
+    return {"conversations": conversations, "messages": messages}
+
+
+async def storm(label: str, call, reconnects: int, counter: dict):
+    counter["requests"] = 0
+    started = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(reconnects)))
+    elapsed = time.perf_counter() - started
+    print(
+        f"{label:<18} {elapsed * 1000:9.1f}ms storm  "
+        f"{elapsed / reconnects * 1000:7.2f}ms/reconnect  "
+        f"{counter['requests'] / reconnects:4.1f} requests/reconnect"
+    )
+
+
+async def run_storms(args):
+    from app.core.supabase import http_client
+    from app.services.chatservices import ChatService
+    from app.services.connection_manager import ConnectionManager
+
+    counter = {"requests": 0}
+
+    async def count_request(request):
+        counter["requests"] += 1
+
+    http_client.event_hooks["request"].append(count_request)
+
+    manager = ConnectionManager()
+    last_seq = args.history - args.gap
+    stream = f"conversation:{CONVERSATION_ID}"
+    for seq in range(max(1, args.history - manager.replay.events_per_stream + 1), args.history + 1):
+        manager.replay.record(stream, seq, {"type": "new_message", "seq": seq})
+
+    async def reload():
+        await ChatService.get_conversation_messages(CONVERSATION_ID, USER_ID, limit=50)
+
+    async def resume_database():
+        page = await ChatService.get_messages_after_seq(CONVERSATION_ID, USER_ID, last_seq, 200)
+        assert len(page["messages"]) == args.gap, len(page["messages"])
+
+    async def resume_buffer():
+        await ChatService.get_conversation_details(CONVERSATION_ID, USER_ID)
+        events = manager.replay.since(stream, last_seq)
+        assert events is not None and len(events) == args.gap
+
+    print(f"{args.reconnects} reconnects, gap {args.gap} of {args.history} messages, "
+          f"stand-in latency {args.latency_ms}ms\n")
+    await storm("reload", reload, args.reconnects, counter)
+    await storm("resume/database", resume_database, args.reconnects, counter)
+    await storm("resume/buffer", resume_buffer, args.reconnects, counter)
+
+
+async def run_buffer_coverage(args):
+    from app.services.connection_manager import ConnectionManager
+
+    manager = ConnectionManager()
+    group_id = str(uuid.uuid4())
+    with contextlib.redirect_stdout(io.StringIO()):
+        await manager.connect("member", NullSocket())
+        await manager.subscribe_to_group("member", group_id)
+        for seq in range(1, args.history + 1):
+            await manager.send_group_message({"type": "new_group_message", "seq": seq, "message": {}}, group_id)
+
+    size = manager.replay.events_per_stream
+    print(f"\nreplay buffer ({size} events per stream) after {args.history} group broadcasts:")
+    for gap in (1, 10, size // 2, size, size + 1, size * 4):
+        started = time.perf_counter()
+        events = manager.replay.since(f"group:{group_id}", args.history - gap)
+        lookup_us = (time.perf_counter() - started) * 1e6
+        outcome = f"{len(events)} events from buffer" if events is not None else "database fallback"
+        print(f"  gap {gap:5d}: {outcome:<24} ({lookup_us:.1f}us)")
+
+    # The member's only socket drops, so the worker stops listening to the
+    # group; everything published meanwhile must come from the database
+    stream = f"group:{group_id}"
+    with contextlib.redirect_stdout(io.StringIO()):
+        await manager.disconnect("member")
+        for seq in range(args.history + 1, args.history + args.gap + 1):
+            await manager.send_group_message({"type": "new_group_message", "seq": seq, "message": {}}, group_id)
+        trailing = manager.replay.since(stream, args.history)
+        await manager.connect("member", NullSocket())
+        await manager.subscribe_to_group("member", group_id)
+        await manager.send_group_message(
+            {"type": "new_group_message", "seq": args.history + args.gap + 1, "message": {}}, group_id
+        )
+        leading = manager.replay.since(stream, args.history)
+        await manager.disconnect("member")
+
+    for label, events in (("while unsubscribed", trailing), ("after resubscribing", leading)):
+        outcome = "database fallback" if events is None else f"{len(events)} events from buffer"
+        print(f"  trailing gap of {args.gap}, {label}: {outcome}")
+    if trailing is not None or leading is not None:
+        raise SystemExit("FAIL replay buffer answered a resume across a span the worker was not subscribed for")
+
+
+def main(args):
+    standin = SupabaseStandIn(latency=args.latency_ms / 1000, tables=seed_tables(args.history))
+    os.environ["SUPABASE_URL"] = run_standin(standin)
+    os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "standin-service-role-key")
+
+    async def run():
+        from app.core.supabase import close_supabase
+        await run_storms(args)
+        await run_buffer_coverage(args)
+        await close_supabase()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reconnects", type=int, default=500)
+    parser.add_argument("--gap", type=int, default=10)
+    parser.add_argument("--history", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    main(parser.parse_args())
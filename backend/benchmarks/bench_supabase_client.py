@@ -0,0 +1,124 @@
+"""
+Benchmark: shared async Supabase client vs the old sync client
+
+Replays the query shape of the chat and group endpoints against the local
+stand-in with a fixed per-request latency and reports requests/sec for:
+  - sync-blocking:   sync client called directly on the event loop
+  - sync-threadpool: sync client wrapped in run_in_threadpool
+  - async-pooled:    app.core.supabase (one pooled keep-alive httpx client)
+
+--max-connections overrides SUPABASE_HTTP_MAX_CONNECTIONS for the pooled
+client, so the pool size can be swept against the threadpool baseline.
+
+Run from backend/:
+    python -m benchmarks.bench_supabase_client --requests 2000 --concurrency 200
+    python -m benchmarks.bench_supabase_client --max-connections 20
+"""
+
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+from benchmarks.supabase_standin import SupabaseStandIn, run_standin
+
+GROUP_ID = str(uuid.uuid4())
+USER_ID = str(uuid.uuid4())
+CONVERSATION_ID = str(uuid.uuid4())
+
+
+def seed_tables() -> dict:
+    return {
+        "group_members": [{"id": str(uuid.uuid4()), "group_id": GROUP_ID, "user_id": USER_ID, "role": "admin"}],
+        "group_messeges": [
+            {"id": str(uuid.uuid4()), "group_id": GROUP_ID, "sender_id": USER_ID, "content": f"message {i}"}
+            for i in range(200)
+        ],
+        "conversations": [{"id": CONVERSATION_ID, "participant1_id": USER_ID, "participant2_id": str(uuid.uuid4())}],
+        "messages": [],
+    }
+
+
+def group_page_sync(client):
+    client.table("group_members").select("id").eq("group_id", GROUP_ID).eq("user_id", USER_ID).execute()
+    client.table("group_messeges").select("*").eq("group_id", GROUP_ID).order("created_at", desc=True).limit(20).execute()
+
+
+def chat_send_sync(client):
+    client.table("conversations").select("*").eq("id", CONVERSATION_ID).execute()
+    client.table("messages").insert({"conversation_id": CONVERSATION_ID, "sender_id": USER_ID, "content": "hi"}).execute()
+
+
+async def group_page_async(client):
+    await client.table("group_members").select("id").eq("group_id", GROUP_ID).eq("user_id", USER_ID).execute()
+    await client.table("group_messeges").select("*").eq("group_id", GROUP_ID).order("created_at", desc=True).limit(20).execute()
+
+
+async def chat_send_async(client):
+    await client.table("conversations").select("*").eq("id", CONVERSATION_ID).execute()
+    await client.table("messages").insert({"conversation_id": CONVERSATION_ID, "sender_id": USER_ID, "content": "hi"}).execute()
+
+
+async def drive(make_request, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await make_request()
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(total)])
+    return total / (time.perf_counter() - started)
+
+
+async def main(args):
+    standin = SupabaseStandIn(latency=args.latency_ms / 1000, tables=seed_tables())
+    base_url = run_standin(standin)
+    os.environ["SUPABASE_URL"] = base_url
+    os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "standin-service-role-key")
+    if args.max_connections:
+        os.environ["SUPABASE_HTTP_MAX_CONNECTIONS"] = str(args.max_connections)
+
+    from fastapi.concurrency import run_in_threadpool
+    from supabase import create_client
+    from app.core.config import SUPABASE_HTTP_MAX_CONNECTIONS
+    from app.core.supabase import supabase as async_client, close_supabase
+
+    sync_client = create_client(base_url, os.environ["SUPABASE_SERVICE_ROLE_KEY"])
+
+    workloads = {
+        "group messages": (group_page_sync, group_page_async),
+        "chat send": (chat_send_sync, chat_send_async),
+    }
+
+    print(
+        f"stand-in latency {args.latency_ms}ms, {args.requests} requests, concurrency {args.concurrency}, "
+        f"pool {SUPABASE_HTTP_MAX_CONNECTIONS} connections\n"
+    )
+    print(f"{'endpoint':<16}{'sync-blocking':>16}{'sync-threadpool':>18}{'async-pooled':>15}")
+    for name, (sync_fn, async_fn) in workloads.items():
+        async def blocking():
+            sync_fn(sync_client)
+
+        async def threadpool():
+            await run_in_threadpool(sync_fn, sync_client)
+
+        async def pooled():
+            await async_fn(async_client)
+
+        blocking_rps = await drive(blocking, args.requests // 10, args.concurrency)
+        threadpool_rps = await drive(threadpool, args.requests, args.concurrency)
+        pooled_rps = await drive(pooled, args.requests, args.concurrency)
+        print(f"{name:<16}{blocking_rps:>14.0f}/s{threadpool_rps:>16.0f}/s{pooled_rps:>13.0f}/s")
+
+    await close_supabase()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--max-connections", type=int, help="pool size (default: SUPABASE_HTTP_MAX_CONNECTIONS)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,74 @@
+"""
+Benchmark: outbound frames for typing indicators in a busy group
+
+--typers members of a --members group type one keystroke every
+--keystroke-ms for --seconds. Counts frames written to sockets when every
+typing_in_group action is broadcast as-is versus throttled and merged
+into users_typing frames, and checks that typers expire afterwards.
+
+Run from backend/:
+    python -m benchmarks.bench_typing --members 100 --typers 5 --seconds 3
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+from app.services.connection_manager import ConnectionManager
+from benchmarks.common import CountingSocket
+
+
+async def run(args, aggregated: bool):
+    manager = ConnectionManager()
+    await manager.start()
+    sockets = [CountingSocket(keep=True) for _ in range(args.members)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for index, sock in enumerate(sockets):
+            await manager.connect(f"user-{index}", sock)
+            await manager.subscribe_to_group(f"user-{index}", "g1")
+
+    typers = [f"user-{index}" for index in range(args.typers)]
+    deadline = time.monotonic() + args.seconds
+    while time.monotonic() < deadline:
+        for user_id in typers:
+            if aggregated:
+                await manager.send_typing("g1", user_id)
+            else:
+                await manager.send_group_message({"type": "user_typing", "group_id": "g1", "user_id": user_id}, "g1")
+        await asyncio.sleep(args.keystroke_ms / 1000)
+
+    typing_frames = sum(len(sock.frames) for sock in sockets)
+    label = "merged" if aggregated else "per event"
+    print(f"{label:<10} frames written: {typing_frames:7d} ({typing_frames / args.seconds:8.0f}/s)")
+
+    if aggregated:
+        # Typers drop out once the TTL passes without new events
+        await asyncio.sleep(manager.typing.ttl + 2 * manager.typing.interval)
+        last = sockets[-1].frames[-1]
+        assert last["type"] == "users_typing" and last["user_ids"] == [], last
+        print(f"{'':<10} typers expired, last frame: {last}")
+        print(f"{'':<10} {manager.typing.stats()}")
+
+    await manager.close()
+    return typing_frames
+
+
+async def main(args):
+    print(
+        f"{args.members} members, {args.typers} typing every {args.keystroke_ms}ms "
+        f"for {args.seconds}s"
+    )
+    before = await run(args, aggregated=False)
+    after = await run(args, aggregated=True)
+    print(f"reduction: {before / max(after, 1):.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=100)
+    parser.add_argument("--typers", type=int, default=5)
+    parser.add_argument("--keystroke-ms", type=float, default=100)
+    parser.add_argument("--seconds", type=float, default=3)
+    asyncio.run(main(parser.parse_args()))
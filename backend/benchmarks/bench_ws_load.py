@@ -0,0 +1,267 @@
+"""
+Load test: thousands of simulated chat clients against websocket_endpoint
+
+Starts the Supabase stand-in and one uvicorn process serving the real app
+(app.main:app by default), then opens --clients WebSockets to
+/api/ws/chat/{token}. Each client joins --groups-per-client of --groups
+groups. For --duration seconds:
+  - a --senders fraction of clients send a group message every
+    --message-interval seconds
+  - a --typers fraction send typing_in_group every --typing-interval seconds
+  - every client reads its frames, including batch frames
+
+Reports:
+  - connections held by the server process, connect rate and failures
+  - send -> receive fan-out latency percentiles, measured by the clients
+  - the server's own publish -> written latency and event-loop lag
+  - server RSS per connection
+
+Clients run in this process on the same machine. On a small box their CPU
+competes with the server, so compare runs made on the same hardware.
+
+Run from backend/:
+    python -m benchmarks.bench_ws_load --clients 2000 --groups 100 --duration 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from app.core.metrics import percentile
+from benchmarks.common import free_port, wait_for_port
+from benchmarks.supabase_standin import SupabaseStandIn, run_standin
+
+JWT_SECRET = "standin-jwt-secret-with-at-least-32-characters"
+
+
+def _token(user_id: str) -> str:
+    from jose import jwt
+    return jwt.encode(
+        {"sub": user_id, "aud": "authenticated", "role": "authenticated", "exp": int(time.time()) + 86400},
+        JWT_SECRET,
+        algorithm="HS256",
+    )
+
+
+class SimulatedClient:
+    def __init__(self, user_id: str, token: str, groups):
+        self.user_id = user_id
+        self.token = token
+        self.groups = groups
+        self.ws = None
+        self.frames = 0
+        self.events = 0
+        self.latencies = []
+        self.measuring = False
+
+    async def connect(self, base_url: str, compression: bool):
+        import websockets
+        ws = await websockets.connect(
+            f"{base_url}/api/ws/chat/{self.token}",
+            compression="deflate" if compression else None,
+            open_timeout=60,
+            max_queue=None,
+        )
+        for group_id in self.groups:
+            await ws.send(json.dumps({"action": "join_group", "group_id": group_id}))
+        joined = 0
+        while joined < len(self.groups):
+            for event in self._events(await ws.recv()):
+                if event.get("type") == "group_joined":
+                    joined += 1
+        # Only count the client once it is connected and in its groups
+        self.ws = ws
+
+    @staticmethod
+    def _events(raw):
+        frame = json.loads(raw)
+        return frame["events"] if frame.get("type") == "batch" else [frame]
+
+    async def read(self):
+        try:
+            async for raw in self.ws:
+                self.frames += 1
+                received = time.time()
+                for event in self._events(raw):
+                    self.events += 1
+                    if event.get("type") != "new_group_message" or not self.measuring:
+                        continue
+                    content = event["message"].get("content") or ""
+                    if content.startswith("lt "):
+                        self.latencies.append(received - float(content[3:]))
+        except Exception:
+            pass
+
+    async def send_messages(self, interval: float, stop: asyncio.Event):
+        # Kept under 20 characters so assignment detection skips the AI call
+        await asyncio.sleep(random.uniform(0, interval))
+        while not stop.is_set():
+            content = f"lt {time.time():.4f}"
+            await self.ws.send(json.dumps({
+                "action": "send_group_message",
+                "group_id": random.choice(self.groups),
+                "content": content,
+            }))
+            await asyncio.sleep(interval)
+
+    async def send_typing(self, interval: float, stop: asyncio.Event):
+        await asyncio.sleep(random.uniform(0, interval))
+        while not stop.is_set():
+            await self.ws.send(json.dumps({"action": "typing_in_group", "group_id": random.choice(self.groups)}))
+            await asyncio.sleep(interval)
+
+
+async def _server_metrics(base_url: str, token: str) -> dict:
+    import httpx
+    async with httpx.AsyncClient(timeout=30) as client:
+        response = await client.get(
+            f"{base_url.replace('ws://', 'http://')}/api/metrics/realtime",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        response.raise_for_status()
+        return response.json()
+
+
+async def drive(args, port: int, users):
+    base_url = f"ws://127.0.0.1:{port}"
+    rng = random.Random(7)
+    group_ids = [str(uuid.uuid4()) for _ in range(args.groups)]
+    clients = [
+        SimulatedClient(user_id, token, rng.sample(group_ids, min(args.groups_per_client, args.groups)))
+        for user_id, token in users
+    ]
+    admin_token = clients[0].token
+
+    before = await _server_metrics(base_url, admin_token)
+
+    # --- connect phase ---
+    semaphore = asyncio.Semaphore(args.connect_concurrency)
+    failures = []
+
+    async def connect(client: SimulatedClient):
+        async with semaphore:
+            try:
+                await client.connect(base_url, not args.no_deflate)
+            except Exception as e:
+                failures.append(repr(e))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(connect(c) for c in clients))
+    connect_s = time.perf_counter() - started
+    connected = [c for c in clients if c.ws is not None]
+
+    readers = [asyncio.create_task(c.read()) for c in connected]
+    await asyncio.sleep(1)
+    loaded = await _server_metrics(base_url, admin_token)
+
+    # --- workload phase ---
+    stop = asyncio.Event()
+    senders = connected[: int(len(connected) * args.senders)]
+    typers = connected[len(connected) - int(len(connected) * args.typers):]
+    for client in connected:
+        client.measuring = True
+    workload = [asyncio.create_task(c.send_messages(args.message_interval, stop)) for c in senders]
+    workload += [asyncio.create_task(c.send_typing(args.typing_interval, stop)) for c in typers]
+
+    await asyncio.sleep(args.duration)
+    stop.set()
+    await asyncio.gather(*workload, return_exceptions=True)
+    # Let in-flight broadcasts land
+    await asyncio.sleep(args.drain)
+    for client in connected:
+        client.measuring = False
+    after = await _server_metrics(base_url, admin_token)
+
+    await asyncio.gather(*(c.ws.close() for c in connected), return_exceptions=True)
+    for reader in readers:
+        reader.cancel()
+
+    # --- report ---
+    latencies = [s for c in connected for s in c.latencies]
+    frames = sum(c.frames for c in connected)
+    events = sum(c.events for c in connected)
+    group_p99 = [g["p99_ms"] for g in after["group_fanout_latency"].values()]
+    rss_before, rss_loaded = before.get("process_rss_bytes"), loaded.get("process_rss_bytes")
+
+    print(f"\n=== {len(clients)} clients, {args.groups} groups x {args.groups_per_client} per client ===")
+    print(f"connections held by server process: {loaded['connections']} "
+          f"({len(connected)} open here, {len(failures)} failed)")
+    if failures:
+        print(f"  first failure: {failures[0]}")
+    print(f"connect + join rate: {len(connected) / connect_s:.0f} clients/s ({connect_s:.1f}s)")
+    if rss_before and rss_loaded:
+        print(f"server RSS: {rss_before / 2**20:.1f} MB idle -> {rss_loaded / 2**20:.1f} MB connected, "
+              f"{(rss_loaded - rss_before) / max(len(connected), 1) / 1024:.1f} KB per connection")
+    print(f"workload: {len(senders)} senders every {args.message_interval}s, "
+          f"{len(typers)} typers every {args.typing_interval}s, {args.duration}s")
+    print(f"client fan-out latency (send -> receive, {len(latencies)} deliveries): "
+          f"p50={percentile(latencies, 50) * 1000:.1f}ms p95={percentile(latencies, 95) * 1000:.1f}ms "
+          f"p99={percentile(latencies, 99) * 1000:.1f}ms max={max(latencies, default=0) * 1000:.1f}ms")
+    print(f"frames received: {frames} carrying {events} events")
+    if group_p99:
+        print(f"server publish -> written p99 across groups: median={percentile(group_p99, 50):.1f}ms "
+              f"worst={max(group_p99):.1f}ms")
+    lag = after["event_loop_lag"]
+    print(f"server event-loop lag: p50={lag['p50_ms']:.1f}ms p99={lag['p99_ms']:.1f}ms max={lag['max_ms']:.1f}ms")
+    print(f"server queues: dropped={after['dropped_frames']} coalesced={after['coalesced_frames']} "
+          f"batches={after.get('sent_batches', 0)} typing={after['typing']}")
+
+
+def main(args):
+    users = [(str(uuid.uuid4()),) for _ in range(args.clients)]
+    profiles = [
+        {"id": user_id, "username": f"user{index}", "full_name": f"Load User {index}", "avatar_url": None}
+        for index, (user_id,) in enumerate(users)
+    ]
+    base_url = run_standin(SupabaseStandIn(latency=args.latency_ms / 1000, tables={"profiles": profiles}))
+
+    env = dict(
+        os.environ,
+        SUPABASE_URL=base_url,
+        SUPABASE_SERVICE_ROLE_KEY="standin-service-role-key",
+        SUPABASE_JWT_SECRET=JWT_SECRET,
+        # Never reach out to the real AI providers from a load test
+        OPENROUTER_API_KEY="",
+        GEMINI_API_KEY="",
+    )
+    log_path = os.path.join(tempfile.mkdtemp(), "server.log")
+    port = free_port()
+    with open(log_path, "w") as log:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", args.app, "--port", str(port), "--log-level", "warning",
+             "--backlog", "4096"],
+            env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+    try:
+        wait_for_port(port, server, timeout=60)
+        users = [(user_id, _token(user_id)) for (user_id,) in users]
+        asyncio.run(drive(args, port, users))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        print(f"server log: {log_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default="app.main:app", help="ASGI app serving /api/ws/chat/{token}")
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--groups", type=int, default=100)
+    parser.add_argument("--groups-per-client", type=int, default=2)
+    parser.add_argument("--senders", type=float, default=0.02, help="fraction of clients sending messages")
+    parser.add_argument("--message-interval", type=float, default=2.0)
+    parser.add_argument("--typers", type=float, default=0.05, help="fraction of clients sending typing events")
+    parser.add_argument("--typing-interval", type=float, default=0.3)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--drain", type=float, default=2)
+    parser.add_argument("--latency-ms", type=float, default=2, help="stand-in latency per Supabase call")
+    parser.add_argument("--connect-concurrency", type=int, default=100)
+    parser.add_argument("--no-deflate", action="store_true", help="do not offer permessage-deflate")
+    main(parser.parse_args())
@@ -0,0 +1,198 @@
+"""
+Benchmark: bytes on the wire and server CPU per broadcast, JSON vs MessagePack
+
+Uses representative chat frames (new_message, new_group_message with an
+attachment, users_typing) and measures, for a broadcast to --recipients
+sockets:
+  - payload bytes per frame, raw and after permessage-deflate (raw deflate
+    with a per-socket context, the way the extension runs by default)
+  - server CPU per broadcast: one encode, plus one deflate per recipient
+    when compression is negotiated
+
+Then starts a real server and checks the negotiation end to end: JSON by
+default, the msgpack subprotocol when offered, permessage-deflate on both.
+MessagePack rows are skipped when msgpack is not installed.
+
+Run from backend/:
+    python -m benchmarks.bench_ws_protocol --recipients 200
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+
+from app.services.ws_protocol import MSGPACK_SUBPROTOCOL, JsonCodec, MsgpackCodec, msgpack
+from benchmarks.common import free_port
+
+
+SENTENCES = [
+    "Are we still meeting after the lecture to go over the assignment?",
+    "I pushed my part of the report, can someone review the intro",
+    "Does anyone have the slides from Tuesday",
+    "Question 4 is asking about amortized cost, not worst case",
+    "Running ten minutes late, start without me",
+    "Uploaded the notes from today",
+]
+
+
+def sample_frames():
+    """One frame of each kind, with fresh ids and text on every call"""
+    now = datetime.now(timezone.utc).isoformat()
+    conversation_id, sender_id, group_id = (str(uuid.uuid4()) for _ in range(3))
+    return {
+        "new_message": {
+            "type": "new_message",
+            "message": {
+                "id": str(uuid.uuid4()),
+                "conversation_id": conversation_id,
+                "sender_id": sender_id,
+                "content": random.choice(SENTENCES),
+                "created_at": now,
+                "updated_at": now,
+                "is_read": False,
+            },
+        },
+        "new_group_message": {
+            "type": "new_group_message",
+            "message": {
+                "id": str(uuid.uuid4()),
+                "group_id": group_id,
+                "sender_id": sender_id,
+                "sender_username": "student_42",
+                "sender_avatar": "https://example.supabase.co/storage/v1/object/public/avatars/student_42.png",
+                "content": random.choice(SENTENCES),
+                "created_at": now,
+                "attachment": {
+                    "id": str(uuid.uuid4()),
+                    "file_name": "week-3-notes.pdf",
+                    "file_type": "application/pdf",
+                    "file_size": 482133,
+                    "file_url": f"https://example.supabase.co/storage/v1/object/public/group-files/{group_id}/week-3-notes.pdf",
+                },
+            },
+        },
+        "users_typing": {"type": "users_typing", "group_id": group_id, "user_ids": [sender_id, str(uuid.uuid4())]},
+    }
+
+
+def deflate_stream():
+    """
+    permessage-deflate with context takeover: one compressor per socket,
+    with the 4 KB window uvicorn negotiates (server_max_window_bits=12)
+    """
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -12)
+
+    def compress(data: bytes) -> bytes:
+        # RFC 7692: sync flush, then drop the trailing 00 00 ff ff
+        return (compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH))[:-4]
+
+    return compress
+
+
+def _raw(codec, frame: dict) -> bytes:
+    data = codec.encode(frame)
+    return data.encode() if isinstance(data, str) else data
+
+
+def measure(codec, kind: str, recipients: int, rounds: int):
+    """Average sizes and CPU over `rounds` distinct frames of one kind"""
+    frames = [sample_frames()[kind] for _ in range(rounds)]
+
+    started = time.perf_counter()
+    raws = [_raw(codec, frame) for frame in frames]
+    encode_us = (time.perf_counter() - started) / rounds * 1e6
+
+    # Steady state: each socket's compressor has already seen a few frames
+    streams = [deflate_stream() for _ in range(recipients)]
+    for compress in streams:
+        for _ in range(3):
+            compress(_raw(codec, sample_frames()[kind]))
+    deflated_bytes = 0
+    started = time.perf_counter()
+    for raw in raws:
+        for compress in streams:
+            deflated = compress(raw)
+        deflated_bytes += len(deflated)
+    deflate_us = (time.perf_counter() - started) / rounds * 1e6
+
+    raw_bytes = sum(len(raw) for raw in raws) / rounds
+    return raw_bytes, deflated_bytes / rounds, encode_us, encode_us + deflate_us
+
+
+def report(args):
+    codecs = [JsonCodec] + ([MsgpackCodec] if msgpack is not None else [])
+    if msgpack is None:
+        print("msgpack is not installed - MessagePack rows skipped (pip install msgpack)")
+    print(f"broadcast to {args.recipients} sockets, {args.rounds} rounds\n")
+    print(f"{'frame':<18} {'codec':<8} {'bytes':>6} {'deflated':>9} {'cpu plain':>11} {'cpu deflate':>12}")
+    for name in sample_frames():
+        for codec in codecs:
+            raw, deflated, plain_us, deflate_us = measure(codec, name, args.recipients, args.rounds)
+            print(
+                f"{name:<18} {codec.name:<8} {raw:6.0f} {deflated:9.0f} "
+                f"{plain_us:9.1f}us {deflate_us / 1000:10.2f}ms"
+            )
+
+
+# ---------------------------------------------------------------------------
+# End-to-end negotiation against a real server
+# ---------------------------------------------------------------------------
+
+async def check_negotiation():
+    import uvicorn
+    import websockets
+    from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+
+    from app.services.connection_manager import ConnectionManager
+
+    manager = ConnectionManager()
+    app = FastAPI()
+
+    @app.websocket("/ws/{user_id}")
+    async def endpoint(websocket: WebSocket, user_id: str):
+        connection = await manager.connect(user_id, websocket)
+        try:
+            while True:
+                data = await connection.receive()
+                await manager.send_personal_message({"type": "echo", "data": data}, user_id)
+        except WebSocketDisconnect:
+            await manager.disconnect(user_id, websocket)
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    serve = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    try:
+        # Without msgpack installed the offer must fall back to JSON
+        for subprotocols in (None, [MSGPACK_SUBPROTOCOL]):
+            async with websockets.connect(f"ws://127.0.0.1:{port}/ws/u1", subprotocols=subprotocols) as ws:
+                extensions = ws.response.headers.get("Sec-WebSocket-Extensions", "")
+                codec = MsgpackCodec if ws.subprotocol == MSGPACK_SUBPROTOCOL else JsonCodec
+                await ws.send(codec.encode({"action": "ping"}))
+                reply = await ws.recv()
+                reply = msgpack.unpackb(reply) if codec is MsgpackCodec else json.loads(reply)
+                assert reply == {"type": "echo", "data": {"action": "ping"}}, reply
+                print(f"✅ offered {subprotocols}: codec={codec.name} extensions={extensions!r}")
+    finally:
+        server.should_exit = True
+        await serve
+
+
+def main(args):
+    report(args)
+    print()
+    asyncio.run(check_negotiation())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipients", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=50)
+    main(parser.parse_args())
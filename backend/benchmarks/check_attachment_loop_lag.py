@@ -0,0 +1,148 @@
+"""
+Check: sending group messages with attachments does not stall the event loop
+
+--messages messages with an attachment_id are sent into a group of
+--members subscribed members, --concurrency at a time, against the Supabase
+stand-in with --latency-ms per request. Each one goes through the same
+steps as the send_group_message WebSocket action after the message insert:
+ChatGroupService.link_attachment, then the group broadcast. Verifies that
+  - every attachment is linked to its message and comes back with its
+    public URL and uploader name
+  - linking costs one Supabase request per attachment once the uploader's
+    profile is cached
+  - event-loop lag stays under --max-lag-ms the whole time
+
+Run from backend/:
+    python -m benchmarks.check_attachment_loop_lag --messages 500
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+import uuid
+
+from benchmarks.common import NullSocket
+from benchmarks.supabase_standin import SupabaseStandIn, run_standin
+
+GROUP_ID = str(uuid.uuid4())
+
+
+def seed_tables(args) -> dict:
+    uploaders = [str(uuid.uuid4()) for _ in range(args.uploaders)]
+    profiles = [{"id": u, "username": f"user{i}"} for i, u in enumerate(uploaders)]
+    attachments = [
+        {
+            "id": str(uuid.uuid4()),
+            "group_id": GROUP_ID,
+            "message_id": None,
+            "uploader_id": uploaders[i % len(uploaders)],
+            "file_name": f"notes{i}.pdf",
+            "file_path": f"{GROUP_ID}/notes{i}.pdf",
+            "file_type": "application/pdf",
+            "file_size": 1024,
+        }
+        for i in range(args.messages)
+    ]
+    return {"profiles": profiles, "group_attachments": attachments}
+
+
+async def run(args, tables):
+    from app.core.metrics import LoopLagMonitor
+    from app.core.profile_loader import ProfileLoader
+    from app.core.supabase import close_supabase, http_client, supabase
+    from app.services.chatgroupservices import ChatGroupService
+    from app.services.connection_manager import ConnectionManager
+    from app.services.resume_service import new_group_message_event
+
+    requests = {"count": 0}
+
+    async def count_request(request):
+        requests["count"] += 1
+
+    http_client.event_hooks["request"].append(count_request)
+
+    manager = ConnectionManager()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for index in range(args.members):
+            member = f"member-{index}"
+            await manager.connect(member, NullSocket())
+            await manager.subscribe_to_group(member, GROUP_ID)
+
+    attachments = tables["group_attachments"]
+    # Warm the profile cache the way earlier messages from these users would
+    await ProfileLoader().load_many(row["uploader_id"] for row in attachments)
+
+    linked = {}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def send(row):
+        async with semaphore:
+            message = {"id": str(uuid.uuid4()), "group_id": GROUP_ID, "sender_id": row["uploader_id"], "content": ""}
+            attachment = await ChatGroupService.link_attachment(row["id"], message["id"], GROUP_ID, row["uploader_id"])
+            if attachment:
+                message["attachment"] = attachment
+            linked[row["id"]] = (message["id"], attachment)
+            await manager.send_group_message(new_group_message_event(message), GROUP_ID)
+
+    monitor = LoopLagMonitor(interval=args.lag_interval_ms / 1000, samples=100000)
+    await monitor.start()
+    requests["count"] = 0
+    started = time.perf_counter()
+    await asyncio.gather(*(send(row) for row in attachments))
+    elapsed = time.perf_counter() - started
+    await asyncio.sleep(args.lag_interval_ms / 1000 * 2)
+    await monitor.close()
+    # The stand-in runs in its own process, so read the linked rows back
+    stored = await supabase.table("group_attachments").select("id, message_id").eq("group_id", GROUP_ID).execute()
+    message_ids = {row["id"]: row["message_id"] for row in stored.data or []}
+    await close_supabase()
+
+    lag = monitor.summary()
+    print(f"{args.messages} attachments, {args.concurrency} in flight, stand-in latency {args.latency_ms}ms, "
+          f"{args.members} members")
+    print(f"  {elapsed * 1000:.1f}ms total, {requests['count'] / args.messages:.2f} Supabase requests/attachment")
+    print(f"  event-loop lag: p50={lag['p50_ms']:.1f}ms p99={lag['p99_ms']:.1f}ms max={lag['max_ms']:.1f}ms "
+          f"({lag['samples']} samples)")
+
+    failures = []
+    for attachment_id, (message_id, attachment) in linked.items():
+        if attachment is None:
+            failures.append(f"{attachment_id}: not linked")
+        elif message_ids.get(attachment_id) != message_id:
+            failures.append(f"{attachment_id}: message_id not updated")
+        elif not attachment.get("file_url") or not attachment.get("uploader_username"):
+            failures.append(f"{attachment_id}: missing file_url or uploader_username")
+    if requests["count"] > args.messages:
+        failures.append(f"{requests['count']} Supabase requests for {args.messages} attachments")
+    if lag["max_ms"] > args.max_lag_ms:
+        failures.append(f"event-loop lag {lag['max_ms']:.1f}ms exceeds {args.max_lag_ms}ms")
+
+    for failure in failures[:10]:
+        print(f"FAIL {failure}")
+    return not failures
+
+
+def main(args):
+    tables = seed_tables(args)
+    standin = SupabaseStandIn(latency=args.latency_ms / 1000, tables=tables)
+    os.environ["SUPABASE_URL"] = run_standin(standin)
+    os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "standin-service-role-key")
+    ok = asyncio.run(run(args, tables))
+    print("OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--uploaders", type=int, default=20)
+    parser.add_argument("--members", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--lag-interval-ms", type=float, default=10.0)
+    parser.add_argument("--max-lag-ms", type=float, default=50.0)
+    main(parser.parse_args())
@@ -0,0 +1,131 @@
+"""
+Check: real-time delivery across two uvicorn workers through the broker
+
+Starts the local broker hub, two uvicorn workers that each run their own
+ConnectionManager with the redis broker, then connects one client to each
+worker and verifies that group and direct frames cross between them.
+
+Run from backend/:
+    python -m benchmarks.check_cross_worker_delivery
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+
+from app.services.connection_manager import ConnectionManager
+from benchmarks.common import free_port, wait_for_port
+
+# ---------------------------------------------------------------------------
+# Worker app: the chat socket's routing actions without the database calls
+# ---------------------------------------------------------------------------
+
+manager = ConnectionManager()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await manager.start()
+    yield
+    await manager.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.websocket("/ws/{user_id}")
+async def worker_socket(websocket: WebSocket, user_id: str):
+    await manager.connect(user_id, websocket)
+    try:
+        while True:
+            data = await websocket.receive_json()
+            action = data.get("action")
+            if action == "join_group":
+                await manager.subscribe_to_group(user_id, data["group_id"])
+                await manager.send_personal_message({"type": "group_joined", "group_id": data["group_id"]}, user_id)
+            elif action == "send_group_message":
+                await manager.send_group_message(
+                    {"type": "new_group_message", "sender_id": user_id, "content": data["content"]},
+                    data["group_id"],
+                )
+            elif action == "send_message":
+                await manager.send_personal_message(
+                    {"type": "new_message", "sender_id": user_id, "content": data["content"]},
+                    data["to"],
+                )
+    except WebSocketDisconnect:
+        await manager.disconnect(user_id, websocket)
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+async def _expect(ws, frame_type: str, timeout: float = 5) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise AssertionError(f"no {frame_type} frame received")
+        frame = json.loads(await asyncio.wait_for(ws.recv(), remaining))
+        if frame.get("type") == frame_type:
+            return frame
+
+
+async def drive(port_a: int, port_b: int):
+    import websockets
+
+    async with websockets.connect(f"ws://127.0.0.1:{port_a}/ws/alice") as alice, \
+            websockets.connect(f"ws://127.0.0.1:{port_b}/ws/bob") as bob:
+        for ws in (alice, bob):
+            await ws.send(json.dumps({"action": "join_group", "group_id": "g1"}))
+            await _expect(ws, "group_joined")
+
+        await alice.send(json.dumps({"action": "send_group_message", "group_id": "g1", "content": "hi from A"}))
+        frame = await _expect(bob, "new_group_message")
+        assert frame["content"] == "hi from A", frame
+        print("✅ group message worker A -> worker B")
+
+        await bob.send(json.dumps({"action": "send_message", "to": "alice", "content": "hi from B"}))
+        frame = await _expect(alice, "new_message")
+        assert frame["content"] == "hi from B", frame
+        print("✅ direct message worker B -> worker A")
+
+
+def main():
+    socket_path = os.path.join(tempfile.mkdtemp(), "broker.sock")
+    env = dict(os.environ, REALTIME_BROKER="redis", REALTIME_BROKER_URL=f"unix://{socket_path}")
+    processes = [subprocess.Popen([sys.executable, "-m", "app.services.broker_hub", "--unix", socket_path], env=env)]
+    try:
+        deadline = time.monotonic() + 10
+        while not os.path.exists(socket_path) and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        ports = [free_port(), free_port()]
+        for port in ports:
+            processes.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "benchmarks.check_cross_worker_delivery:app",
+                 "--port", str(port), "--log-level", "warning"],
+                env=env,
+            ))
+        for port, process in zip(ports, processes[1:]):
+            wait_for_port(port, process)
+
+        asyncio.run(drive(*ports))
+        print("cross-worker delivery OK")
+    finally:
+        # Workers first, so they do not log reconnect attempts to the hub
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
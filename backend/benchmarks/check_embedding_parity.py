@@ -0,0 +1,84 @@
+"""
+Check: the ONNX int8 embedding backend agrees with the PyTorch model
+
+Encodes --sentences sentences (chat-style messages, questions and
+assignment text) with both backends and fails if
+  - the mean cosine similarity between a sentence's two embeddings is
+    below --min-mean, or any single one is below --min-cosine
+  - the top-5 neighbours of each sentence (what search_similar returns)
+    overlap less than --min-overlap between the backends
+
+Needs sentence-transformers[onnx]. Run from backend/:
+    python -m benchmarks.check_embedding_parity
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import statistics
+import sys
+
+import numpy as np
+
+SUBJECTS = ["the integral", "question 3", "the essay draft", "my recursion", "the lab report", "this proof"]
+VERBS = ["is due", "does not compile", "needs a citation", "looks right", "confuses me", "was graded"]
+TAILS = ["before Friday", "in chapter 4", "for the group project", "after the lecture", "again", "?"]
+
+
+def make_sentences(count: int):
+    rng = random.Random(5)
+    return [f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(TAILS)}" for _ in range(count)]
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def top_k(vectors, k: int):
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, -np.inf)
+    return [set(row) for row in np.argsort(-similarity, axis=1)[:, :k]]
+
+
+def main(args):
+    from app.core import ai_memory
+
+    sentences = make_sentences(args.sentences)
+    with contextlib.redirect_stdout(io.StringIO()):
+        reference = normalize(ai_memory.load_embedding_model("torch").encode(sentences))
+        quantized_model = ai_memory.load_embedding_model("onnx-int8")
+    if ai_memory._model_backend != "onnx-int8":
+        raise SystemExit("ONNX int8 backend did not load (is sentence-transformers[onnx] installed?)")
+    quantized = normalize(quantized_model.encode(sentences))
+
+    cosines = np.sum(reference * quantized, axis=1)
+    overlaps = [len(a & b) / 5 for a, b in zip(top_k(reference, 5), top_k(quantized, 5))]
+    mean_overlap = statistics.mean(overlaps)
+    print(f"{len(sentences)} sentences, dim {quantized.shape[1]}")
+    print(f"  cosine(torch, onnx-int8): mean {cosines.mean():.4f}  min {cosines.min():.4f}")
+    print(f"  top-5 neighbour overlap:  mean {mean_overlap:.3f}")
+
+    failures = []
+    if quantized.shape[1] != 384:
+        failures.append(f"embedding dimension {quantized.shape[1]} != 384")
+    if cosines.mean() < args.min_mean:
+        failures.append(f"mean cosine {cosines.mean():.4f} < {args.min_mean}")
+    if cosines.min() < args.min_cosine:
+        failures.append(f"min cosine {cosines.min():.4f} < {args.min_cosine}")
+    if mean_overlap < args.min_overlap:
+        failures.append(f"top-5 overlap {mean_overlap:.3f} < {args.min_overlap}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print("OK" if not failures else "FAILED")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=500)
+    parser.add_argument("--min-mean", type=float, default=0.99)
+    parser.add_argument("--min-cosine", type=float, default=0.95)
+    parser.add_argument("--min-overlap", type=float, default=0.8)
+    main(parser.parse_args())
@@ -0,0 +1,66 @@
+"""
+Check: cold import of the app stays within budget
+
+Imports app.main in --runs fresh interpreters (what every worker and every
+reload=True restart does before it can serve /) and fails if the median
+import takes longer than --budget-s, or if a heavy module that should only
+load on first use (the embedding model stack, LanceDB) was imported.
+
+Run from backend/:
+    python -m benchmarks.check_import_time --budget-s 3
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Loaded lazily by app.core.ai_memory; importing any of them at startup is a regression
+LAZY_MODULES = ("sentence_transformers", "torch", "transformers", "lancedb", "onnxruntime")
+
+PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def measure() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "MEMORY_WARMUP": "false"},
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"importing app.main failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(args):
+    runs = [measure() for _ in range(args.runs)]
+    median = statistics.median(r["seconds"] for r in runs)
+    loaded = sorted({m for r in runs for m in r["loaded"]})
+    print(f"import app.main: median {median:.2f}s over {args.runs} runs "
+          f"(min {min(r['seconds'] for r in runs):.2f}s, budget {args.budget_s:.2f}s)")
+
+    failures = []
+    if median > args.budget_s:
+        failures.append(f"cold import {median:.2f}s is over the {args.budget_s:.2f}s budget")
+    if loaded:
+        failures.append(f"imported at startup instead of on first use: {', '.join(loaded)}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print("OK" if not failures else "FAILED")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-s", type=float, default=3.0)
+    parser.add_argument("--runs", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,58 @@
+"""
+Helpers shared by the benchmarks and checks: local ports and stand-in
+WebSockets for driving ConnectionManager without a network
+"""
+
+import json
+import socket
+import subprocess
+import time
+from typing import Optional
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, process: Optional[subprocess.Popen] = None, timeout: float = 15, interval: float = 0.1):
+    """Block until something accepts on the port; fail early if process exits"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(interval)
+    raise RuntimeError(f"nothing listening on port {port} after {timeout:.0f}s")
+
+
+class NullSocket:
+    """A WebSocket that accepts and discards every frame"""
+
+    scope = {}
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, text: str):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+class CountingSocket(NullSocket):
+    """Counts the frames written to it; keep=True also keeps them decoded"""
+
+    def __init__(self, keep: bool = False):
+        self.keep = keep
+        self.count = 0
+        self.frames = []
+
+    async def send_text(self, text: str):
+        self.count += 1
+        if self.keep:
+            self.frames.append(json.loads(text))
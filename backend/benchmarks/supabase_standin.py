@@ -0,0 +1,257 @@
+"""
+Local Supabase stand-in for benchmarks
+Serves a small in-memory subset of the PostgREST, storage and auth HTTP APIs
+so the backend can be exercised without a real Supabase project.
+"""
+
+import asyncio
+import json
+import multiprocessing
+import uuid
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from benchmarks.common import free_port, wait_for_port
+
+FILTER_OPS = ("eq", "neq", "gt", "gte", "lt", "lte", "in", "is")
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+# Tables whose inserts get a per-stream seq, like the triggers in
+# migrations/010_message_sequences.sql: table -> stream column
+SEQUENCED_TABLES = {"group_messeges": "group_id", "messages": "conversation_id"}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _parse_value(raw: str):
+    if raw.startswith('"') and raw.endswith('"'):
+        return raw[1:-1]
+    return raw
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Split on commas that are not nested inside parentheses"""
+    parts, depth, current = [], 0, ""
+    for ch in text:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0:
+            parts.append(current)
+            current = ""
+        else:
+            current += ch
+    if current:
+        parts.append(current)
+    return parts
+
+
+@lru_cache(maxsize=256)
+def _in_options(raw: str) -> frozenset:
+    # Parsed once per query rather than once per row
+    return frozenset(_parse_value(v) for v in _split_top_level(raw.strip("()")))
+
+
+def _matches(row: Dict, column: str, op: str, raw: str) -> bool:
+    value = row.get(column)
+    if op == "is":
+        return value is None if raw == "null" else str(value).lower() == raw
+    if op == "in":
+        return str(value) in _in_options(raw)
+    if value is None:
+        return False
+    target = _parse_value(raw)
+    if op == "eq":
+        return str(value) == target
+    if op == "neq":
+        return str(value) != target
+    # Numeric columns (e.g. seq) compare as numbers, everything else as text
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        target = float(target)
+    else:
+        value = str(value)
+    if op == "gt":
+        return value > target
+    if op == "gte":
+        return value >= target
+    if op == "lt":
+        return value < target
+    if op == "lte":
+        return value <= target
+    return True
+
+
+def _sort_key(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value, "")
+    return (1, 0, str(value or ""))
+
+
+@lru_cache(maxsize=256)
+def _parse_condition(condition: str) -> tuple:
+    return tuple(condition.split(".", 2))
+
+
+def _matches_condition(row: Dict, condition: str) -> bool:
+    """Evaluate one `column.op.value` or nested and()/or() condition"""
+    if condition.startswith("and(") or condition.startswith("or("):
+        combinator, inner = condition.split("(", 1)
+        results = [_matches_condition(row, c) for c in _split_top_level(inner[:-1])]
+        return all(results) if combinator == "and" else any(results)
+    return _matches(row, *_parse_condition(condition))
+
+
+def _project(row: Dict, select: Optional[str]) -> Dict:
+    if not select or select == "*":
+        return dict(row)
+    projected = {}
+    for column in _split_top_level(select):
+        column = column.strip()
+        if "(" in column or column == "*":
+            continue
+        if column in row:
+            projected[column] = row[column]
+    return projected
+
+
+class SupabaseStandIn:
+    """In-memory tables plus the HTTP routes that serve them"""
+
+    def __init__(self, latency: float = 0.0, tables: Optional[Dict[str, List[Dict]]] = None):
+        self.latency = latency
+        self.tables: Dict[str, List[Dict]] = {k: list(v) for k, v in (tables or {}).items()}
+        self.request_count = 0
+        self.sequences: Dict[tuple, int] = {}
+        self.app = Starlette(routes=[
+            Route("/rest/v1/rpc/{function}", self.rpc, methods=["POST"]),
+            Route("/rest/v1/{table}", self.rest, methods=["GET", "POST", "PATCH", "DELETE"]),
+            Route("/auth/v1/user", self.auth_user, methods=["GET"]),
+            Route("/storage/v1/object/sign/{path:path}", self.storage_sign, methods=["POST"]),
+            Route("/storage/v1/object/{path:path}", self.storage_object, methods=["POST", "PUT", "DELETE"]),
+        ])
+        self.rpc_handlers = {}
+
+    async def _delay(self):
+        self.request_count += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _filter(self, rows: List[Dict], request: Request) -> List[Dict]:
+        for key, raw in request.query_params.multi_items():
+            if key in RESERVED_PARAMS:
+                continue
+            if key in ("or", "and"):
+                conditions = _split_top_level(raw.strip("()"))
+                combine = any if key == "or" else all
+                rows = [r for r in rows if combine(_matches_condition(r, c) for c in conditions)]
+                continue
+            op, _, value = raw.partition(".")
+            if op not in FILTER_OPS:
+                continue
+            rows = [r for r in rows if _matches(r, key, op, value)]
+        return rows
+
+    async def rest(self, request: Request) -> Response:
+        await self._delay()
+        table = self.tables.setdefault(request.path_params["table"], [])
+        prefer = request.headers.get("prefer", "")
+
+        if request.method == "POST":
+            payload = json.loads(await request.body() or b"[]")
+            records = payload if isinstance(payload, list) else [payload]
+            inserted = []
+            stream_column = SEQUENCED_TABLES.get(request.path_params["table"])
+            for record in records:
+                row = {"id": str(uuid.uuid4()), "created_at": _now(), **record}
+                if stream_column:
+                    key = (request.path_params["table"], row.get(stream_column))
+                    self.sequences[key] = row["seq"] = self.sequences.get(key, 0) + 1
+                table.append(row)
+                inserted.append(row)
+            return JSONResponse(inserted, status_code=201)
+
+        rows = self._filter(table, request)
+
+        if request.method == "PATCH":
+            changes = json.loads(await request.body() or b"{}")
+            for row in rows:
+                row.update(changes)
+            return JSONResponse([_project(r, request.query_params.get("select")) for r in rows])
+
+        if request.method == "DELETE":
+            doomed = {id(r) for r in rows}
+            table[:] = [r for r in table if id(r) not in doomed]
+            return JSONResponse(rows)
+
+        total = len(rows)
+        order = request.query_params.get("order")
+        if order:
+            for clause in reversed(order.split(",")):
+                column, _, direction = clause.partition(".")
+                rows = sorted(rows, key=lambda r: _sort_key(r.get(column)), reverse=direction.startswith("desc"))
+        offset = int(request.query_params.get("offset", 0))
+        limit = request.query_params.get("limit")
+        rows = rows[offset:offset + int(limit)] if limit else rows[offset:]
+
+        headers = {}
+        if "count=" in prefer:
+            end = offset + len(rows) - 1 if rows else 0
+            headers["content-range"] = f"{offset}-{end}/{total}"
+        select = request.query_params.get("select")
+        return JSONResponse([_project(r, select) for r in rows], headers=headers)
+
+    async def rpc(self, request: Request) -> Response:
+        await self._delay()
+        params = json.loads(await request.body() or b"{}")
+        handler = self.rpc_handlers.get(request.path_params["function"])
+        if handler is None:
+            return JSONResponse({"message": "function not found"}, status_code=404)
+        return JSONResponse(handler(self, params))
+
+    async def auth_user(self, request: Request) -> Response:
+        await self._delay()
+        token = request.headers.get("authorization", "").replace("Bearer ", "")
+        return JSONResponse({
+            "id": token or str(uuid.uuid4()),
+            "aud": "authenticated",
+            "role": "authenticated",
+            "app_metadata": {},
+            "user_metadata": {},
+            "created_at": _now(),
+        })
+
+    async def storage_sign(self, request: Request) -> Response:
+        await self._delay()
+        return JSONResponse({"signedURL": f"/object/sign/{request.path_params['path']}?token=standin"})
+
+    async def storage_object(self, request: Request) -> Response:
+        await self._delay()
+        return JSONResponse({"Key": request.path_params["path"]})
+
+
+def _serve(standin: SupabaseStandIn, port: int):
+    uvicorn.run(standin.app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+def run_standin(standin: SupabaseStandIn, port: Optional[int] = None) -> str:
+    """
+    Serve the stand-in from a separate process and return its base URL
+
+    Running out of process keeps the stand-in's CPU off the interpreter that
+    is being measured.
+    """
+    port = port or free_port()
+    process = multiprocessing.get_context("fork").Process(target=_serve, args=(standin, port), daemon=True)
+    process.start()
+    wait_for_port(port, timeout=10, interval=0.05)
+    return f"http://127.0.0.1:{port}"
@@ -0,0 +1,68 @@
+-- Migration: Aggregated conversation inbox
+-- Returns every conversation of a user with the other participant, the last
+-- message and the unread count in a single call, replacing the three
+-- queries per conversation ChatService.get_user_conversations used to run.
+
+-- ============================================================
+-- 1. INDEXES
+-- ============================================================
+
+-- Conversations a user takes part in
+CREATE INDEX IF NOT EXISTS idx_conversations_participant1 ON conversations(participant1_id, updated_at DESC);
+CREATE INDEX IF NOT EXISTS idx_conversations_participant2 ON conversations(participant2_id, updated_at DESC);
+
+-- Last message per conversation
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_created ON messages(conversation_id, created_at DESC);
+
+-- Unread messages per conversation and sender
+CREATE INDEX IF NOT EXISTS idx_messages_unread
+ON messages(conversation_id, sender_id)
+WHERE read_at IS NULL;
+
+-- ============================================================
+-- 2. INBOX FUNCTION
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION get_user_inbox(p_user_id UUID)
+RETURNS TABLE (
+    id UUID,
+    created_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE,
+    participant_id UUID,
+    participant_username TEXT,
+    last_message JSONB,
+    unread_count BIGINT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        c.id,
+        c.created_at,
+        c.updated_at,
+        p.id,
+        p.username,
+        lm.message,
+        COALESCE(unread.total, 0)
+    FROM conversations c
+    JOIN profiles p
+        ON p.id = CASE WHEN c.participant1_id = p_user_id THEN c.participant2_id ELSE c.participant1_id END
+    LEFT JOIN LATERAL (
+        SELECT to_jsonb(m.*) AS message
+        FROM messages m
+        WHERE m.conversation_id = c.id
+        ORDER BY m.created_at DESC
+        LIMIT 1
+    ) lm ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT COUNT(*) AS total
+        FROM messages m
+        WHERE m.conversation_id = c.id
+          AND m.sender_id = p.id
+          AND m.read_at IS NULL
+    ) unread ON TRUE
+    WHERE c.participant1_id = p_user_id OR c.participant2_id = p_user_id
+    ORDER BY c.updated_at DESC;
+$$;
+
+GRANT EXECUTE ON FUNCTION get_user_inbox(UUID) TO authenticated, service_role;
@@ -0,0 +1,9 @@
+-- Migration: Indexes for keyset (cursor) pagination of message history
+-- Pages are ordered by (created_at, id) so a cursor can resume exactly where
+-- the previous page ended, even when several messages share a timestamp.
+
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_keyset
+ON messages(conversation_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_group_messeges_group_keyset
+ON group_messeges(group_id, created_at DESC, id DESC);
@@ -0,0 +1,173 @@
+-- Migration: Conversation summary read-model
+-- One row per (conversation, participant) holding the last message and that
+-- participant's unread count. ChatService keeps it current on every write
+-- through the summary_* functions below, so the inbox no longer aggregates
+-- over messages.
+
+-- ============================================================
+-- 1. TABLE
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS conversation_summaries (
+    conversation_id UUID NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+    user_id UUID NOT NULL,
+    other_user_id UUID NOT NULL,
+    last_message JSONB,
+    last_message_at TIMESTAMP WITH TIME ZONE,
+    unread_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (conversation_id, user_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_conversation_summaries_user ON conversation_summaries(user_id);
+
+ALTER TABLE conversation_summaries ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view own conversation summaries"
+    ON conversation_summaries FOR SELECT
+    USING (auth.uid() = user_id);
+
+-- ============================================================
+-- 2. INCREMENTAL UPDATES
+-- ============================================================
+
+-- A new message: update both participants' last message and bump the
+-- recipient's unread count. Returns the recipient's new unread count.
+CREATE OR REPLACE FUNCTION summary_apply_message(p_message JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_conversation_id UUID := (p_message->>'conversation_id')::UUID;
+    v_sender_id UUID := (p_message->>'sender_id')::UUID;
+    v_created_at TIMESTAMP WITH TIME ZONE := (p_message->>'created_at')::TIMESTAMP WITH TIME ZONE;
+    v_recipient_id UUID;
+    v_unread INTEGER;
+BEGIN
+    SELECT CASE WHEN participant1_id = v_sender_id THEN participant2_id ELSE participant1_id END
+    INTO v_recipient_id
+    FROM conversations
+    WHERE id = v_conversation_id;
+
+    IF v_recipient_id IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO conversation_summaries AS s
+        (conversation_id, user_id, other_user_id, last_message, last_message_at, unread_count)
+    VALUES (v_conversation_id, v_sender_id, v_recipient_id, p_message, v_created_at, 0)
+    ON CONFLICT (conversation_id, user_id) DO UPDATE SET
+        last_message = CASE
+            WHEN s.last_message_at IS NULL OR s.last_message_at <= EXCLUDED.last_message_at
+            THEN EXCLUDED.last_message ELSE s.last_message END,
+        last_message_at = GREATEST(s.last_message_at, EXCLUDED.last_message_at),
+        updated_at = NOW();
+
+    INSERT INTO conversation_summaries AS s
+        (conversation_id, user_id, other_user_id, last_message, last_message_at, unread_count)
+    VALUES (v_conversation_id, v_recipient_id, v_sender_id, p_message, v_created_at, 1)
+    ON CONFLICT (conversation_id, user_id) DO UPDATE SET
+        unread_count = s.unread_count + 1,
+        last_message = CASE
+            WHEN s.last_message_at IS NULL OR s.last_message_at <= EXCLUDED.last_message_at
+            THEN EXCLUDED.last_message ELSE s.last_message END,
+        last_message_at = GREATEST(s.last_message_at, EXCLUDED.last_message_at),
+        updated_at = NOW()
+    RETURNING unread_count INTO v_unread;
+
+    RETURN v_unread;
+END;
+$$;
+
+-- The user read the conversation
+CREATE OR REPLACE FUNCTION summary_mark_read(p_conversation_id UUID, p_user_id UUID)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    UPDATE conversation_summaries
+    SET unread_count = 0, updated_at = NOW()
+    WHERE conversation_id = p_conversation_id AND user_id = p_user_id;
+$$;
+
+-- Recompute from messages after an edit or delete (NULL = every conversation)
+CREATE OR REPLACE FUNCTION summary_refresh(p_conversation_id UUID DEFAULT NULL)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    INSERT INTO conversation_summaries
+        (conversation_id, user_id, other_user_id, last_message, last_message_at, unread_count)
+    SELECT
+        c.id,
+        x.user_id,
+        x.other_user_id,
+        lm.message,
+        lm.created_at,
+        (
+            SELECT COUNT(*)
+            FROM messages m
+            WHERE m.conversation_id = c.id
+              AND m.sender_id = x.other_user_id
+              AND m.read_at IS NULL
+        )
+    FROM conversations c
+    CROSS JOIN LATERAL (
+        VALUES (c.participant1_id, c.participant2_id), (c.participant2_id, c.participant1_id)
+    ) AS x(user_id, other_user_id)
+    LEFT JOIN LATERAL (
+        SELECT to_jsonb(m.*) AS message, m.created_at
+        FROM messages m
+        WHERE m.conversation_id = c.id
+        ORDER BY m.created_at DESC, m.id DESC
+        LIMIT 1
+    ) lm ON TRUE
+    WHERE p_conversation_id IS NULL OR c.id = p_conversation_id
+    ON CONFLICT (conversation_id, user_id) DO UPDATE SET
+        last_message = EXCLUDED.last_message,
+        last_message_at = EXCLUDED.last_message_at,
+        unread_count = EXCLUDED.unread_count,
+        updated_at = NOW();
+$$;
+
+-- ============================================================
+-- 3. INBOX READS THE SUMMARIES
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION get_user_inbox(p_user_id UUID)
+RETURNS TABLE (
+    id UUID,
+    created_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE,
+    participant_id UUID,
+    participant_username TEXT,
+    last_message JSONB,
+    unread_count BIGINT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        c.id,
+        c.created_at,
+        c.updated_at,
+        p.id,
+        p.username,
+        s.last_message,
+        COALESCE(s.unread_count, 0)::BIGINT
+    FROM conversations c
+    JOIN profiles p
+        ON p.id = CASE WHEN c.participant1_id = p_user_id THEN c.participant2_id ELSE c.participant1_id END
+    LEFT JOIN conversation_summaries s
+        ON s.conversation_id = c.id AND s.user_id = p_user_id
+    WHERE c.participant1_id = p_user_id OR c.participant2_id = p_user_id
+    ORDER BY c.updated_at DESC;
+$$;
+
+GRANT EXECUTE ON FUNCTION summary_apply_message(JSONB) TO service_role;
+GRANT EXECUTE ON FUNCTION summary_mark_read(UUID, UUID) TO service_role;
+GRANT EXECUTE ON FUNCTION summary_refresh(UUID) TO service_role;
+
+-- ============================================================
+-- 4. BACKFILL
+-- ============================================================
+
+SELECT summary_refresh(NULL);
@@ -0,0 +1,110 @@
+-- Migration: Per-group and per-conversation message sequence numbers
+-- Every new message gets seq = previous seq in its group / conversation + 1,
+-- assigned inside the INSERT so it is gap-free per stream and identical on
+-- every worker. Reconnecting WebSocket clients send the last seq they saw
+-- and receive only the messages after it.
+
+-- ============================================================
+-- 1. COLUMNS AND COUNTERS
+-- ============================================================
+
+ALTER TABLE group_messeges ADD COLUMN IF NOT EXISTS seq BIGINT;
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS seq BIGINT;
+
+-- Last assigned seq per stream; the row lock serializes concurrent inserts
+-- into the same group or conversation only
+CREATE TABLE IF NOT EXISTS message_sequences (
+    stream_type TEXT NOT NULL,
+    stream_id UUID NOT NULL,
+    last_seq BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (stream_type, stream_id)
+);
+
+ALTER TABLE message_sequences ENABLE ROW LEVEL SECURITY;
+
+-- ============================================================
+-- 2. ASSIGNMENT TRIGGERS
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION next_message_seq(p_stream_type TEXT, p_stream_id UUID)
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_seq BIGINT;
+BEGIN
+    INSERT INTO message_sequences AS s (stream_type, stream_id, last_seq)
+    VALUES (p_stream_type, p_stream_id, 1)
+    ON CONFLICT (stream_type, stream_id) DO UPDATE SET last_seq = s.last_seq + 1
+    RETURNING last_seq INTO v_seq;
+    RETURN v_seq;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION assign_group_message_seq()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.seq := next_message_seq('group', NEW.group_id);
+    RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION assign_message_seq()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.seq := next_message_seq('conversation', NEW.conversation_id);
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_group_messeges_seq ON group_messeges;
+CREATE TRIGGER trg_group_messeges_seq
+    BEFORE INSERT ON group_messeges
+    FOR EACH ROW EXECUTE FUNCTION assign_group_message_seq();
+
+DROP TRIGGER IF EXISTS trg_messages_seq ON messages;
+CREATE TRIGGER trg_messages_seq
+    BEFORE INSERT ON messages
+    FOR EACH ROW EXECUTE FUNCTION assign_message_seq();
+
+-- ============================================================
+-- 3. BACKFILL
+-- ============================================================
+
+UPDATE group_messeges g
+SET seq = numbered.seq
+FROM (
+    SELECT id, ROW_NUMBER() OVER (PARTITION BY group_id ORDER BY created_at, id) AS seq
+    FROM group_messeges
+) numbered
+WHERE g.id = numbered.id AND g.seq IS NULL;
+
+UPDATE messages m
+SET seq = numbered.seq
+FROM (
+    SELECT id, ROW_NUMBER() OVER (PARTITION BY conversation_id ORDER BY created_at, id) AS seq
+    FROM messages
+) numbered
+WHERE m.id = numbered.id AND m.seq IS NULL;
+
+INSERT INTO message_sequences (stream_type, stream_id, last_seq)
+SELECT 'group', group_id, MAX(seq) FROM group_messeges GROUP BY group_id
+ON CONFLICT (stream_type, stream_id) DO UPDATE SET last_seq = EXCLUDED.last_seq;
+
+INSERT INTO message_sequences (stream_type, stream_id, last_seq)
+SELECT 'conversation', conversation_id, MAX(seq) FROM messages GROUP BY conversation_id
+ON CONFLICT (stream_type, stream_id) DO UPDATE SET last_seq = EXCLUDED.last_seq;
+
+-- ============================================================
+-- 4. INDEXES (resume: WHERE stream = ? AND seq > ? ORDER BY seq)
+-- ============================================================
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_group_messeges_group_seq
+ON group_messeges(group_id, seq);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_messages_conversation_seq
+ON messages(conversation_id, seq);
@@ -1,5 +1,7 @@
 import uvicorn
 
+from app.core.config import WS_PER_MESSAGE_DEFLATE
+
 if __name__ == "__main__":
     print("🚀 Starting Unified Hub Backend...")
     print("📍 API documentation: http://127.0.0.1:8000/docs")
@@ -9,5 +11,6 @@ if __name__ == "__main__":
         "app.main:app",
         host="127.0.0.1",
         port=8000,
-        reload=True
+        reload=True,
+        ws_per_message_deflate=WS_PER_MESSAGE_DEFLATE,
     )
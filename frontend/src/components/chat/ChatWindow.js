@@ -1,6 +1,7 @@
 import { useState, useEffect, useRef } from "react"
 import { useAuth } from "../../context/AuthContext"
 import { useTheme } from "../../context/ThemeContext"
+import { startHeartbeat } from "../../utils/presenceHeartbeat"
 import { saveConversationTitle, getConversationTitle } from "../../utils/localStorageUtils"
 
 export default function ChatWindow({ conversationId, friendName, onMessageSent }) {
@@ -18,6 +19,8 @@ export default function ChatWindow({ conversationId, friendName, onMessageSent }
     const [editContent, setEditContent] = useState("")
     const messagesEndRef = useRef(null)
     const wsRef = useRef(null)
+    // Highest conversation sequence seen, sent back on reconnect to get only the gap
+    const lastSeqRef = useRef(null)
 
     useEffect(() => {
         if (conversationId && user?.access_token) {
@@ -59,20 +62,53 @@ export default function ChatWindow({ conversationId, friendName, onMessageSent }
             `ws://localhost:8000/api/ws/chat/${user.access_token}`
         )
 
+        let stopHeartbeat = () => {}
+
         ws.onopen = () => {
             console.log("WebSocket connected")
             setConnected(true)
+            stopHeartbeat = startHeartbeat(ws)
+
+            // Reconnecting: ask only for the messages missed while offline
+            if (lastSeqRef.current !== null) {
+                ws.send(
+                    JSON.stringify({
+                        action: "resume",
+                        streams: { [`conversation:${conversationId}`]: lastSeqRef.current },
+                    })
+                )
+            }
         }
 
         ws.onmessage = (event) => {
-            const data = JSON.parse(event.data)
+            const frame = JSON.parse(event.data)
+            // The server may bundle a burst of events into one batch frame
+            const events = frame.type === "batch" ? frame.events : [frame]
+            events.forEach(handleSocketEvent)
+        }
+
+        const handleSocketEvent = (data) => {
             console.log("WebSocket message received:", data)
 
-            if (data.type === "message" && data.message.conversation_id === conversationId) {
-                setMessages((prev) => [...prev, data.message])
+            if ((data.type === "new_message" || data.type === "message") && data.message.conversation_id === conversationId) {
+                trackSeq(data.message.seq)
+                setMessages((prev) => {
+                    // A resume can replay a message we already have
+                    if (prev.some((m) => m.id === data.message.id)) {
+                        return prev
+                    }
+                    return [...prev, data.message]
+                })
                 if (onMessageSent) {
                     onMessageSent()
                 }
+            } else if (data.type === "resume_result" && data.stream === `conversation:${conversationId}`) {
+                if (data.has_more) {
+                    // Missed too much to replay - reload the latest page
+                    fetchMessages()
+                } else {
+                    data.events.forEach(handleSocketEvent)
+                }
             } else if (data.type === "message_deleted") {
                 setMessages((prev) => prev.filter(m => m.id !== data.message_id))
             } else if (data.type === "message_updated") {
@@ -90,6 +126,7 @@ export default function ChatWindow({ conversationId, friendName, onMessageSent }
         ws.onclose = () => {
             console.log("WebSocket disconnected")
             setConnected(false)
+            stopHeartbeat()
             // Attempt to reconnect after 3 seconds
             setTimeout(() => {
                 if (conversationId && user?.access_token) {
@@ -201,6 +238,12 @@ export default function ChatWindow({ conversationId, friendName, onMessageSent }
         }
     }
 
+    function trackSeq(seq) {
+        if (seq !== null && seq !== undefined && (lastSeqRef.current === null || seq > lastSeqRef.current)) {
+            lastSeqRef.current = seq
+        }
+    }
+
     async function fetchMessages(loadMore = false) {
         if (!conversationId || !user?.access_token) return
 
@@ -224,6 +267,8 @@ export default function ChatWindow({ conversationId, friendName, onMessageSent }
                     setMessages((prev) => [...data.messages, ...prev])
                 } else {
                     setMessages(data.messages)
+                    const seqs = data.messages.map((msg) => msg.seq).filter((seq) => seq != null)
+                    lastSeqRef.current = seqs.length ? Math.max(...seqs) : null
                 }
                 
                 setTotalCount(data.total_count)
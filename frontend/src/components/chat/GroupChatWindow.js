@@ -4,6 +4,7 @@ import { useTheme } from "../../context/ThemeContext"
 import GroupMembersModal from "./GroupMembersModal"
 import AttachmentDisplay, { FileUploadButton, FilePreview } from "./AttachmentDisplay"
 import GroupAIChatPanel from "./GroupAIChatPanel"
+import { startHeartbeat } from "../../utils/presenceHeartbeat"
 import { saveConversationTitle, getConversationTitle } from "../../utils/localStorageUtils"
 
 export default function GroupChatWindow({ groupId, groupName, onMessageSent, onGroupDeleted, onGroupUpdated, onGroupLeft }) {
@@ -34,8 +35,9 @@ export default function GroupChatWindow({ groupId, groupName, onMessageSent, onG
     const [editMessageContent, setEditMessageContent] = useState("")
     const messagesEndRef = useRef(null)
     const wsRef = useRef(null)
+    // Highest group sequence seen, sent back on reconnect to get only the gap
+    const lastSeqRef = useRef(null)
     const typingTimeoutRef = useRef(null)
-    const typingIndicatorTimeouts = useRef(new Map())
     const fileInputRef = useRef(null)
 
     useEffect(() => {
@@ -87,9 +89,12 @@ export default function GroupChatWindow({ groupId, groupName, onMessageSent, onG
                 `ws://localhost:8000/api/ws/chat/${user.access_token}`
             )
 
+            let stopHeartbeat = () => {}
+
             ws.onopen = () => {
                 console.log("WebSocket connected")
                 setConnected(true)
+                stopHeartbeat = startHeartbeat(ws)
 
                 // Join the group
                 ws.send(
@@ -98,11 +103,26 @@ export default function GroupChatWindow({ groupId, groupName, onMessageSent, onG
                         group_id: groupId,
                     })
                 )
+
+                // Reconnecting: ask only for the messages missed while offline
+                if (lastSeqRef.current !== null) {
+                    ws.send(
+                        JSON.stringify({
+                            action: "resume",
+                            streams: { [`group:${groupId}`]: lastSeqRef.current },
+                        })
+                    )
+                }
             }
 
             ws.onmessage = (event) => {
-                const data = JSON.parse(event.data)
+                const frame = JSON.parse(event.data)
+                // The server may bundle a burst of events into one batch frame
+                const events = frame.type === "batch" ? frame.events : [frame]
+                events.forEach(handleSocketEvent)
+            }
 
+            const handleSocketEvent = (data) => {
                 if (data.type === "new_group_message") {
                     const msg = data.message
                     console.log("Received new group message:", msg)
@@ -111,6 +131,7 @@ export default function GroupChatWindow({ groupId, groupName, onMessageSent, onG
                     }
                     // Only add message if it's for the current group
                     if (msg.group_id === groupId) {
+                        trackSeq(msg.seq)
                         setMessages((prev) => {
                             // Check if message already exists
                             if (prev.some((m) => m.id === msg.id)) {
@@ -119,12 +140,19 @@ export default function GroupChatWindow({ groupId, groupName, onMessageSent, onG
                             return [...prev, msg]
                         })
                     }
+                } else if (data.type === "resume_result" && data.stream === `group:${groupId}`) {
+                    if (data.has_more) {
+                        // Missed too much to replay - reload the latest page
+                        fetchMessages()
+                    } else {
+                        data.events.forEach(handleSocketEvent)
+                    }
                 } else if (data.type === "group_joined") {
                     console.log("Successfully joined group:", data.group_id)
-                } else if (data.type === "user_typing") {
-                    // Handle typing indicator
-                    if (data.user_id !== user.user.id && data.group_id === groupId) {
-                        handleTypingEvent(data.user_id)
+                } else if (data.type === "users_typing") {
+                    // Server sends the full set of typers whenever it changes
+                    if (data.group_id === groupId) {
+                        handleTypingEvent(data.user_ids || [])
                     }
                 } else if (data.type === "member_added") {
                     // Refresh members list
@@ -169,6 +197,7 @@ export default function GroupChatWindow({ groupId, groupName, onMessageSent, onG
             ws.onclose = () => {
                 console.log("WebSocket disconnected")
                 setConnected(false)
+                stopHeartbeat()
                 // Attempt to reconnect after 3 seconds
                 setTimeout(() => {
                     if (groupId && user?.access_token) {
@@ -189,29 +218,15 @@ export default function GroupChatWindow({ groupId, groupName, onMessageSent, onG
         }
     }
 
-    function handleTypingEvent(userId) {
-        setTypingUsers((prev) => {
-            const newSet = new Set(prev)
-            newSet.add(userId)
-            return newSet
-        })
+    function handleTypingEvent(userIds) {
+        // Typers expire on the server, so the latest frame is authoritative
+        setTypingUsers(new Set(userIds.filter((id) => id !== user.user.id)))
+    }
 
-        // Clear existing timeout for this user
-        if (typingIndicatorTimeouts.current.has(userId)) {
-            clearTimeout(typingIndicatorTimeouts.current.get(userId))
+    function trackSeq(seq) {
+        if (seq !== null && seq !== undefined && (lastSeqRef.current === null || seq > lastSeqRef.current)) {
+            lastSeqRef.current = seq
         }
-
-        // Set new timeout to remove user from typing
-        const timeout = setTimeout(() => {
-            setTypingUsers((prev) => {
-                const newSet = new Set(prev)
-                newSet.delete(userId)
-                return newSet
-            })
-            typingIndicatorTimeouts.current.delete(userId)
-        }, 3000)
-
-        typingIndicatorTimeouts.current.set(userId, timeout)
     }
 
     async function fetchMessages(loadMore = false) {
@@ -251,6 +266,8 @@ export default function GroupChatWindow({ groupId, groupName, onMessageSent, onG
                     setMessages((prev) => [...data.messages, ...prev])
                 } else {
                     setMessages(data.messages || [])
+                    const seqs = (data.messages || []).map((msg) => msg.seq).filter((seq) => seq != null)
+                    lastSeqRef.current = seqs.length ? Math.max(...seqs) : null
                     // Save group name to cache
                     if (groupName) {
                         saveConversationTitle(groupId, groupName, 'group')
@@ -0,0 +1,24 @@
+/**
+ * Presence heartbeats for the chat WebSocket
+ * Lets the server tell a half-open socket from a quiet one, and an
+ * open-but-hidden tab (away) from one the user is looking at
+ */
+
+// Must stay well under the server's PRESENCE_HEARTBEAT_TIMEOUT_SECONDS (75s)
+const HEARTBEAT_INTERVAL_MS = 25000;
+
+/**
+ * Send a heartbeat every interval while the socket is open
+ * @param {WebSocket} ws - Open chat socket
+ * @returns {Function} Stops the heartbeats
+ */
+export function startHeartbeat(ws) {
+  const timer = setInterval(() => {
+    if (ws.readyState !== WebSocket.OPEN) return;
+    ws.send(JSON.stringify({
+      action: 'heartbeat',
+      active: document.visibilityState === 'visible',
+    }));
+  }, HEARTBEAT_INTERVAL_MS);
+  return () => clearInterval(timer);
+}